@@ -6,6 +6,12 @@ from .sr100_model_compiler import sr100_model_compiler
 from .sr100_model_optimizer import sr100_model_optimizer
 from .sr100_model_compiler import sr100_check_model
 from .sr100_model_compiler import sr100_get_compile_log
+from .sr100_model_sweep import sr100_memory_sweep
+from .sr100_model_sweep import sr100_accelerator_sweep
+from .sr100_model_async import sr100_model_compiler_async
+from .sr100_model_async import sr100_model_optimizer_async
+from .sr100_model_diff import sr100_model_diff
+from .sr100_model_artifacts import sr100_model_compiler_in_memory
 
 __all__ = [
     "call_shell_cmd",
@@ -14,4 +20,10 @@ __all__ = [
     "sr100_model_optimizer",
     "sr100_check_model",
     "sr100_default_config",
+    "sr100_memory_sweep",
+    "sr100_accelerator_sweep",
+    "sr100_model_compiler_async",
+    "sr100_model_optimizer_async",
+    "sr100_model_diff",
+    "sr100_model_compiler_in_memory",
 ]
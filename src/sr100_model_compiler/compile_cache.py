@@ -0,0 +1,158 @@
+"""On disk cache of compile results keyed by the model and compile options"""
+
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from importlib.metadata import version, PackageNotFoundError
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # pylint: disable=C0103
+
+
+def get_vela_version():
+    """Gets the installed Vela version, part of every cache key"""
+
+    try:
+        return version("ethos-u-vela")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def get_model_hash(model_file):
+    """Hashes the contents of a model file"""
+
+    digest = hashlib.sha256()
+    with open(model_file, "rb") as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_cache_key(model_file, options):
+    """Builds a cache key from the model contents and the compile options"""
+
+    key_data = {
+        "model_hash": get_model_hash(model_file),
+        "vela_version": get_vela_version(),
+        "options": options,
+    }
+    key_text = json.dumps(key_data, sort_keys=True, default=str)
+    return hashlib.sha256(key_text.encode("utf-8")).hexdigest()
+
+
+class CompileCache:
+    """
+    Stores JSON compile results in a directory, one file per key.
+
+    The directory can be shared by processes and machines. Entries are
+    published with an atomic rename so readers never see a partial one, and
+    get_or_compile runs a single compile per key at a time, the processes
+    waiting for it reuse its results.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        # Lock files stay, removing one could let two processes lock a key
+        self.lock_dir = os.path.join(cache_dir, "locks")
+        os.makedirs(self.lock_dir, exist_ok=True)
+        # File locks on network file systems may not exclude threads of a process
+        self.key_locks = {}
+        self.mutex = threading.Lock()
+        self.stats = {"hits": 0, "waits": 0, "compiles": 0}
+
+    def get_path(self, key):
+        """Gets the file holding the results for a key"""
+
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Gets the cached results for a key, None on a miss"""
+
+        try:
+            with open(self.get_path(key), "r", encoding="utf-8") as fp:
+                return json.load(fp)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, key, results):
+        """Stores the results for a key, replacing any entry atomically"""
+
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.cache_dir, prefix=f".{key}.", suffix=".tmp", delete=False
+        ) as fp:
+            try:
+                json.dump(results, fp)
+                fp.flush()
+                os.fsync(fp.fileno())
+            except BaseException:
+                fp.close()
+                os.remove(fp.name)
+                raise
+        os.replace(fp.name, self.get_path(key))
+
+    def count(self, stat):
+        """Counts a hit, a wait for another compile or a compile"""
+
+        with self.mutex:
+            self.stats[stat] += 1
+
+    @contextlib.contextmanager
+    def lock(self, key):
+        """Holds the advisory lock of a key across threads and processes"""
+
+        with self.mutex:
+            key_lock = self.key_locks.setdefault(key, threading.Lock())
+        with (
+            key_lock,
+            open(
+                os.path.join(self.lock_dir, f"{key}.lock"), "a", encoding="utf-8"
+            ) as fp,
+        ):
+            if fcntl:
+                fcntl.flock(fp, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(fp, fcntl.LOCK_UN)
+
+    def get_or_compile(self, key, compile_func, keep=None):
+        """
+        Gets the results for a key, compiling them once on a miss.
+
+        A miss takes the lock of the key before compiling. Processes missing
+        the same key meanwhile wait for the lock and then read the results it
+        stored instead of compiling again.
+
+        Args:
+            key (str): The cache key, see get_cache_key.
+            compile_func (callable): Compiles the results of a miss.
+            keep (callable): Checks results are worth storing, failed compiles
+                are compiled again by the next miss. Default stores all.
+
+        Returns:
+            dict: The cached or compiled results.
+        """
+
+        results = self.get(key)
+        if results is not None:
+            self.count("hits")
+            return results
+
+        with self.lock(key):
+            # The process holding the lock before may have stored it
+            results = self.get(key)
+            if results is not None:
+                self.count("waits")
+                return results
+
+            self.count("compiles")
+            results = compile_func()
+            if keep is None or keep(results):
+                self.put(key, results)
+        return results
@@ -0,0 +1,278 @@
+"""SQLite history of compile results with a query command line"""
+
+import argparse
+import dataclasses
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from .compile_cache import get_model_hash, get_vela_version
+from .utils import print_table
+
+
+@dataclass(slots=True)
+class CompileRecord:  # pylint: disable=R0902
+    """One compile in the history, sizes are in bytes and times in seconds"""
+
+    timestamp: float
+    model_name: str
+    model_hash: str
+    vela_version: str
+    system_config: str
+    accelerator_config: str
+    optimize: str
+    success: bool
+    failure: Optional[str] = None
+    inference_time: float = 0.0
+    inferences_per_sec: float = 0.0
+    cycles_npu: int = 0
+    cycles_cpu: int = 0
+    weights_size: int = 0
+    arena_cache_size: int = 0
+    vmem_size: int = 0
+    lpmem_size: int = 0
+    flash_size: int = 0
+    args: dict = dataclasses.field(default_factory=dict)
+    stage_timings: dict = dataclasses.field(default_factory=dict)
+    id: Optional[int] = None
+
+    def to_row(self):
+        """Gets the values of the record in column order"""
+
+        row = dataclasses.astuple(self)[:-1]
+        return row[:-2] + (
+            json.dumps(self.args, default=str),
+            json.dumps(self.stage_timings),
+        )
+
+    @classmethod
+    def from_row(cls, row):
+        """Builds a record from a compiles table row"""
+
+        values = {key: row[key] for key in RECORD_COLUMNS + ["id"]}
+        values["success"] = bool(values["success"])
+        values["args"] = json.loads(values["args"])
+        values["stage_timings"] = json.loads(values["stage_timings"])
+        return cls(**values)
+
+
+RECORD_COLUMNS = [field.name for field in dataclasses.fields(CompileRecord)][:-1]
+
+# Columns printed by the query command line
+HISTORY_TABLE_KEYS = [
+    "id",
+    "model_name",
+    "vela_version",
+    "system_config",
+    "accelerator_config",
+    "optimize",
+    "success",
+    "inference_time",
+    "vmem_size",
+    "lpmem_size",
+    "flash_size",
+]
+
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS compiles (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    model_name TEXT NOT NULL,
+    model_hash TEXT NOT NULL,
+    vela_version TEXT NOT NULL,
+    system_config TEXT,
+    accelerator_config TEXT,
+    optimize TEXT,
+    success INTEGER NOT NULL,
+    failure TEXT,
+    inference_time REAL,
+    inferences_per_sec REAL,
+    cycles_npu INTEGER,
+    cycles_cpu INTEGER,
+    weights_size INTEGER,
+    arena_cache_size INTEGER,
+    vmem_size INTEGER,
+    lpmem_size INTEGER,
+    flash_size INTEGER,
+    args TEXT NOT NULL,
+    stage_timings TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS compiles_hash ON compiles (model_hash, timestamp);
+CREATE INDEX IF NOT EXISTS compiles_name ON compiles (model_name, timestamp);
+CREATE INDEX IF NOT EXISTS compiles_best ON compiles (model_name, success, inference_time);
+"""
+
+
+def make_compile_record(args, results, perf_data, success):
+    """
+    Builds the history record of a compile.
+
+    Args:
+        args (argparse.Namespace): Arguments of the compile.
+        results (dict): Results of the compile.
+        perf_data (dict): Performance data from sr100_check_model, None on failure.
+        success (bool): Whether the model fits onto SR100.
+
+    Returns:
+        CompileRecord: The record to add to the history.
+    """
+
+    record = CompileRecord(
+        timestamp=time.time(),
+        model_name=os.path.basename(args.model_file).replace(".tflite", ""),
+        model_hash=get_model_hash(args.model_file),
+        vela_version=get_vela_version(),
+        system_config=args.system_config,
+        accelerator_config=args.accelerator_config,
+        optimize=args.optimize,
+        success=success,
+        failure=results.get("failure"),
+        args={key: value for key, value in vars(args).items() if key != "history_db"},
+        stage_timings=results.get("stage_timings", {}),
+    )
+    if perf_data and perf_data is not results:
+        for key in [
+            "inference_time",
+            "inferences_per_sec",
+            "cycles_npu",
+            "cycles_cpu",
+            "weights_size",
+            "arena_cache_size",
+            "vmem_size",
+            "lpmem_size",
+            "flash_size",
+        ]:
+            setattr(record, key, perf_data[key])
+    return record
+
+
+class CompileHistory:
+    """Compile records stored in an SQLite database"""
+
+    def __init__(self, db_path):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        # Concurrent compiles append while queries read
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(HISTORY_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Closes the database"""
+
+        self.connection.close()
+
+    def add(self, record):
+        """Adds a record and returns its id"""
+
+        columns = ", ".join(RECORD_COLUMNS)
+        values = ", ".join("?" * len(RECORD_COLUMNS))
+        with self.lock, self.connection:
+            cursor = self.connection.execute(
+                f"INSERT INTO compiles ({columns}) VALUES ({values})",
+                record.to_row(),
+            )
+        record.id = cursor.lastrowid
+        return record.id
+
+    def query(self, sql, params=()):
+        """Runs a query on the compiles table and returns records"""
+
+        with self.lock:
+            rows = self.connection.execute(sql, params).fetchall()
+        return [CompileRecord.from_row(row) for row in rows]
+
+    def get_by_hash(self, model_hash, limit=None):
+        """Gets the latest compiles of a model by its contents hash"""
+
+        return self.query(
+            "SELECT * FROM compiles WHERE model_hash = ? ORDER BY timestamp DESC "
+            "LIMIT ?",
+            (model_hash, limit or -1),
+        )
+
+    def get_trend(self, model_name, limit=None):
+        """Gets the compiles of a model by name, oldest first"""
+
+        return self.query(
+            "SELECT * FROM (SELECT * FROM compiles WHERE model_name = ? "
+            "ORDER BY timestamp DESC LIMIT ?) ORDER BY timestamp",
+            (model_name, limit or -1),
+        )
+
+    def get_best(self, model_name=None):
+        """Gets the fastest compile that fits, per model or for one model"""
+
+        # SQLite returns the row holding the minimum for the bare columns
+        if model_name:
+            return self.query(
+                "SELECT * FROM compiles WHERE model_name = ? AND success = 1 "
+                "ORDER BY inference_time LIMIT 1",
+                (model_name,),
+            )
+        return self.query(
+            "SELECT *, MIN(inference_time) AS best FROM compiles WHERE success = 1 "
+            "GROUP BY model_name ORDER BY model_name"
+        )
+
+
+def record_compile(db_path, args, results, perf_data, success):
+    """Adds a compile and its sr100_check_model outcome to the history database"""
+
+    with CompileHistory(db_path) as history:
+        return history.add(make_compile_record(args, results, perf_data, success))
+
+
+def get_history_argparser():
+    """Parse command line arguments"""
+
+    parser = argparse.ArgumentParser(description="Query the SR100 compile history.")
+    parser.add_argument("--db", type=str, required=True, help="History database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    trend = subparsers.add_parser("trend", help="Compiles of a model over time")
+    trend.add_argument("model_name", type=str, help="Model name without .tflite")
+    trend.add_argument("--limit", type=int, help="Number of latest compiles")
+
+    best = subparsers.add_parser("best", help="Fastest fitting compile per model")
+    best.add_argument("model_name", type=str, nargs="?", help="Model name")
+
+    lookup = subparsers.add_parser("lookup", help="Compiles of a model file or hash")
+    lookup.add_argument("model", type=str, help="Model file or its sha256 hash")
+    lookup.add_argument("--limit", type=int, help="Number of latest compiles")
+    return parser
+
+
+def main():
+    """Main for the command line history queries"""
+    parser = get_history_argparser()
+    args = parser.parse_args()
+
+    with CompileHistory(args.db) as history:
+        if args.command == "trend":
+            records = history.get_trend(args.model_name, args.limit)
+        elif args.command == "best":
+            records = history.get_best(args.model_name)
+        else:
+            model_hash = args.model
+            if os.path.exists(args.model):
+                model_hash = get_model_hash(args.model)
+            records = history.get_by_hash(model_hash, args.limit)
+
+    print_table([dataclasses.asdict(record) for record in records], HISTORY_TABLE_KEYS)
+    return 0 if records else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""Finds operators left on the Cortex-M CPU by Vela and estimates their cost"""
+
+import math
+from ethosu.vela.tflite.Model import Model
+from ethosu.vela.tflite.BuiltinOperator import BuiltinOperator
+from ethosu.vela.tflite.TensorType import TensorType
+
+# Custom operator Vela emits for everything mapped onto the NPU
+ETHOSU_CUSTOM_CODE = "ethos-u"
+
+# Fixed cycles to invoke a kernel in TFLM
+CPU_OP_OVERHEAD_CYCLES = 2000
+
+# Rough int8 CMSIS-NN cycles on a Cortex-M55, per MAC or per output element
+CPU_CYCLE_MODEL = {
+    "CONV_2D": ("macs", 1.0),
+    "DEPTHWISE_CONV_2D": ("macs", 2.0),
+    "FULLY_CONNECTED": ("macs", 1.0),
+    "TRANSPOSE_CONV": ("macs", 1.5),
+    "BATCH_MATMUL": ("macs", 1.5),
+    "AVERAGE_POOL_2D": ("macs", 1.0),
+    "MAX_POOL_2D": ("macs", 1.0),
+    "ADD": ("outputs", 2.0),
+    "SUB": ("outputs", 2.0),
+    "MUL": ("outputs", 2.0),
+    "SOFTMAX": ("outputs", 20.0),
+    "LOGISTIC": ("outputs", 10.0),
+    "TANH": ("outputs", 10.0),
+    "HARD_SWISH": ("outputs", 8.0),
+    "RESIZE_BILINEAR": ("outputs", 12.0),
+    "RESIZE_NEAREST_NEIGHBOR": ("outputs", 2.0),
+    "RESHAPE": ("outputs", 0.25),
+    "SQUEEZE": ("outputs", 0.25),
+    "EXPAND_DIMS": ("outputs", 0.25),
+    "QUANTIZE": ("outputs", 4.0),
+    "DEQUANTIZE": ("outputs", 4.0),
+}
+
+# Cycles per output element for operators missing from the cycle model
+CPU_DEFAULT_CYCLES = ("outputs", 4.0)
+
+# Float kernels are much slower than the int8 CMSIS-NN ones
+CPU_FLOAT_FACTOR = 4.0
+
+BUILTIN_NAMES = {
+    value: name for name, value in vars(BuiltinOperator).items() if name.isupper()
+}
+
+
+def get_tensor_shape(subgraph, index):
+    """Gets the shape and type of a tensor, None for an optional tensor"""
+
+    if index < 0:
+        return None, None
+    tensor = subgraph.Tensors(index)
+    shape = tensor.ShapeAsNumpy().tolist() if tensor.ShapeLength() else []
+    return shape, tensor.Type()
+
+
+def get_model_operators(tflite_path):
+    """
+    Lists the operators of a tflite model in execution order.
+
+    Args:
+        tflite_path (str): Path to the tflite model.
+
+    Returns:
+        list: A dictionary per operator with the subgraph, index, operator
+            type, custom code, output tensor name and indexes and input/output
+            shapes.
+    """
+
+    with open(tflite_path, "rb") as fp:
+        data = fp.read()
+    model = Model.GetRootAsModel(data, 0)
+
+    operators = []
+    for subgraph_index in range(model.SubgraphsLength()):
+        subgraph = model.Subgraphs(subgraph_index)
+        for op_index in range(subgraph.OperatorsLength()):
+            op = subgraph.Operators(op_index)
+            op_code = model.OperatorCodes(op.OpcodeIndex())
+            builtin_code = max(op_code.BuiltinCode(), op_code.DeprecatedBuiltinCode())
+            custom_code = op_code.CustomCode()
+
+            inputs = [
+                get_tensor_shape(subgraph, op.Inputs(i))
+                for i in range(op.InputsLength())
+            ]
+            outputs = [
+                get_tensor_shape(subgraph, op.Outputs(i))
+                for i in range(op.OutputsLength())
+            ]
+            name = ""
+            if op.OutputsLength():
+                name = subgraph.Tensors(op.Outputs(0)).Name().decode("utf-8")
+
+            operators.append(
+                {
+                    "subgraph": subgraph_index,
+                    "index": op_index,
+                    "op": BUILTIN_NAMES.get(builtin_code, str(builtin_code)),
+                    "custom_code": custom_code.decode("utf-8") if custom_code else None,
+                    "name": name,
+                    "output_tensors": [
+                        op.Outputs(i) for i in range(op.OutputsLength())
+                    ],
+                    "inputs": [shape for shape, _ in inputs],
+                    "outputs": [shape for shape, _ in outputs],
+                    "float": any(
+                        dtype == TensorType.FLOAT32 for _, dtype in inputs + outputs
+                    ),
+                }
+            )
+
+    return operators
+
+
+def get_custom_op_codes(tflite_path):
+    """Gets the set of custom operator codes used by a tflite model"""
+
+    return {
+        op["custom_code"]
+        for op in get_model_operators(tflite_path)
+        if op["custom_code"] is not None
+    }
+
+
+def get_op_macs(op):
+    """Estimates the multiply accumulates of an operator from its shapes"""
+
+    output_size = math.prod(op["outputs"][0]) if op["outputs"] else 0
+    weights = op["inputs"][1] if len(op["inputs"]) > 1 else None
+
+    if op["op"] in ("CONV_2D", "TRANSPOSE_CONV") and weights:
+        # Weights are [out_ch, kh, kw, in_ch]
+        return output_size * math.prod(weights[1:])
+    if op["op"] == "DEPTHWISE_CONV_2D" and weights:
+        # Weights are [1, kh, kw, out_ch]
+        return output_size * math.prod(weights[1:3])
+    if op["op"] == "FULLY_CONNECTED" and weights:
+        return output_size * weights[-1]
+    if op["op"] == "BATCH_MATMUL" and weights and op["inputs"][0]:
+        return output_size * op["inputs"][0][-1]
+    if op["op"] in ("AVERAGE_POOL_2D", "MAX_POOL_2D") and op["inputs"][0]:
+        # Every input element is read about once across the pooling windows
+        return max(output_size, math.prod(op["inputs"][0]))
+    return output_size
+
+
+def estimate_cpu_cycles(op):
+    """Estimates the Cortex-M cycles of an operator with the per-op cycle model"""
+
+    basis, cycles_per_unit = CPU_CYCLE_MODEL.get(op["op"], CPU_DEFAULT_CYCLES)
+    if basis == "macs":
+        units = get_op_macs(op)
+    else:
+        units = math.prod(op["outputs"][0]) if op["outputs"] else 0
+
+    cycles = CPU_OP_OVERHEAD_CYCLES + units * cycles_per_unit
+    if op["float"]:
+        cycles *= CPU_FLOAT_FACTOR
+    return int(cycles)
+
+
+def get_cpu_operators(tflite_path):
+    """
+    Finds the operators Vela left outside of the Ethos-U custom operator.
+
+    Args:
+        tflite_path (str): Path to the Vela optimized tflite model.
+
+    Returns:
+        tuple: (list of dictionaries, int)
+            - Operator type, output tensor name and estimated cycles per CPU op
+            - Total estimated CPU cycles
+    """
+
+    cpu_ops = []
+    for op in get_model_operators(tflite_path):
+        if op["custom_code"] == ETHOSU_CUSTOM_CODE:
+            continue
+        cpu_ops.append(
+            {
+                "op": op["custom_code"] or op["op"],
+                "name": op["name"],
+                "cycles": estimate_cpu_cycles(op),
+            }
+        )
+
+    return cpu_ops, sum(op["cycles"] for op in cpu_ops)
@@ -0,0 +1,499 @@
+"""Packs compiled models and test vectors into one aligned flash image"""
+
+import argparse
+import datetime
+import hashlib
+import re
+import struct
+import sys
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+
+from ethosu.vela.tflite.Model import Model
+
+from .template_registry import get_jinja_env, get_mako_template
+
+FLASH_IMAGE_MAGIC = b"SRFI"
+FLASH_IMAGE_VERSION = 1
+
+# Header: magic, version, entry size, entry count, alignment, image size, index crc32
+FLASH_HEADER = struct.Struct("<4sHHIIII8x")
+FLASH_HEADER_FIELDS = [
+    "magic",
+    "version",
+    "entry_size",
+    "entry_count",
+    "alignment",
+    "image_size",
+    "index_crc32",
+]
+
+# Entry: name, namespace id, kind, test vector index, flags, offset, length,
+# crc32 and sha256 of the data
+FLASH_ENTRY = struct.Struct("<32sHBBIIII32s12x")
+FLASH_ENTRY_FIELDS = [
+    "name",
+    "ns_id",
+    "kind",
+    "index",
+    "flags",
+    "offset",
+    "length",
+    "crc32",
+    "sha256",
+]
+FLASH_NAME_SIZE = 32
+
+FLASH_ENTRY_KINDS = {"model": 0, "input": 1, "expected": 2}
+
+# The entry offset points to a relocation table instead of the data
+FLASH_FLAG_RELOCATED = 0x1
+
+# Relocation table: segment count, then the image offset and length of every
+# segment, concatenated in order they rebuild the model
+FLASH_RELOC_HEADER = struct.Struct("<I12x")
+FLASH_RELOC = struct.Struct("<II")
+
+# Smaller buffers cost more in relocations than sharing them saves
+DEDUP_MIN_SIZE = 64
+
+# TFLM needs 16 byte aligned models, use the flash sector size to swap models
+DEFAULT_ALIGNMENT = 16
+
+# Erased flash state, padding costs no programming time
+FLASH_PAD_BYTE = b"\xff"
+
+
+@dataclass(slots=True)
+class FlashEntry:  # pylint: disable=R0902
+    """Data stored in a flash image with its place in the index"""
+
+    name: str
+    kind: str
+    data: bytes
+    index: int = 0
+    ns_id: int = 0
+    offset: int = 0
+    flags: int = 0
+    # (shared buffer sha256 or None for the own data, start, length) when deduplicated
+    segments: list = None
+
+    @property
+    def symbol(self):
+        """Name of the entry in the generated C header"""
+
+        if self.kind == "model":
+            return f"{self.name.upper()}_MODEL"
+        return f"{self.name.upper()}_{self.kind.upper()}{self.index}"
+
+
+def align_up(value, alignment):
+    """Rounds a value up to a multiple of the alignment"""
+
+    return (value + alignment - 1) // alignment * alignment
+
+
+def check_entry_name(name):
+    """Checks a namespace fits the index and works as a C identifier"""
+
+    if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", name):
+        raise ValueError(f"Flash image name {name} is not a C identifier")
+    if len(name.encode("utf-8")) >= FLASH_NAME_SIZE:
+        raise ValueError(
+            f"Flash image name {name} is longer than {FLASH_NAME_SIZE - 1}"
+        )
+
+
+def get_buffer_regions(data):
+    """Gets the start and length of every flatbuffer buffer of a TFLite model"""
+
+    if data[4:8] != b"TFL3":
+        return []
+    model = Model.GetRootAsModel(data, 0)
+    regions = []
+    for i in range(model.BuffersLength()):
+        table = model.Buffers(i)._tab  # pylint: disable=W0212
+        vector = table.Offset(4)
+        if vector:
+            regions.append((table.Vector(vector), table.VectorLen(vector)))
+    return sorted(regions)
+
+
+def dedup_flash_entries(entries, min_size=DEDUP_MIN_SIZE):
+    """
+    Finds flatbuffer buffers stored more than once across the models.
+
+    Every buffer of at least min_size bytes found twice, in one model or across
+    models, is stored once in the image. The models holding one are split into
+    segments of their own data and shared buffers, see pack_flash_image.
+
+    Args:
+        entries (list): FlashEntry of every model and test vector.
+        min_size (int): Size of the smallest buffer worth sharing in bytes.
+
+    Returns:
+        tuple: The shared buffers by sha256, and a report of the shared buffers
+            and the bytes saved in total and per model.
+    """
+
+    models = [entry for entry in entries if entry.kind == "model"]
+    regions = {}
+    counts = {}
+    for entry in models:
+        regions[entry.name] = []
+        for start, length in get_buffer_regions(entry.data):
+            if length >= min_size:
+                digest = hashlib.sha256(entry.data[start : start + length]).digest()
+                regions[entry.name].append((digest, start, length))
+                counts[digest] = counts.get(digest, 0) + 1
+
+    shared = {}
+    report = {"shared_buffers": 0, "shared_bytes": 0, "bytes_saved": 0, "models": {}}
+    for entry in models:
+        entry.segments = None
+        saved = 0
+        segments = []
+        position = 0
+        for digest, start, length in regions[entry.name]:
+            if counts[digest] < 2 or start < position:
+                continue
+            if digest in shared:
+                saved += length
+            else:
+                shared[digest] = entry.data[start : start + length]
+            if start > position:
+                segments.append((None, position, start - position))
+            segments.append((digest, start, length))
+            position = start + length
+        if segments:
+            if position < len(entry.data):
+                segments.append((None, position, len(entry.data) - position))
+            entry.segments = segments
+            saved -= FLASH_RELOC_HEADER.size + FLASH_RELOC.size * len(segments)
+        report["models"][entry.name] = saved
+        report["bytes_saved"] += saved
+
+    report["shared_buffers"] = len(shared)
+    report["shared_bytes"] = sum(len(data) for data in shared.values())
+    return shared, report
+
+
+def place_chunk(chunks, data, alignment):
+    """Appends data to the image chunks at the next aligned offset"""
+
+    last_offset, last_data = chunks[-1]
+    offset = align_up(last_offset + len(last_data), alignment)
+    chunks.append((offset, data))
+    return offset
+
+
+def pack_relocations(entry, literal_offset, shared_offsets):
+    """Builds the relocation table of a deduplicated model"""
+
+    relocations = [FLASH_RELOC_HEADER.pack(len(entry.segments))]
+    for digest, _, length in entry.segments:
+        if digest is None:
+            relocations.append(FLASH_RELOC.pack(literal_offset, length))
+            literal_offset += length
+        else:
+            relocations.append(FLASH_RELOC.pack(shared_offsets[digest], length))
+    return b"".join(relocations)
+
+
+def number_flash_entries(entries):
+    """Gives the entries their namespace ids and test vector indexes"""
+
+    ns_ids = {}
+    counts = {}
+    for entry in entries:
+        check_entry_name(entry.name)
+        entry.ns_id = ns_ids.setdefault(entry.name, len(ns_ids))
+        key = (entry.name, entry.kind)
+        entry.index = counts.get(key, 0)
+        counts[key] = entry.index + 1
+    for (name, kind), count in counts.items():
+        if kind == "model" and count > 1:
+            raise ValueError(f"Flash image holds two models named {name}")
+        if (name, "model") not in counts:
+            raise ValueError(f"Flash image holds test vectors of {name} but no model")
+
+
+def pack_flash_image(entries, alignment=DEFAULT_ALIGNMENT, shared=None):
+    """
+    Packs entries into a flash image with an index table in front.
+
+    Namespace ids follow the order the names first appear in. Test vectors of
+    the same namespace and kind are numbered in order. Models deduplicated by
+    dedup_flash_entries point to a relocation table, their own data and the
+    shared buffers are stored apart and the model is rebuilt by copying.
+
+    Args:
+        entries (list): FlashEntry of every model and test vector.
+        alignment (int): Alignment of every entry in bytes, a power of two.
+        shared (dict): Shared buffers by sha256 from dedup_flash_entries.
+
+    Returns:
+        bytes: The flash image, the entries get their offsets and ids.
+    """
+
+    if alignment <= 0 or alignment & (alignment - 1):
+        raise ValueError(f"Alignment {alignment} is not a power of two")
+
+    number_flash_entries(entries)
+    chunks = [(0, bytes(FLASH_HEADER.size + FLASH_ENTRY.size * len(entries)))]
+    shared_offsets = {
+        digest: place_chunk(chunks, data, alignment)
+        for digest, data in (shared or {}).items()
+    }
+    for entry in entries:
+        if not entry.segments:
+            entry.offset = place_chunk(chunks, entry.data, alignment)
+            continue
+        literal = b"".join(
+            entry.data[start : start + length]
+            for digest, start, length in entry.segments
+            if digest is None
+        )
+        literal_offset = place_chunk(chunks, literal, alignment)
+        relocations = pack_relocations(entry, literal_offset, shared_offsets)
+        entry.offset = place_chunk(chunks, relocations, alignment)
+        entry.flags |= FLASH_FLAG_RELOCATED
+    image_size = align_up(chunks[-1][0] + len(chunks[-1][1]), alignment)
+
+    index = b"".join(
+        FLASH_ENTRY.pack(
+            entry.name.encode("utf-8"),
+            entry.ns_id,
+            FLASH_ENTRY_KINDS[entry.kind],
+            entry.index,
+            entry.flags,
+            entry.offset,
+            len(entry.data),
+            zlib.crc32(entry.data),
+            hashlib.sha256(entry.data).digest(),
+        )
+        for entry in entries
+    )
+    header = FLASH_HEADER.pack(
+        FLASH_IMAGE_MAGIC,
+        FLASH_IMAGE_VERSION,
+        FLASH_ENTRY.size,
+        len(entries),
+        alignment,
+        image_size,
+        zlib.crc32(index),
+    )
+
+    image = bytearray(FLASH_PAD_BYTE * image_size)
+    chunks[0] = (0, header + index)
+    for offset, data in chunks:
+        image[offset : offset + len(data)] = data
+    return bytes(image)
+
+
+def read_flash_index(image):
+    """Reads the header and the index of a flash image, checking the index crc32"""
+
+    header = dict(zip(FLASH_HEADER_FIELDS, FLASH_HEADER.unpack_from(image)))
+    if header["magic"] != FLASH_IMAGE_MAGIC or header["version"] != FLASH_IMAGE_VERSION:
+        raise ValueError("Not an SR100 flash image")
+    if header["entry_size"] != FLASH_ENTRY.size or header["image_size"] > len(image):
+        raise ValueError("Flash image is truncated or from another version")
+    index_size = FLASH_ENTRY.size * header["entry_count"]
+    index = image[FLASH_HEADER.size : FLASH_HEADER.size + index_size]
+    if zlib.crc32(index) != header["index_crc32"]:
+        raise ValueError("Flash image index is corrupted")
+
+    kinds = {value: kind for kind, value in FLASH_ENTRY_KINDS.items()}
+    entries = []
+    for fields in FLASH_ENTRY.iter_unpack(index):
+        entry = dict(zip(FLASH_ENTRY_FIELDS, fields))
+        entry["name"] = entry["name"].rstrip(b"\0").decode("utf-8")
+        entry["kind"] = kinds[entry["kind"]]
+        entries.append(entry)
+    return header, entries
+
+
+def rebuild_relocated(image, offset):
+    """Rebuilds a deduplicated model from its relocation table"""
+
+    (count,) = FLASH_RELOC_HEADER.unpack_from(image, offset)
+    offset += FLASH_RELOC_HEADER.size
+    table = image[offset : offset + FLASH_RELOC.size * count]
+    return b"".join(
+        image[start : start + length]
+        for start, length in FLASH_RELOC.iter_unpack(table)
+    )
+
+
+def read_flash_image(image):
+    """
+    Reads and verifies the entries of a flash image.
+
+    Args:
+        image (bytes): The flash image.
+
+    Returns:
+        list: A dictionary per entry with its index fields and its data, a
+            memoryview unless the entry was rebuilt from shared buffers.
+    """
+
+    image = memoryview(image)
+    header, entries = read_flash_index(image)
+    for entry in entries:
+        if entry["flags"] & FLASH_FLAG_RELOCATED:
+            entry["data"] = rebuild_relocated(image, entry["offset"])
+        else:
+            entry["data"] = image[entry["offset"] : entry["offset"] + entry["length"]]
+        if (
+            entry["offset"] % header["alignment"]
+            or len(entry["data"]) != entry["length"]
+            or zlib.crc32(entry["data"]) != entry["crc32"]
+            or hashlib.sha256(entry["data"]).digest() != entry["sha256"]
+        ):
+            raise ValueError(f"Flash image entry {entry['name']} is corrupted")
+    return entries
+
+
+def gen_flash_header(entries, image, header_file, image_name):
+    """Generates the C header locating the entries of a flash image"""
+
+    header_template = get_jinja_env().get_template("header_template.txt")
+    license_header = header_template.render(
+        script_name=Path(__file__).parent.name,
+        file_name=image_name,
+        gen_time=datetime.datetime.now(),
+        year=datetime.datetime.now().year,
+    )
+    guard = re.sub(r"\W", "_", Path(header_file).name).upper()
+
+    output = get_mako_template("flash_image.h.mako").render(
+        common_template_header=license_header,
+        guard=guard,
+        magic=FLASH_IMAGE_MAGIC.decode("ascii"),
+        version=FLASH_IMAGE_VERSION,
+        kinds=FLASH_ENTRY_KINDS,
+        relocated_flag=FLASH_FLAG_RELOCATED,
+        image_name=image_name,
+        alignment=read_flash_index(image)[0]["alignment"],
+        image_size=len(image),
+        name_size=FLASH_NAME_SIZE,
+        entries=[
+            {
+                "name": entry.name,
+                "symbol": entry.symbol,
+                "kind": entry.kind,
+                "ns_id": entry.ns_id,
+                "offset": entry.offset,
+                "length": len(entry.data),
+                "relocated": bool(entry.segments),
+            }
+            for entry in entries
+        ],
+    )
+    with open(header_file, "w", encoding="utf-8") as f:
+        f.write(output)
+    print(f"++ Generated flash image header {header_file}")
+
+
+def parse_entry_arg(value, kind):
+    """Reads a [NAME=]FILE argument into a flash entry"""
+
+    name, _, path = value.rpartition("=")
+    if not name:
+        name = Path(path).stem.removesuffix("_vela")
+    with open(path, "rb") as fp:
+        return FlashEntry(name=name, kind=kind, data=fp.read())
+
+
+def get_flash_argparser():
+    """Parse command line arguments"""
+
+    parser = argparse.ArgumentParser(
+        description="Pack compiled SR100 models into one flash image with an index."
+    )
+    parser.add_argument(
+        "-m",
+        "--model",
+        type=str,
+        action="append",
+        required=True,
+        help="[NAME=]FILE of a Vela optimized model, NAME defaults to the file name",
+    )
+    parser.add_argument(
+        "-i",
+        "--input",
+        type=str,
+        action="append",
+        default=[],
+        help="NAME=FILE of an input test vector of the NAME model",
+    )
+    parser.add_argument(
+        "-e",
+        "--expected",
+        type=str,
+        action="append",
+        default=[],
+        help="NAME=FILE of an expected output test vector of the NAME model",
+    )
+    parser.add_argument(
+        "-o", "--output", type=str, required=True, help="Flash image file"
+    )
+    parser.add_argument("--header", type=str, help="Generated C header file")
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Stores flatbuffer buffers found in several models once",
+    )
+    parser.add_argument(
+        "--dedup-min-size",
+        type=int,
+        default=DEDUP_MIN_SIZE,
+        help="Sets the size of the smallest buffer to deduplicate in bytes",
+    )
+    parser.add_argument(
+        "--align",
+        type=int,
+        default=DEFAULT_ALIGNMENT,
+        help="Sets the alignment of every entry in bytes",
+    )
+    return parser
+
+
+def main():
+    """Main for the command line packer"""
+    parser = get_flash_argparser()
+    args = parser.parse_args()
+
+    entries = [parse_entry_arg(value, "model") for value in args.model]
+    entries += [parse_entry_arg(value, "input") for value in args.input]
+    entries += [parse_entry_arg(value, "expected") for value in args.expected]
+    shared = None
+    if args.dedup:
+        shared, report = dedup_flash_entries(entries, args.dedup_min_size)
+    try:
+        image = pack_flash_image(entries, args.align, shared)
+    except ValueError as e:
+        parser.error(str(e))
+
+    with open(args.output, "wb") as fp:
+        fp.write(image)
+    for entry in entries:
+        print(f"{entry.symbol}: offset 0x{entry.offset:08x} length {len(entry.data)}")
+    print(f"++ Packed {len(entries)} entries into {args.output} ({len(image)} bytes)")
+    if args.dedup:
+        print(
+            f"++ Shared {report['shared_buffers']} buffers ({report['shared_bytes']} "
+            f"bytes), saved {report['bytes_saved']} bytes"
+        )
+        for name, saved in report["models"].items():
+            print(f"{name}: saved {saved} bytes")
+
+    if args.header:
+        gen_flash_header(entries, image, args.header, Path(args.output).name)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
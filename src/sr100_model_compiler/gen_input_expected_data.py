@@ -2,15 +2,23 @@ import numpy as np
 import os
 
 os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
-import tensorflow as tf
-from mako.template import Template
-from pathlib import Path
 import platform
+from .template_registry import get_mako_template
+from .tensor_dumps import dump_tensors
 
 
 def generate_input_expected_data(
-    tflite_path, output_folder, namespace, license_header, input_files=None
+    tflite_path,
+    output_folder,
+    namespace,
+    license_header,
+    input_files=None,
+    tensor_filters=None,
+    tensor_c_arrays=False,
 ):
+    # TensorFlow is slow to import, only load it when data is generated
+    import tensorflow as tf  # pylint: disable=C0415
+
     # Load the model
     interpreter = tf.lite.Interpreter(
         model_path=tflite_path,
@@ -78,6 +86,17 @@ def generate_input_expected_data(
 
     interpreter.invoke()
 
+    # Golden data of the selected intermediate tensors
+    if tensor_filters:
+        dump_tensors(
+            interpreter,
+            tflite_path,
+            tensor_filters,
+            output_folder,
+            namespace,
+            license_header if tensor_c_arrays else None,
+        )
+
     for i, output_detail in enumerate(output_details):
         output_data = interpreter.get_tensor(output_detail["index"])
         output_data_str = ",\n".join(
@@ -92,22 +111,16 @@ def generate_input_expected_data(
         output_data_size_list.append(output_data.nbytes)
 
         # Write output_data to binary file
-        bin_filename = f"{output_folder}/output_{i}.bin"
+        bin_filename = f"{output_folder}/{namespace}_output_{i}.bin"
         with open(bin_filename, "wb") as bin_file:
             bin_file.write(output_data.tobytes())
 
         # Write output_data to NumPy file
-        npy_filename = f"{output_folder}/output_{i}.npy"
+        npy_filename = f"{output_folder}/{namespace}_output_{i}.npy"
         np.save(npy_filename, output_data)
 
-    # Get the path to the directory containing this script
-    script_dir = Path(__file__).parent
-
-    # Construct the relative path to the template file
-    template_path = script_dir / "templates" / "io_template.mako"
-
     # Generate the C++ code from the Mako template
-    template = Template(filename=str(template_path))
+    template = get_mako_template("io_template.mako")
     output = template.render(
         namespace=namespace,
         input_data_list=input_data_list,
@@ -10,6 +10,16 @@ loc_choices = {
     "flash": "MODEL_TFLITE_ATTRIBUTE_FLASH",  # QSPI FLASH
 }
 
+# Section macro and default section of the .incbin model for each tflite location,
+# the sram one matches the section of the C array
+loc_sections = {
+    "sram": ("MODEL_TFLITE_SECTION", "test_attribute"),
+    "flash": ("MODEL_TFLITE_SECTION_FLASH", "model_flash"),
+}
+
+# Alignment of the model required by TFLite Micro and the NPU
+MODEL_ALIGNMENT = 16
+
 
 def generate_model_cpp(
     tflite_path,
@@ -20,8 +30,15 @@ def generate_model_cpp(
     namespace,
     env,
     license_header,
+    bin_file=None,
+    model_format="array",
 ):
-    """Generates a C++ source file that contains the TFLite model as a byte array."""
+    """
+    Generates a C++ source file that contains the TFLite model as a byte array.
+
+    With the incbin model format, the model is linked in by a .S file including
+    the .bin file instead, and the C++ source only holds the accessors.
+    """
 
     tflite_loc_choice = loc_choices.get(tflite_loc, "MODEL_TFLITE_ATTRIBUTE")
 
@@ -43,7 +60,31 @@ def generate_model_cpp(
 
     output_dir.mkdir(exist_ok=True)
 
-    model_data, model_length = get_tflite_data(tflite_path)
+    # Write the binary file, always into the output directory
+    flash_file = bin_file
+    if flash_file is None:
+        flash_file = output_dir / (
+            Path(tflite_path).stem.removesuffix("_vela") + ".bin"
+        )
+
+    asm_file = None
+    model_symbol = f"{namespace}_nn_model"
+    if model_format == "incbin":
+        asm_file = output_dir / (model_file + ".S")
+        model_data, model_length = [], Path(tflite_path).stat().st_size
+        section_macro, section = loc_sections.get(tflite_loc, loc_sections["sram"])
+        env.get_template("tflite.S.template").stream(
+            common_template_header=license_header,
+            bin_file=Path(flash_file).name,
+            section_macro=section_macro,
+            section=section,
+            alignment=MODEL_ALIGNMENT,
+            symbol=model_symbol,
+            model_length=model_length,
+        ).dump(str(asm_file))
+    else:
+        model_data, model_length = get_tflite_data(tflite_path)
+
     env.get_template("tflite.cc.template").stream(
         common_template_header=license_header,
         arena_cache_size=arena_cache_size,
@@ -52,11 +93,10 @@ def generate_model_cpp(
         model_length=model_length,
         namespace=namespace,
         tflite_attribute=tflite_loc_choice,
+        asm_file=asm_file.name if asm_file else None,
+        model_symbol=model_symbol,
     ).dump(str(cpp_filename))
 
-    # Write the binary file
-    flash_file = tflite_path.replace("_vela.tflite", ".bin")
-
     # Read vela bytes
     with open(tflite_path, "rb") as tflite_model:
         data = tflite_model.read()
@@ -1,10 +1,8 @@
 import os
 import re
-from mako.template import Template
-from tensorflow.lite.tools import visualize as visualize
-from mako import template
 from pathlib import Path
 import platform
+from .template_registry import get_mako_template
 
 
 def generate_micro_mutable_ops_resolver_header(
@@ -14,7 +12,12 @@ def generate_micro_mutable_ops_resolver_header(
     namespace,
     license_header,
     verify_op_list_against_header=None,
+    op_set_cache=None,
+    workers=None,
 ):
+    # TensorFlow is slow to import, only load it when a resolver is generated
+    from tensorflow.lite.tools import visualize  # pylint: disable=C0415
+
     TEMPLATE_DIR = os.path.abspath("templates")
 
     def parse_string(word):
@@ -82,14 +85,8 @@ def generate_micro_mutable_ops_resolver_header(
         number_of_ops = len(operators)
         outfile = "micro_mutable_op_resolver.hpp"
 
-        # Get the path to the directory containing this script
-        script_dir = Path(__file__).parent
-
-        # Construct the relative path to the template file
-        template_file_path = script_dir / "templates" / (outfile + ".mako")
-
         # Generate the resolver file with the template
-        build_template = Template(filename=str(template_file_path))
+        build_template = get_mako_template(outfile + ".mako")
 
         output_dir = Path(output_dir).resolve()
         if platform.system() == "Windows":
@@ -142,9 +139,25 @@ def generate_micro_mutable_ops_resolver_header(
     final_operator_list = []
     merged_operator_list = []
 
-    for relative_model_path in input_tflite_files:
-        full_model_path = f"{common_tflite_path}/{relative_model_path}"
-        operators = GetModelOperatorsAndActivation(full_model_path)
+    full_model_paths = [
+        f"{common_tflite_path}/{relative_model_path}"
+        for relative_model_path in input_tflite_files
+    ]
+    if op_set_cache is not None:
+        # Only the models changed since the last run are parsed, in parallel
+        op_sets = op_set_cache.get_op_sets(full_model_paths, workers)
+        stats = op_set_cache.stats
+        print(
+            f"++ Operator sets of {stats['models']} models: {stats['hits']} cached, "
+            f"{stats['hashed']} hashed, {stats['parsed']} parsed in "
+            f"{stats['total_time']:.3f}s"
+        )
+
+    for full_model_path in full_model_paths:
+        if op_set_cache is not None:
+            operators = op_sets[full_model_path]
+        else:
+            operators = GetModelOperatorsAndActivation(full_model_path)
         model_name = os.path.basename(full_model_path)
         model_names.append(model_name)
 
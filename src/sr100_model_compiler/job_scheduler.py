@@ -0,0 +1,145 @@
+"""Admits parallel compile jobs based on the free memory and cores"""
+
+import contextlib
+import json
+import os
+import threading
+from .compile_cache import get_model_hash
+from .run_artifacts import write_json_atomic
+
+# Vela memory assumed for a model without past runs
+VELA_BASE_MEMORY = 128 * 1024 * 1024
+VELA_MEMORY_PER_MODEL_BYTE = 32
+
+# Share of the available memory compile jobs may reserve
+MEMORY_BUDGET_FRACTION = 0.8
+
+
+def get_available_memory():
+    """Gets the memory available to new processes in bytes, None if unknown"""
+
+    try:
+        with open("/proc/meminfo", "r", encoding="utf-8") as fp:
+            for line in fp:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+class MemoryEstimates:
+    """Peak Vela memory of past runs keyed by the model contents"""
+
+    def __init__(self, estimates_file=None):
+        self.estimates_file = estimates_file
+        self.lock = threading.Lock()
+        self.peaks = {}
+        if estimates_file and os.path.exists(estimates_file):
+            try:
+                with open(estimates_file, "r", encoding="utf-8") as fp:
+                    self.peaks = json.load(fp)
+            except json.JSONDecodeError:
+                self.peaks = {}
+
+    def get(self, model_file):
+        """Gets the expected peak memory of compiling a model in bytes"""
+
+        try:
+            key = get_model_hash(model_file)
+        except OSError:
+            # The compile reports the missing model
+            return VELA_BASE_MEMORY
+        with self.lock:
+            peak = self.peaks.get(key)
+        if peak is not None:
+            return peak
+        return VELA_BASE_MEMORY + VELA_MEMORY_PER_MODEL_BYTE * os.path.getsize(
+            model_file
+        )
+
+    def update(self, model_file, peak_memory):
+        """Records the peak memory of a compile, keeping the largest seen"""
+
+        key = get_model_hash(model_file)
+        with self.lock:
+            self.peaks[key] = max(self.peaks.get(key, 0), peak_memory)
+            if self.estimates_file:
+                # Sweeps on other machines may share the cache directory
+                write_json_atomic(self.estimates_file, self.peaks)
+
+
+class ResourceScheduler:
+    """Runs jobs once the cores and memory they are expected to use are free"""
+
+    def __init__(self, max_workers=None, memory_budget=None, estimates=None):
+        self.max_workers = max_workers or os.cpu_count()
+        if memory_budget is None:
+            available = get_available_memory()
+            if available is not None:
+                memory_budget = int(available * MEMORY_BUDGET_FRACTION)
+        self.memory_budget = memory_budget
+        self.estimates = estimates or MemoryEstimates()
+        self.condition = threading.Condition()
+        self.running = 0
+        self.reserved = 0
+
+    def can_admit(self, memory):
+        """Checks a job fits next to the running ones"""
+
+        # A job larger than the whole budget still runs, on its own
+        if self.running == 0:
+            return True
+        if self.running >= self.max_workers:
+            return False
+        return (
+            self.memory_budget is None or self.reserved + memory <= self.memory_budget
+        )
+
+    @contextlib.contextmanager
+    def reserve(self, memory):
+        """Blocks until a job using the given memory can run"""
+
+        with self.condition:
+            self.condition.wait_for(lambda: self.can_admit(memory))
+            self.running += 1
+            self.reserved += memory
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.running -= 1
+                self.reserved -= memory
+                self.condition.notify_all()
+
+    def learn(self, model_file, results):
+        """Updates the memory estimate of a model from its compile results"""
+
+        # Failed compiles stop early, their peak understates the model
+        if not results or results.get("failure") is not None:
+            return
+        peak_memory = results.get("vela_peak_memory")
+        if peak_memory and os.path.exists(model_file):
+            self.estimates.update(model_file, peak_memory)
+
+    def run(self, model_file, func, /, *args, **kwargs):
+        """
+        Runs a compile job once its memory estimate fits.
+
+        Args:
+            model_file (str): Model the job compiles, for its memory estimate.
+            func (callable): Job returning compile results.
+            args: Positional arguments of the job.
+            kwargs: Keyword arguments of the job.
+
+        Returns:
+            dict: The results of the job.
+        """
+
+        with self.reserve(self.estimates.get(model_file)):
+            results = func(*args, **kwargs)
+        self.learn(model_file, results)
+        return results
@@ -0,0 +1,264 @@
+"""Fail-fast checks of a TFLite model before the slow compile stages run"""
+
+import os
+import struct
+import time
+
+from ethosu.vela.operation import Op
+from ethosu.vela.tflite.Model import Model
+from ethosu.vela.tflite.TensorType import TensorType
+from ethosu.vela.tflite_mapping import builtin_operator_map, datatype_map
+from ethosu.vela.tflite_supported_operators import TFLiteSupportedOperators
+
+from .cpu_fallback import BUILTIN_NAMES, ETHOSU_CUSTOM_CODE
+from .flash_image import get_buffer_regions
+
+TFLITE_IDENTIFIER = b"TFL3"
+TFLITE_SCHEMA_VERSION = 3
+
+# Custom operators the inout script skips, the TFLite interpreter cannot run them
+INOUT_SKIPPED_CUSTOM_PREFIXES = ("synai", ETHOSU_CUSTOM_CODE)
+
+# Custom operators the TFLite interpreter of the inout script registers
+INTERPRETER_CUSTOM_OPS = {"TFLite_Detection_PostProcess"}
+
+# Tensor types the random inputs of the inout script can be set to
+INOUT_INPUT_TYPES = {TensorType.INT8}
+
+
+def add_diagnostic(report, level, check, message):
+    """Adds an error or a warning to a validation report"""
+
+    report["diagnostics"].append({"level": level, "check": check, "message": message})
+
+
+def check_header(data, report):
+    """
+    Checks the flatbuffer identifier, schema version and the bounds of the buffers.
+
+    Returns:
+        Model: The parsed model, None when it cannot be read.
+    """
+
+    if len(data) < 8:
+        add_diagnostic(report, "error", "header", f"File of {len(data)} bytes")
+        return None
+    if data[4:8] != TFLITE_IDENTIFIER:
+        add_diagnostic(report, "error", "header", "Not a TFLite flatbuffer")
+        return None
+
+    model = Model.GetRootAsModel(data, 0)
+    if model.Version() != TFLITE_SCHEMA_VERSION:
+        add_diagnostic(report, "error", "header", f"Schema version {model.Version()}")
+        return None
+    if model.SubgraphsLength() == 0:
+        add_diagnostic(report, "error", "header", "The model has no subgraph")
+        return None
+    regions = get_buffer_regions(data)
+    if regions and max(start + length for start, length in regions) > len(data):
+        raise ValueError("buffer past the end of the file")
+    return model
+
+
+def is_constant(model, tensor):
+    """Checks a tensor holds data in the flatbuffer, such as weights"""
+
+    return tensor.Buffer() > 0 and model.Buffers(tensor.Buffer()).DataLength() > 0
+
+
+def check_io_tensors(model, scripts, input_files, report):
+    """Checks the types and quantization of the model inputs and outputs"""
+
+    subgraph = model.Subgraphs(0)
+    for kind, length, get_index in [
+        ("input", subgraph.InputsLength(), subgraph.Inputs),
+        ("output", subgraph.OutputsLength(), subgraph.Outputs),
+    ]:
+        for i in range(length):
+            tensor = subgraph.Tensors(get_index(i))
+            name = f"{kind} {i} {tensor.Name().decode('utf-8')}"
+            dtype = datatype_map[tensor.Type()]
+            quantization = tensor.Quantization()
+            if dtype in (datatype_map[TensorType.INT8], datatype_map[TensorType.INT16]):
+                if quantization is None or quantization.ScaleLength() == 0:
+                    add_diagnostic(
+                        report, "warning", "quantization", f"{name} has no scale"
+                    )
+
+            # Given .npy inputs are set with their own type
+            given = input_files and i < len(input_files)
+            if (
+                kind == "input"
+                and "inout" in scripts
+                and tensor.Type() not in INOUT_INPUT_TYPES
+                and not (given and input_files[i].lower().endswith(".npy"))
+            ):
+                add_diagnostic(
+                    report,
+                    "error",
+                    "dtype",
+                    f"{name} is {dtype}, the inout script generates int8 inputs",
+                )
+
+
+def check_custom_ops(model, scripts, report):
+    """Checks for custom operators the inout script cannot run"""
+
+    for i in range(model.OperatorCodesLength()):
+        custom_code = model.OperatorCodes(i).CustomCode()
+        if custom_code is None or "inout" not in scripts:
+            continue
+        custom_code = custom_code.decode("utf-8")
+        if custom_code.lower().startswith(INOUT_SKIPPED_CUSTOM_PREFIXES):
+            add_diagnostic(
+                report,
+                "warning",
+                "custom_op",
+                f"Custom op {custom_code}, the inout script generates no expected output",
+            )
+        elif custom_code not in INTERPRETER_CUSTOM_OPS:
+            add_diagnostic(
+                report,
+                "error",
+                "custom_op",
+                f"Custom op {custom_code} is not registered in the TFLite interpreter",
+            )
+
+
+def is_npu_operator(model, subgraph, op):
+    """Checks an operator is in the Vela supported-op table with supported types"""
+
+    op_code = model.OperatorCodes(op.OpcodeIndex())
+    custom_code = op_code.CustomCode()
+    if custom_code is not None:
+        # Already compiled for the NPU
+        return custom_code.decode("utf-8") == ETHOSU_CUSTOM_CODE
+
+    builtin_code = max(op_code.BuiltinCode(), op_code.DeprecatedBuiltinCode())
+    op_type = builtin_operator_map.get(builtin_code, (Op.Placeholder,))[0]
+    if op_type not in TFLiteSupportedOperators.supported_operators:
+        return False
+
+    # Constant inputs such as the biases have types of their own
+    tensors = [
+        subgraph.Tensors(op.Inputs(i))
+        for i in range(op.InputsLength())
+        if op.Inputs(i) >= 0
+    ]
+    tensors = [tensor for tensor in tensors if not is_constant(model, tensor)]
+    tensors += [subgraph.Tensors(op.Outputs(i)) for i in range(op.OutputsLength())]
+    return all(
+        datatype_map[tensor.Type()] in TFLiteSupportedOperators.supported_op_dtypes
+        for tensor in tensors
+    )
+
+
+def check_operators(model, compiler, report):
+    """Counts the operators the NPU can run, Vela leaves the others on the CPU"""
+
+    cpu_ops = set()
+    for subgraph_index in range(model.SubgraphsLength()):
+        subgraph = model.Subgraphs(subgraph_index)
+        for op_index in range(subgraph.OperatorsLength()):
+            op = subgraph.Operators(op_index)
+            if is_npu_operator(model, subgraph, op):
+                report["npu_ops"] += 1
+                continue
+            report["cpu_ops"] += 1
+            op_code = model.OperatorCodes(op.OpcodeIndex())
+            custom_code = op_code.CustomCode()
+            cpu_ops.add(
+                custom_code.decode("utf-8")
+                if custom_code
+                else BUILTIN_NAMES.get(
+                    max(op_code.BuiltinCode(), op_code.DeprecatedBuiltinCode()),
+                    "UNKNOWN",
+                )
+            )
+
+    for cpu_op in sorted(cpu_ops):
+        add_diagnostic(
+            report, "warning", "operator", f"{cpu_op} is not supported by the NPU"
+        )
+    if compiler == "vela" and report["npu_ops"] == 0:
+        add_diagnostic(
+            report, "warning", "operator", "No operator of the model runs on the NPU"
+        )
+
+
+def validate_model(model_file, scripts=None, compiler="vela", input_files=None):
+    """
+    Checks a model can be compiled before Vela and the inout script run.
+
+    The flatbuffer header and buffer bounds, the types and quantization of the
+    inputs and outputs, the custom operators and the Ethos-U55 supported-op
+    table of Vela are checked without running anything.
+
+    Args:
+        model_file (str): Path to the TFLite model.
+        scripts (list): The scripts to run, default is model and inout.
+        compiler (str): The compiler to run, vela, synai or none.
+        input_files (list): The inputs given to the inout script.
+
+    Returns:
+        dict: valid is False when a check failed with an error. diagnostics
+            holds the level, check and message of every error and warning, with
+            the operator counts and the time taken in seconds.
+    """
+
+    start_time = time.perf_counter()
+    scripts = ["model", "inout"] if scripts is None else scripts
+    report = {"valid": True, "diagnostics": [], "npu_ops": 0, "cpu_ops": 0}
+
+    if not os.path.isfile(model_file):
+        add_diagnostic(report, "error", "header", f"{model_file} not found")
+    else:
+        with open(model_file, "rb") as fp:
+            data = fp.read()
+        # Reads past the end of a truncated flatbuffer raise
+        try:
+            model = check_header(data, report)
+            if model is not None:
+                check_io_tensors(model, scripts, input_files, report)
+                check_custom_ops(model, scripts, report)
+                check_operators(model, compiler, report)
+        except (struct.error, IndexError, ValueError, UnicodeDecodeError):
+            add_diagnostic(
+                report,
+                "error",
+                "header",
+                f"Truncated or corrupt flatbuffer of {len(data)} bytes",
+            )
+
+    report["valid"] = not any(
+        diagnostic["level"] == "error" for diagnostic in report["diagnostics"]
+    )
+    report["time"] = time.perf_counter() - start_time
+    return report
+
+
+def validate_compile(args):
+    """
+    Validates the model of a compile before it runs, see validate_model.
+
+    Returns:
+        dict: The results of a failed compile when the model is invalid, None
+            when the compile can go ahead.
+    """
+
+    if args.skip_validation:
+        return None
+    report = validate_model(args.model_file, args.script, args.compiler, args.input)
+    for diagnostic in report["diagnostics"]:
+        print(f"{diagnostic['level'].upper()}:: {diagnostic['message']}")
+    if report["valid"]:
+        return None
+
+    print(f"Validation of {args.model_file} failed in {report['time'] * 1000:.1f} ms")
+    return {
+        "cycles_npu": 0,
+        "failure": "invalid",
+        "validation": report,
+        "vela_log": "",
+        "vela_log_file": None,
+    }
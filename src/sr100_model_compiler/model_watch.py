@@ -0,0 +1,379 @@
+"""Watch mode recompiling models in a warm process when they change"""
+
+import copy
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import threading
+import time
+from pathlib import Path
+
+from .compile_cache import get_model_hash
+from .run_artifacts import read_run_manifest, stage_run_artifacts
+from .sr100_model_compiler import (
+    compiler_main,
+    gen_inout_script,
+    get_synai_ethosu_op_found,
+    prepare_compile,
+    sr100_check_model,
+)
+from .utils import expand_wildcards
+
+# inotify events of a file written, replaced or removed in a watched directory
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+)
+
+# Quiet time after the last change before the models are read
+DEBOUNCE_SECONDS = 0.5
+
+# Polling interval when inotify is not available
+POLL_SECONDS = 1.0
+
+# Longest wait for changes before checking the watch was stopped
+WAKE_SECONDS = 0.2
+
+# Performance data compared between compiles, with the scale of times in ms
+PERF_DELTA_KEYS = {
+    "inference_time": 1000,
+    "cycles_npu": 1,
+    "cycles_cpu": 1,
+    "arena_cache_size": 1,
+    "weights_size": 1,
+    "vmem_size": 1,
+    "lpmem_size": 1,
+    "flash_size": 1,
+}
+
+
+def get_file_signature(path):
+    """Gets the size and modification time of a file, None when it is missing"""
+
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class InotifyWatcher:
+    """Waits for changes to the files of directories with Linux inotify"""
+
+    def __init__(self, directories):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        for directory in directories:
+            if libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f"Cannot watch {directory}")
+
+    def wait(self, timeout):
+        """Waits for changes, True when there were any"""
+
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        # The files are compared by signature, the events only wake the watch
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        """Stops watching"""
+
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Waits for changes to files by comparing their signatures periodically"""
+
+    def __init__(self, get_paths, interval):
+        self.get_paths = get_paths
+        self.interval = interval
+        self.snapshot = self.get_snapshot()
+
+    def get_snapshot(self):
+        """Gets the signature of every watched file"""
+
+        return {path: get_file_signature(path) for path in self.get_paths()}
+
+    def wait(self, timeout):
+        """Waits for changes, True when there were any"""
+
+        deadline = time.monotonic() + timeout
+        while True:
+            time.sleep(max(0, min(self.interval, deadline - time.monotonic())))
+            snapshot = self.get_snapshot()
+            if snapshot != self.snapshot:
+                self.snapshot = snapshot
+                return True
+            if time.monotonic() >= deadline:
+                return False
+
+    def close(self):
+        """Stops watching"""
+
+
+def get_perf_delta(before, after):
+    """
+    Formats the changes of the performance data between two compiles.
+
+    Args:
+        before (dict): Performance data of the previous compile, see sr100_check_model.
+        after (dict): Performance data of the new compile.
+
+    Returns:
+        str: The changed values with their relative changes.
+    """
+
+    deltas = []
+    for key, scale in PERF_DELTA_KEYS.items():
+        old, new = before[key] * scale, after[key] * scale
+        if old == new:
+            continue
+        unit = " ms" if scale != 1 else ""
+        change = f" ({(new - old) / old * 100:+.1f}%)" if old else ""
+        deltas.append(f"{key} {old:.4g}{unit} -> {new:.4g}{unit}{change}")
+    return ", ".join(deltas) or "no performance change"
+
+
+class ModelWatch:  # pylint: disable=R0902
+    """
+    Compiles models and recompiles them when they change.
+
+    Models are compared by content hash, a touched model is not recompiled.
+    When only the input files change, the inout sources are regenerated
+    without compiling. Every compile prints the performance delta to the
+    previous one of the model.
+    """
+
+    def __init__(self, args, debounce=DEBOUNCE_SECONDS):
+        self.args = args
+        self.debounce = debounce
+        self.patterns = [args.model_file] + list(args.watch or [])
+        # Models matched by globs are compiled to a directory each
+        self.per_model_dirs = len(self.patterns) > 1 or "*" in args.model_file
+        self.models = {}
+        self.inputs = {}
+        self.compiled = []
+        self.regenerated = []
+
+    def get_model_files(self):
+        """Gets the models matching the watched paths and globs"""
+
+        return sorted(
+            {
+                os.path.abspath(path)
+                for path in expand_wildcards(self.patterns)
+                if os.path.isfile(path)
+            }
+        )
+
+    def get_input_files(self):
+        """Gets the input files of the inout script"""
+
+        return [
+            os.path.abspath(path) for path in expand_wildcards(self.args.input or [])
+        ]
+
+    def get_watched_files(self):
+        """Gets every file a change of recompiles a model or regenerates its inputs"""
+
+        return self.get_model_files() + self.get_input_files()
+
+    def get_directories(self):
+        """Gets the directories holding the watched files and globs"""
+
+        directories = {os.path.dirname(path) for path in self.get_watched_files()}
+        for pattern in self.patterns:
+            directory = os.path.dirname(os.path.abspath(pattern))
+            if "*" not in directory and os.path.isdir(directory):
+                directories.add(directory)
+        return sorted(directories)
+
+    def get_watcher(self):
+        """Gets an inotify watcher, a polling one when inotify is not available"""
+
+        if self.args.watch_poll is None and sys.platform.startswith("linux"):
+            try:
+                return InotifyWatcher(self.get_directories())
+            except (OSError, AttributeError) as e:
+                print(f"WARNING:: inotify is not available, polling instead: {e}")
+        return PollingWatcher(
+            self.get_watched_files, self.args.watch_poll or POLL_SECONDS
+        )
+
+    def get_model_args(self, model_file):
+        """Gets the compile arguments of a model, compiler_main updates them"""
+
+        model_args = copy.copy(self.args)
+        model_args.model_file = model_file
+        model_args.input = copy.copy(self.args.input)
+        model_args.watch = None
+        if self.per_model_dirs and self.args.output_dir:
+            model_args.output_dir = os.path.join(
+                self.args.output_dir, Path(model_file).stem
+            )
+        return model_args
+
+    def get_changes(self):
+        """
+        Finds the models whose content changed and those whose inputs changed.
+
+        Returns:
+            tuple: The models to compile, and the models to regenerate the inout
+                sources of.
+        """
+
+        inputs = {path: get_file_signature(path) for path in self.get_input_files()}
+        inputs_changed = inputs != self.inputs
+        self.inputs = inputs
+
+        model_files = self.get_model_files()
+        for model_file in set(self.models) - set(model_files):
+            print(f"++ {Path(model_file).name} was removed, no longer compiled")
+            del self.models[model_file]
+
+        to_compile = []
+        to_regenerate = []
+        for model_file in model_files:
+            model = self.models.setdefault(
+                model_file, {"signature": None, "sha256": None, "perf_data": None}
+            )
+            signature = get_file_signature(model_file)
+            if signature != model["signature"]:
+                model["signature"] = signature
+                sha256 = get_model_hash(model_file)
+                if sha256 != model["sha256"]:
+                    model["sha256"] = sha256
+                    to_compile.append(model_file)
+                    continue
+            if inputs_changed and model["perf_data"] is not None:
+                to_regenerate.append(model_file)
+        return to_compile, to_regenerate
+
+    def compile_model(self, model_file):
+        """Compiles a model and prints the performance delta to its last compile"""
+
+        model = self.models[model_file]
+        results = compiler_main(self.get_model_args(model_file))
+        success, perf_data = sr100_check_model(results)
+        self.compiled.append(model_file)
+
+        name = Path(model_file).name
+        if not success:
+            print(f"ERROR:: Failed to map {name} onto sr100")
+            return
+        if model["perf_data"] is None:
+            print(
+                f"++ Compiled {name}: inference_time "
+                f"{perf_data['inference_time'] * 1000:.4g} ms"
+            )
+        else:
+            print(
+                f"++ Recompiled {name}: {get_perf_delta(model['perf_data'], perf_data)}"
+            )
+        model["perf_data"] = perf_data
+
+    def regenerate_inout(self, model_file):
+        """
+        Regenerates the inout sources of a model without compiling it.
+
+        The sources are staged and published like a compile, the manifest of
+        the run also lists the files of the compile it updates.
+        """
+
+        args = self.get_model_args(model_file)
+        artifacts = stage_run_artifacts(args)
+        regenerated = False
+        try:
+            stage = prepare_compile(args)
+            if "inout" in stage["scripts_to_run"]:
+                print(
+                    f"++ Inputs changed, regenerating the inout sources of {model_file}"
+                )
+                gen_inout_script(
+                    get_synai_ethosu_op_found(args.model_file),
+                    args,
+                    stage["license_header"],
+                )
+                regenerated = True
+        finally:
+            args.output_dir = artifacts.publish_dir
+            compile_manifest = read_run_manifest(artifacts.output_dir) or {}
+            artifacts.publish(
+                {
+                    "model_file": args.model_file,
+                    "failure": compile_manifest.get("failure"),
+                    "vela_log_file": compile_manifest.get("vela_log_file"),
+                    "updates_run_id": compile_manifest.get("run_id"),
+                },
+                base_manifest=compile_manifest or None,
+            )
+        if regenerated:
+            self.regenerated.append(model_file)
+
+    def wait_for_changes(self, watcher, stop):
+        """Waits for changes until none come for the debounce time, False when stopped"""
+
+        while not stop.is_set():
+            if watcher.wait(WAKE_SECONDS):
+                while watcher.wait(self.debounce) and not stop.is_set():
+                    pass
+                return not stop.is_set()
+        return False
+
+    def run(self, stop=None):
+        """
+        Compiles the models, then recompiles them on changes until stopped.
+
+        Args:
+            stop (threading.Event): Ends the watch when set, runs until
+                interrupted by default.
+        """
+
+        stop = stop or threading.Event()
+        # Changes made while compiling are picked up by the next round
+        watcher = self.get_watcher()
+        try:
+            while True:
+                to_compile, to_regenerate = self.get_changes()
+                for model_file in to_compile:
+                    try:
+                        self.compile_model(model_file)
+                    except Exception as e:  # pylint: disable=W0718
+                        # A half exported model must not end the watch
+                        print(f"ERROR:: Compiling {model_file} failed: {e}")
+                for model_file in to_regenerate:
+                    try:
+                        self.regenerate_inout(model_file)
+                    except Exception as e:  # pylint: disable=W0718
+                        print(f"ERROR:: Regenerating {model_file} failed: {e}")
+                if to_compile or to_regenerate:
+                    print(f"++ Watching {len(self.models)} models for changes")
+                if not self.wait_for_changes(watcher, stop):
+                    break
+        except KeyboardInterrupt:
+            print("++ Stopped watching")
+        finally:
+            watcher.close()
+
+
+def watch_models(args, stop=None):
+    """Runs the compiler in watch mode, see ModelWatch"""
+
+    ModelWatch(args).run(stop)
+    return 0
@@ -0,0 +1,234 @@
+"""Persistent index of the operator sets of models for resolver generation"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ethosu.vela.tflite.Model import Model
+
+from .cpu_fallback import BUILTIN_NAMES
+from .generate_micro_mutable_op_resolver_from_model import (
+    generate_micro_mutable_ops_resolver_header,
+)
+from .run_artifacts import write_json_atomic
+
+OP_SET_INDEX_VERSION = 1
+
+
+def get_builtin_name(code):
+    """Gets the schema name of a builtin operator code"""
+
+    name = BUILTIN_NAMES.get(code)
+    if name is None:
+        # Operators newer than the Vela schema, TensorFlow is slow to import
+        from tensorflow.lite.tools import visualize  # pylint: disable=C0415
+
+        name = visualize.BuiltinCodeToName(code)
+    return name
+
+
+def get_op_set(data):
+    """
+    Extracts the operators of a TFLite model from its operator codes.
+
+    Custom operators are named by their custom code, and the CUSTOM builtin is
+    left out when the model has any.
+
+    Args:
+        data (bytes): The TFLite flatbuffer.
+
+    Returns:
+        list: The sorted operator names.
+    """
+
+    model = Model.GetRootAsModel(data, 0)
+    builtins = set()
+    customs = set()
+    for i in range(model.OperatorCodesLength()):
+        op_code = model.OperatorCodes(i)
+        custom_code = op_code.CustomCode()
+        if custom_code is not None:
+            customs.add(custom_code.decode("utf-8"))
+        else:
+            builtins.add(
+                get_builtin_name(
+                    max(op_code.BuiltinCode(), op_code.DeprecatedBuiltinCode())
+                )
+            )
+    if customs:
+        builtins.discard("CUSTOM")
+    return sorted(builtins | customs)
+
+
+def get_file_stat(model_path):
+    """Gets the size and modification time a cached entry is valid for"""
+
+    stat = os.stat(model_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class OpSetCache:
+    """
+    Operator sets of models in a JSON index, keyed by the model content hash.
+
+    A model whose size and modification time did not change since it was
+    indexed is neither read nor hashed. Others are hashed and only parsed when
+    the hash is new, in parallel. Models at temporary paths, such as the Vela
+    output of a compile, are looked up by hash only with by_path False.
+    """
+
+    def __init__(self, index_file, by_path=True):
+        self.index_file = index_file
+        self.by_path = by_path
+        self.lock = threading.Lock()
+        self.files = {}
+        self.op_sets = {}
+        self.stats = {}
+        try:
+            with open(index_file, "r", encoding="utf-8") as fp:
+                index = json.load(fp)
+            if index.get("version") == OP_SET_INDEX_VERSION:
+                self.files = index["files"]
+                self.op_sets = index["op_sets"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
+
+    def lookup(self, model_path):
+        """Gets the cached operator set of an unchanged model, None on a miss"""
+
+        if not self.by_path:
+            return None
+        entry = self.files.get(os.path.abspath(model_path))
+        if entry is None or entry["stat"] != get_file_stat(model_path):
+            return None
+        return self.op_sets.get(entry["sha256"])
+
+    def index_model(self, model_path):
+        """Hashes a changed or new model and parses it when the hash is new"""
+
+        stat = get_file_stat(model_path)
+        with open(model_path, "rb") as fp:
+            data = fp.read()
+        sha256 = hashlib.sha256(data).hexdigest()
+        parsed = sha256 not in self.op_sets
+        op_set = get_op_set(data) if parsed else self.op_sets[sha256]
+        with self.lock:
+            self.op_sets[sha256] = op_set
+            if self.by_path:
+                self.files[os.path.abspath(model_path)] = {
+                    "sha256": sha256,
+                    "stat": stat,
+                }
+        return op_set, parsed
+
+    def get_op_sets(self, model_paths, workers=None):
+        """
+        Gets the operator sets of models, indexing the changed and new ones.
+
+        Args:
+            model_paths (list): The TFLite models.
+            workers (int): Models indexed at the same time, default is the CPU count.
+
+        Returns:
+            dict: The sorted operator names of every model by path. stats holds
+                the cache hits, the models hashed and parsed, and timings.
+        """
+
+        start_time = time.perf_counter()
+        op_sets = {path: self.lookup(path) for path in model_paths}
+        misses = [path for path, op_set in op_sets.items() if op_set is None]
+        lookup_time = time.perf_counter() - start_time
+
+        parsed = 0
+        if misses:
+            with ThreadPoolExecutor(
+                max_workers=min(len(misses), workers or os.cpu_count() or 1)
+            ) as executor:
+                for path, (op_set, was_parsed) in zip(
+                    misses, executor.map(self.index_model, misses)
+                ):
+                    op_sets[path] = op_set
+                    parsed += was_parsed
+            self.save()
+
+        self.stats = {
+            "models": len(op_sets),
+            "hits": len(op_sets) - len(misses),
+            "hashed": len(misses),
+            "parsed": parsed,
+            "lookup_time": lookup_time,
+            "total_time": time.perf_counter() - start_time,
+        }
+        return op_sets
+
+    def save(self):
+        """Writes the index, replacing it atomically, without the removed models"""
+
+        with self.lock:
+            self.files = {
+                path: entry
+                for path, entry in self.files.items()
+                if os.path.exists(path)
+            }
+            index = {
+                "version": OP_SET_INDEX_VERSION,
+                "files": dict(self.files),
+                "op_sets": dict(self.op_sets),
+            }
+        index_dir = os.path.dirname(os.path.abspath(self.index_file))
+        os.makedirs(index_dir, exist_ok=True)
+        write_json_atomic(self.index_file, index)
+
+
+def get_resolver_argparser():
+    """Parse command line arguments"""
+
+    parser = argparse.ArgumentParser(
+        description="Generate one op resolver header for a set of models."
+    )
+    parser.add_argument("models", nargs="+", help="TFLite models sharing the resolver")
+    parser.add_argument(
+        "-o", "--output-dir", type=str, required=True, help="Sets the output directory"
+    )
+    parser.add_argument(
+        "-n", "--namespace", type=str, default="model", help="Sets the namespace"
+    )
+    parser.add_argument(
+        "--op-set-cache",
+        type=str,
+        default=".op_set_cache.json",
+        help="Index of the operator sets of the models, reused across runs",
+    )
+    parser.add_argument(
+        "-j", "--workers", type=int, help="Models indexed at the same time on misses"
+    )
+    return parser
+
+
+def main():
+    """Main for the command line resolver generation"""
+    parser = get_resolver_argparser()
+    args = parser.parse_args()
+
+    model_paths = [os.path.abspath(path) for path in args.models]
+    common_path = os.path.commonpath([os.path.dirname(p) for p in model_paths])
+    op_set_cache = OpSetCache(args.op_set_cache)
+    generate_micro_mutable_ops_resolver_header(
+        common_path,
+        [os.path.relpath(path, common_path) for path in model_paths],
+        args.output_dir,
+        args.namespace,
+        "",
+        op_set_cache=op_set_cache,
+        workers=args.workers,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""Parses TFLM MicroProfiler logs and aligns them with the Vela estimates"""
+
+import argparse
+import csv
+import re
+
+from .cpu_fallback import get_model_operators, estimate_cpu_cycles, ETHOSU_CUSTOM_CODE
+
+# Printed by the generated harness right before the profiler CSV
+PROFILE_MARKER = "SR100_PROFILE"
+
+# MicroProfiler::LogCsv rows, "event,tag,ticks"
+CSV_EVENT_RE = re.compile(r"(?:^|\s)(\d+),([^,\s]+),(\d+)\s*$")
+# MicroProfiler::Log rows, "TAG took 12 ticks (0 ms)." or "TAG took 0.3 ms (12 ticks)"
+LOG_EVENT_RE = re.compile(r"(\S+) took (?:(\d+) ticks|[\d.]+ ms \((\d+) ticks\))")
+
+
+def parse_profiler_log(log_text):
+    """
+    Parses the operator events of a MicroProfiler log.
+
+    Args:
+        log_text (str): Device console output with LogCsv or Log output.
+
+    Returns:
+        list: A dictionary per event with the tag and the measured ticks, for
+            the last run when the log holds several harness runs.
+    """
+
+    lines = log_text.splitlines()
+    markers = [i for i, line in enumerate(lines) if PROFILE_MARKER in line]
+    if markers:
+        lines = lines[markers[-1] + 1 :]
+
+    events = []
+    for line in lines:
+        match = CSV_EVENT_RE.search(line)
+        if match:
+            events.append({"tag": match.group(2), "ticks": int(match.group(3))})
+            continue
+        match = LOG_EVENT_RE.search(line)
+        if match:
+            ticks = match.group(2) or match.group(3)
+            events.append({"tag": match.group(1), "ticks": int(ticks)})
+
+    return events
+
+
+def read_profiler_log(log_file):
+    """Parses the operator events of a MicroProfiler log file"""
+
+    with open(log_file, "r", encoding="utf-8", errors="replace") as fp:
+        return parse_profiler_log(fp.read())
+
+
+def get_vela_per_layer(per_layer_file):
+    """Reads the per-layer CSV Vela writes with --verbose-performance"""
+
+    with open(per_layer_file, "r", newline="", encoding="utf-8") as csvfile:
+        return list(csv.DictReader(csvfile))
+
+
+def get_estimated_ops(tflite_path, per_layer):
+    """
+    Lists the operators the device runs with their estimated cycles.
+
+    Every ethos-u operator gets the Vela per-layer cycles of the NPU layers up
+    to the one producing its output, CPU operators use the CPU cycle model.
+
+    Args:
+        tflite_path (str): Path to the Vela optimized tflite model.
+        per_layer (list): Rows of the Vela per-layer CSV.
+
+    Returns:
+        list: A dictionary per operator with the tag, output name, the unit
+            running it and the estimated cycles.
+    """
+
+    operators = get_model_operators(tflite_path)
+    npu_ops = [op for op in operators if op["custom_code"] == ETHOSU_CUSTOM_CODE]
+
+    estimated_ops = []
+    layer_index = 0
+    for op in operators:
+        if op["custom_code"] != ETHOSU_CUSTOM_CODE:
+            estimated_ops.append(
+                {
+                    "tag": op["custom_code"] or op["op"],
+                    "name": op["name"],
+                    "unit": "cpu",
+                    "estimated_cycles": estimate_cpu_cycles(op),
+                    "layers": 1,
+                }
+            )
+            continue
+
+        # Vela layers run in order, the group ends at the layer writing the output
+        cycles = 0.0
+        layers = 0
+        last_npu_op = op is npu_ops[-1]
+        while layer_index < len(per_layer):
+            row = per_layer[layer_index]
+            layer_index += 1
+            cycles += float(row["Op Cycles"])
+            layers += 1
+            if row["Name"] == op["name"] and not last_npu_op:
+                break
+        estimated_ops.append(
+            {
+                "tag": op["custom_code"],
+                "name": op["name"],
+                "unit": "npu",
+                "estimated_cycles": cycles,
+                "layers": layers,
+            }
+        )
+
+    return estimated_ops
+
+
+def normalize_tag(tag):
+    """Normalizes profiler tags and operator names for matching"""
+
+    return re.sub(r"[^a-z0-9]", "", tag.lower())
+
+
+def align_profile(events, estimated_ops, ticks_per_second, core_clock=400e6):
+    """
+    Aligns measured profiler events with the estimated operators.
+
+    Events are matched to operators in execution order, skipping operators
+    whose tag does not match so extra or missing events do not shift the rest.
+
+    Args:
+        events (list): Events from parse_profiler_log.
+        estimated_ops (list): Operators from get_estimated_ops.
+        ticks_per_second (float): Rate of the device profiler ticks.
+        core_clock (float): Clock the estimated cycles run at.
+
+    Returns:
+        list: A dictionary per event with the measured and estimated times in
+            seconds and their ratio, estimates are None for unmatched events.
+    """
+
+    aligned = []
+    op_index = 0
+    for i, event in enumerate(events):
+        match = None
+        for j in range(op_index, len(estimated_ops)):
+            if normalize_tag(estimated_ops[j]["tag"]) == normalize_tag(event["tag"]):
+                match = estimated_ops[j]
+                op_index = j + 1
+                break
+
+        measured_time = event["ticks"] / ticks_per_second
+        row = {
+            "event": i,
+            "tag": event["tag"],
+            "name": None,
+            "unit": None,
+            "measured_ticks": event["ticks"],
+            "measured_time": measured_time,
+            "estimated_cycles": None,
+            "estimated_time": None,
+            "ratio": None,
+        }
+        if match:
+            estimated_time = match["estimated_cycles"] / core_clock
+            row["name"] = match["name"]
+            row["unit"] = match["unit"]
+            row["estimated_cycles"] = match["estimated_cycles"]
+            row["estimated_time"] = estimated_time
+            if estimated_time > 0:
+                row["ratio"] = measured_time / estimated_time
+        aligned.append(row)
+
+    return aligned
+
+
+def main():
+    """Main for the command line profile alignment"""
+
+    parser = argparse.ArgumentParser(
+        description="Align MicroProfiler logs with the Vela per-layer estimates."
+    )
+    parser.add_argument(
+        "-l", "--log-file", type=str, help="Device profiler log", required=True
+    )
+    parser.add_argument(
+        "-m", "--model-file", type=str, help="Vela optimized tflite", required=True
+    )
+    parser.add_argument(
+        "--per-layer", type=str, help="Vela per-layer CSV file", required=True
+    )
+    parser.add_argument(
+        "--ticks-per-second",
+        type=float,
+        default=400e6,
+        help="Rate of the device profiler ticks",
+    )
+    parser.add_argument(
+        "--core-clock", type=float, default=400e6, help="Clock of the estimates"
+    )
+    args = parser.parse_args()
+
+    aligned = align_profile(
+        read_profiler_log(args.log_file),
+        get_estimated_ops(args.model_file, get_vela_per_layer(args.per_layer)),
+        args.ticks_per_second,
+        args.core_clock,
+    )
+    for row in aligned:
+        ratio = f"{row['ratio']:.2f}" if row["ratio"] is not None else "n/a"
+        print(
+            f"{row['event']:4d} {row['tag']:24s} measured={row['measured_time']:.6f}s "
+            f"estimated={row['estimated_time'] or 0:.6f}s ratio={ratio}"
+        )
+
+
+if __name__ == "__main__":
+    main()
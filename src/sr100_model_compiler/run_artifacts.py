@@ -0,0 +1,153 @@
+"""Per-run artifact namespace so compiles can share an output directory"""
+
+import datetime
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+from .compile_cache import get_model_hash
+
+# Every run writes <run id>.manifest.json, the last one is also latest.manifest.json
+RUN_MANIFEST_SUFFIX = ".manifest.json"
+LATEST_RUN = "latest"
+
+
+def new_run_id(model_file):
+    """Builds a run id unique across processes and hosts sharing a directory"""
+
+    timestamp = datetime.datetime.now().strftime("%Y%m%dT%H%M%S")
+    return f"{Path(model_file).stem}-{timestamp}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+def get_manifest_file(output_dir, run_id=None):
+    """Gets the manifest of a run, the latest run when no run id is given"""
+
+    return os.path.join(output_dir, f"{run_id or LATEST_RUN}{RUN_MANIFEST_SUFFIX}")
+
+
+def read_run_manifest(output_dir, run_id=None):
+    """Reads the manifest of a run, None if the run did not publish one"""
+
+    try:
+        with open(get_manifest_file(output_dir, run_id), "r", encoding="utf-8") as fp:
+            return json.load(fp)
+    except FileNotFoundError:
+        return None
+
+
+def write_json_atomic(json_file, data):
+    """Writes a JSON file readers only ever see complete"""
+
+    tmp_file = f"{json_file}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as fp:
+        json.dump(data, fp, indent=2, default=str)
+    os.replace(tmp_file, json_file)
+
+
+class RunArtifacts:
+    """
+    Stages the artifacts of one compile and publishes them with atomic renames.
+
+    Compiles write into a private staging directory inside the output directory,
+    so their intermediate files never mix. Publishing renames every file into
+    place, by default the output directory itself or <output dir>/<run id> with
+    subdir, and writes the run manifest listing them.
+    """
+
+    def __init__(self, output_dir, run_id, subdir=False):
+        if run_id == LATEST_RUN or os.sep in run_id or run_id.startswith("."):
+            raise ValueError(f"Invalid run id {run_id}")
+        self.output_dir = os.path.abspath(output_dir)
+        self.run_id = run_id
+        self.publish_dir = self.output_dir
+        if subdir:
+            self.publish_dir = os.path.join(self.output_dir, run_id)
+        # Staged next to the published files, renames stay on one file system
+        self.stage_dir = os.path.join(self.output_dir, f".{run_id}.tmp")
+        os.makedirs(self.stage_dir)
+
+    def get_published_path(self, path):
+        """Maps a staged file to its published path"""
+
+        if path is None:
+            return None
+        return os.path.join(self.publish_dir, os.path.relpath(path, self.stage_dir))
+
+    def publish(self, info=None, base_manifest=None):
+        """
+        Renames the staged files into place and writes the run manifest.
+
+        Args:
+            info (dict): Run details added to the manifest.
+            base_manifest (dict): Manifest of an earlier run whose files this
+                run updates, its files not replaced are listed too.
+
+        Returns:
+            dict: The manifest with the published files relative to the output
+                directory, their sizes and sha256 hashes.
+        """
+
+        files = []
+        for root, _, names in os.walk(self.stage_dir):
+            for name in sorted(names):
+                staged = os.path.join(root, name)
+                published = self.get_published_path(staged)
+                os.makedirs(os.path.dirname(published), exist_ok=True)
+                files.append(
+                    {
+                        "path": os.path.relpath(published, self.output_dir),
+                        "size": os.path.getsize(staged),
+                        "sha256": get_model_hash(staged),
+                    }
+                )
+                os.replace(staged, published)
+        shutil.rmtree(self.stage_dir, ignore_errors=True)
+        if base_manifest:
+            paths = {file["path"] for file in files}
+            files += [
+                file for file in base_manifest["files"] if file["path"] not in paths
+            ]
+
+        manifest = {
+            "run_id": self.run_id,
+            "published": datetime.datetime.now().isoformat(),
+            **(info or {}),
+            "files": files,
+        }
+        write_json_atomic(get_manifest_file(self.output_dir, self.run_id), manifest)
+        write_json_atomic(get_manifest_file(self.output_dir), manifest)
+        return manifest
+
+
+def stage_run_artifacts(args):
+    """Points the compile at its own staging directory in the output directory"""
+
+    run_id = args.run_id or new_run_id(args.model_file)
+    artifacts = RunArtifacts(args.output_dir, run_id, args.run_subdir)
+    args.output_dir = artifacts.stage_dir
+    return artifacts
+
+
+def publish_run_artifacts(args, results, artifacts):
+    """Publishes the staged files of a compile with its run manifest"""
+
+    args.output_dir = artifacts.publish_dir
+    vela_log_file = None
+    if results is not None:
+        vela_log_file = artifacts.get_published_path(results.get("vela_log_file"))
+    artifacts.publish(
+        {
+            "model_file": args.model_file,
+            "failure": results.get("failure") if results is not None else "error",
+            "vela_log_file": (
+                os.path.relpath(vela_log_file, artifacts.output_dir)
+                if vela_log_file
+                else None
+            ),
+        }
+    )
+    if results is not None:
+        results["vela_log_file"] = vela_log_file
+        results["run_id"] = artifacts.run_id
@@ -0,0 +1,267 @@
+"""Removes the content TFLite Micro does not use from a model flatbuffer"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import flatbuffers
+import numpy as np
+
+from .utils import print_table
+
+# Metadata read by TFLite Micro, the tensor arena layout Vela planned offline
+KEEP_METADATA = ["OfflineMemoryAllocation"]
+
+# Buffers keep their alignment up to this, Vela aligns the ones the NPU reads
+BUFFER_ALIGNMENT = 16
+
+SLIM_TABLE_KEYS = [
+    "model",
+    "size",
+    "slim_size",
+    "bytes_saved",
+    "removed_metadata",
+    "removed_buffers",
+    "removed_signature_defs",
+]
+
+
+def get_schema():
+    """Imports the TFLite schema object API, importing TensorFlow takes seconds"""
+
+    from tensorflow.lite.python import (  # pylint: disable=C0415
+        schema_py_generated,
+    )
+
+    return schema_py_generated
+
+
+def get_buffer_alignments(schema, data):
+    """Gets the alignment of the data of every buffer, up to BUFFER_ALIGNMENT"""
+
+    model = schema.Model.GetRootAs(data, 0)
+    alignments = []
+    for i in range(model.BuffersLength()):
+        table = model.Buffers(i)._tab  # pylint: disable=W0212
+        vector = table.Offset(4)
+        start = table.Vector(vector) if vector else 0
+        alignments.append(min(BUFFER_ALIGNMENT, start & -start) or BUFFER_ALIGNMENT)
+    return alignments
+
+
+class AlignedBuffer:  # pylint: disable=R0903
+    """Packs a buffer with its data aligned, the schema object API does not"""
+
+    def __init__(self, buffer, alignment):
+        self.buffer = buffer
+        self.alignment = alignment
+
+    def Pack(self, builder):  # pylint: disable=C0103
+        """Packs the buffer into the builder, see BufferT.Pack"""
+
+        schema = get_schema()
+        data = None
+        if self.buffer.data is not None:
+            data_bytes = bytes(self.buffer.data)
+            builder.StartVector(1, len(data_bytes), self.alignment)
+            builder.head = builder.head - len(data_bytes)
+            builder.Bytes[builder.head : builder.head + len(data_bytes)] = data_bytes
+            data = builder.EndVector()
+        schema.BufferStart(builder)
+        if data is not None:
+            schema.BufferAddData(builder, data)
+        return schema.BufferEnd(builder)
+
+
+def to_plain(value):
+    """Converts schema objects to plain values that compare by content"""
+
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [to_plain(item) for item in value]
+    if hasattr(value, "__dict__"):
+        return {key: to_plain(item) for key, item in vars(value).items()}
+    return value
+
+
+def get_model_graph(model):
+    """Gets the operator codes, operators and tensors of a model with their data"""
+
+    graph = {"operator_codes": to_plain(model.operatorCodes), "subgraphs": []}
+    for subgraph in model.subgraphs or []:
+        tensors = []
+        for tensor in subgraph.tensors or []:
+            plain = to_plain(tensor)
+            data = model.buffers[plain.pop("buffer")].data
+            plain["data"] = b"" if data is None else bytes(data)
+            tensors.append(plain)
+        graph["subgraphs"].append(
+            {
+                "name": subgraph.name,
+                "inputs": to_plain(subgraph.inputs),
+                "outputs": to_plain(subgraph.outputs),
+                "operators": to_plain(subgraph.operators),
+                "tensors": tensors,
+            }
+        )
+    return graph
+
+
+def remove_unused_buffers(model):
+    """Removes the buffers no tensor or kept metadata uses, returns their count"""
+
+    # Buffer 0 is the empty sentinel of tensors without data
+    used = {0}
+    for subgraph in model.subgraphs or []:
+        used.update(tensor.buffer for tensor in subgraph.tensors or [])
+    used.update(metadata.buffer for metadata in model.metadata or [])
+
+    new_index = {}
+    buffers = []
+    for index, buffer in enumerate(model.buffers or []):
+        if index in used:
+            new_index[index] = len(buffers)
+            buffers.append(buffer)
+    for subgraph in model.subgraphs or []:
+        for tensor in subgraph.tensors or []:
+            tensor.buffer = new_index[tensor.buffer]
+    for metadata in model.metadata or []:
+        metadata.buffer = new_index[metadata.buffer]
+
+    removed = len(model.buffers or []) - len(buffers)
+    model.buffers = buffers
+    return removed
+
+
+def slim_model_data(data, name="model", keep_metadata=None):
+    """
+    Rewrites a TFLite flatbuffer without the content TFLite Micro does not use.
+
+    The description, signature defs, metadata other than keep_metadata and
+    buffers no tensor uses are removed. The operators and tensors of the
+    rewritten model are checked against the original one.
+
+    Args:
+        data (bytes): The TFLite flatbuffer.
+        name (str): Name of the model in the report.
+        keep_metadata (list): Names of the metadata to keep, default is
+            KEEP_METADATA.
+
+    Returns:
+        tuple: The slimmed flatbuffer, the original one when it is not smaller,
+            and a report of the removed content and the bytes saved.
+    """
+
+    schema = get_schema()
+    keep_metadata = KEEP_METADATA if keep_metadata is None else keep_metadata
+    model = schema.ModelT.InitFromPackedBuf(bytearray(data), 0)
+    graph = get_model_graph(model)
+    model.buffers = [
+        AlignedBuffer(buffer, alignment)
+        for buffer, alignment in zip(model.buffers, get_buffer_alignments(schema, data))
+    ]
+
+    metadata = model.metadata or []
+    model.metadata = [
+        entry for entry in metadata if entry.name.decode("utf-8") in keep_metadata
+    ]
+    report = {
+        "model": name,
+        "size": len(data),
+        "removed_metadata": ", ".join(
+            entry.name.decode("utf-8")
+            for entry in metadata
+            if entry not in model.metadata
+        )
+        or "-",
+        "removed_signature_defs": len(model.signatureDefs or []),
+    }
+    model.description = None
+    model.signatureDefs = None
+    model.metadataBuffer = None
+    report["removed_buffers"] = remove_unused_buffers(model)
+
+    builder = flatbuffers.Builder(len(data))
+    builder.Finish(model.Pack(builder), file_identifier=b"TFL3")
+    slim_data = bytes(builder.Output())
+
+    slim_graph = get_model_graph(
+        schema.ModelT.InitFromPackedBuf(bytearray(slim_data), 0)
+    )
+    if slim_graph != graph:
+        raise ValueError(f"Slimming changed the operators or tensors of {name}")
+
+    if len(slim_data) >= len(data):
+        slim_data = bytes(data)
+    report["slim_size"] = len(slim_data)
+    report["bytes_saved"] = len(data) - len(slim_data)
+    return slim_data, report
+
+
+def slim_model(model_file, output_file=None, keep_metadata=None):
+    """
+    Slims a TFLite model file, see slim_model_data.
+
+    Args:
+        model_file (str): The TFLite model.
+        output_file (str): The slimmed model, default is to replace model_file.
+        keep_metadata (list): Names of the metadata to keep.
+
+    Returns:
+        dict: Report of the removed content and the bytes saved.
+    """
+
+    with open(model_file, "rb") as fp:
+        data = fp.read()
+    slim_data, report = slim_model_data(data, Path(model_file).stem, keep_metadata)
+
+    output_file = output_file or model_file
+    tmp_file = f"{output_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "wb") as fp:
+        fp.write(slim_data)
+    os.replace(tmp_file, output_file)
+    return report
+
+
+def get_slim_argparser():
+    """Parse command line arguments"""
+
+    parser = argparse.ArgumentParser(
+        description="Remove the content TFLite Micro does not use from models."
+    )
+    parser.add_argument("models", nargs="+", help="TFLite models to slim")
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        type=str,
+        required=True,
+        help="Directory of the slimmed models, named like the originals",
+    )
+    parser.add_argument(
+        "--keep-metadata",
+        type=str,
+        nargs="*",
+        default=KEEP_METADATA,
+        help="Names of the metadata to keep",
+    )
+    return parser
+
+
+def main():
+    """Main for the command line model slimming"""
+    parser = get_slim_argparser()
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    reports = []
+    for model_file in args.models:
+        output_file = os.path.join(args.output_dir, Path(model_file).name)
+        reports.append(slim_model(model_file, output_file, args.keep_metadata))
+    print_table(reports, SLIM_TABLE_KEYS)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,396 @@
+"""Long lived compile server keeping the compiler warm between requests"""
+
+import argparse
+import http.client
+import json
+import os
+import shutil
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .sr100_model_compiler import (
+    sr100_model_compiler,
+    sr100_check_model,
+    get_compiler_argparser,
+)
+from .sr100_model_optimizer import sr100_model_optimizer, get_optimizer_argparser
+from .job_scheduler import ResourceScheduler, MemoryEstimates
+
+DEFAULT_SERVER_PORT = 8765
+
+# Arguments holding paths the client makes absolute before sending
+PATH_ARGS = ["model_file", "output_dir", "input", "vela_config_file"]
+
+
+def run_compile_action(args):
+    """Compiles a model and returns the Vela results"""
+
+    results = sr100_model_compiler(**args)
+    return {"success": bool(results and results["cycles_npu"]), "results": results}
+
+
+def run_check_action(args):
+    """Compiles a model and checks it fits onto SR100"""
+
+    success, perf_data = sr100_check_model(sr100_model_compiler(**args))
+    return {"success": success, "results": perf_data}
+
+
+def run_optimize_action(args):
+    """Runs the optimizer on a model"""
+
+    success, perf_data = sr100_model_optimizer(**args)
+    return {"success": success, "results": perf_data}
+
+
+SERVER_ACTIONS = {
+    "compile": run_compile_action,
+    "check": run_check_action,
+    "optimize": run_optimize_action,
+}
+
+
+class CompileService:  # pylint: disable=R0902
+    """Runs compile jobs on a worker pool behind a bounded queue"""
+
+    def __init__(  # pylint: disable=R0913
+        self,
+        workers=None,
+        queue_size=16,
+        jobs_dir=None,
+        keep_jobs=False,
+        memory_estimates=None,
+    ):
+        workers = workers or os.cpu_count()
+        self.scheduler = ResourceScheduler(
+            workers, estimates=MemoryEstimates(memory_estimates)
+        )
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+        self.jobs_dir = jobs_dir or tempfile.mkdtemp(prefix="sr100_jobs_")
+        self.keep_jobs = keep_jobs
+        self.actions = dict(SERVER_ACTIONS)
+        self.lock = threading.Lock()
+        self.status = {"workers": workers, "queue_size": queue_size}
+        self.status.update({"submitted": 0, "completed": 0, "rejected": 0})
+        os.makedirs(self.jobs_dir, exist_ok=True)
+
+    def submit(self, action, args):
+        """Queues a job, returns a future or None when the queue is full"""
+
+        if not self.slots.acquire(blocking=False):  # pylint: disable=R1732
+            with self.lock:
+                self.status["rejected"] += 1
+            return None
+        with self.lock:
+            self.status["submitted"] += 1
+            job_id = self.status["submitted"]
+
+        future = self.executor.submit(self.run_job, job_id, action, dict(args))
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def run_job(self, job_id, action, args):
+        """Runs one job in its own output directory"""
+
+        start = time.perf_counter()
+
+        # Jobs without an output directory get an isolated one
+        job_dir = None
+        if action != "optimize" and not args.get("output_dir"):
+            job_dir = os.path.join(self.jobs_dir, f"job-{job_id:06d}")
+            os.makedirs(job_dir)
+            args["output_dir"] = job_dir
+
+        # Jobs wait for memory as well as for a worker
+        model_file = args.get("model_file", "")
+        try:
+            with self.scheduler.reserve(self.scheduler.estimates.get(model_file)):
+                response = self.actions[action](args)
+            self.scheduler.learn(model_file, response.get("results"))
+            response["status"] = "ok"
+        except (Exception, SystemExit) as e:  # pylint: disable=W0718
+            response = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+
+        if job_dir and self.keep_jobs:
+            response["output_dir"] = job_dir
+        elif job_dir:
+            shutil.rmtree(job_dir, ignore_errors=True)
+
+        with self.lock:
+            self.status["completed"] += 1
+        response["job_id"] = job_id
+        response["elapsed"] = time.perf_counter() - start
+        return response
+
+    def get_status(self):
+        """Gets the job counters of the service"""
+
+        with self.lock:
+            return dict(self.status)
+
+    def shutdown(self):
+        """Waits for the running jobs and stops the workers"""
+
+        self.executor.shutdown(wait=True)
+
+
+class CompileRequestHandler(BaseHTTPRequestHandler):
+    """Handles JSON compile requests, POST /<action> with {"args": {...}}"""
+
+    server_version = "sr100-compile-server"
+
+    def do_GET(self):  # pylint: disable=C0103
+        """Reports the service status"""
+
+        if self.path == "/status":
+            self.send_json(200, self.server.service.get_status())
+        else:
+            self.send_json(404, {"status": "error", "error": "unknown path"})
+
+    def do_POST(self):  # pylint: disable=C0103
+        """Runs a compile, check or optimize request"""
+
+        action = self.path.strip("/")
+        if action not in self.server.service.actions:
+            self.send_json(404, {"status": "error", "error": "unknown action"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError) as e:
+            self.send_json(400, {"status": "error", "error": str(e)})
+            return
+
+        future = self.server.service.submit(action, request.get("args", {}))
+        if future is None:
+            self.send_json(503, {"status": "busy", "error": "job queue is full"})
+            return
+        self.send_json(200, future.result())
+
+    def send_json(self, code, data):
+        """Sends a JSON response"""
+
+        body = json.dumps(data, default=str).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        # Unix socket clients have no address to report
+        print(f"sr100_compile_server: {format % args}")
+
+
+class ThreadingUnixHTTPServer(
+    socketserver.ThreadingMixIn, socketserver.UnixStreamServer
+):
+    """HTTP server listening on a Unix socket"""
+
+    daemon_threads = True
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name = "localhost"  # pylint: disable=W0201
+        self.server_port = 0  # pylint: disable=W0201
+
+
+def create_compile_server(service, socket_path=None, host="127.0.0.1", port=0):
+    """Creates the HTTP server on a Unix socket or on a localhost port"""
+
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = ThreadingUnixHTTPServer(socket_path, CompileRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), CompileRequestHandler)
+        server.daemon_threads = True
+    server.service = service  # pylint: disable=W0201
+    return server
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a Unix socket"""
+
+    def __init__(self, socket_path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def send_server_request(  # pylint: disable=R0913
+    action,
+    args,
+    socket_path=None,
+    *,
+    host="127.0.0.1",
+    port=DEFAULT_SERVER_PORT,
+    timeout=None,
+):
+    """
+    Sends a request to the compile server.
+
+    Args:
+        action (str): One of compile, check or optimize.
+        args (dict): Keyword arguments of sr100_model_compiler or sr100_model_optimizer.
+        socket_path (str): Unix socket of the server, uses host and port if None.
+        host (str): Host of the server.
+        port (int): Port of the server.
+        timeout (float): Seconds to wait for the response, None waits forever.
+
+    Returns:
+        dict: The server response with the status, success and results.
+    """
+
+    if socket_path:
+        connection = UnixHTTPConnection(socket_path, timeout=timeout)
+    else:
+        connection = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        connection.request(
+            "POST",
+            f"/{action}",
+            json.dumps({"args": args}),
+            {"Content-Type": "application/json"},
+        )
+        return json.loads(connection.getresponse().read())
+    finally:
+        connection.close()
+
+
+def add_server_address_args(parser):
+    """Adds the server address arguments shared by the server and the client"""
+
+    parser.add_argument(
+        "--server-socket", type=str, help="Unix socket of the compile server"
+    )
+    parser.add_argument(
+        "--server-port",
+        type=int,
+        default=DEFAULT_SERVER_PORT,
+        help="Localhost port of the compile server, used without --server-socket",
+    )
+
+
+def get_server_argparser():
+    """Parse command line arguments"""
+
+    parser = argparse.ArgumentParser(
+        description="Keeps the SR100 compiler warm and serves compile requests."
+    )
+    add_server_address_args(parser)
+    parser.add_argument(
+        "-j", "--workers", type=int, help="Number of jobs running at the same time"
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=16,
+        help="Number of jobs waiting for a worker before requests are rejected",
+    )
+    parser.add_argument(
+        "--jobs-dir", type=str, help="Directory for the per job output directories"
+    )
+    parser.add_argument(
+        "--memory-estimates",
+        type=str,
+        help="File keeping the Vela memory of past jobs to admit new ones",
+    )
+    parser.add_argument(
+        "--keep-jobs",
+        action="store_true",
+        help="Keeps the per job output directories after the response",
+    )
+    return parser
+
+
+def main():
+    """Main for the compile server"""
+    parser = get_server_argparser()
+    args = parser.parse_args()
+
+    # Loads TensorFlow up front so the first request is as fast as the rest
+    import tensorflow  # pylint: disable=C0415,W0611
+
+    service = CompileService(
+        args.workers,
+        args.queue_size,
+        args.jobs_dir,
+        args.keep_jobs,
+        args.memory_estimates,
+    )
+    server = create_compile_server(service, args.server_socket, port=args.server_port)
+    print(f"sr100_compile_server listening on {args.server_socket or args.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
+
+
+def client_main():
+    """Main for the compile client, takes the same arguments as the CLI"""
+
+    # The action decides which command line the rest of the arguments follow
+    action_parser = argparse.ArgumentParser(add_help=False)
+    action_parser.add_argument(
+        "--action", choices=list(SERVER_ACTIONS.keys()), default="check"
+    )
+    action_args, _ = action_parser.parse_known_args()
+
+    if action_args.action == "optimize":
+        parser = get_optimizer_argparser()
+    else:
+        parser = get_compiler_argparser()
+    parser.add_argument(
+        "--action",
+        choices=list(SERVER_ACTIONS.keys()),
+        default="check",
+        help="Request to send to the compile server",
+    )
+    add_server_address_args(parser)
+    args = vars(parser.parse_args())
+
+    action = args.pop("action")
+    socket_path = args.pop("server_socket")
+    port = args.pop("server_port")
+    for key in PATH_ARGS:
+        if isinstance(args.get(key), list):
+            args[key] = [os.path.abspath(path) for path in args[key]]
+        elif args.get(key):
+            args[key] = os.path.abspath(args[key])
+
+    response = send_server_request(action, args, socket_path, port=port)
+    if response["status"] != "ok":
+        print(f"ERROR:: {response['status']} {response.get('error', '')}")
+        return 1
+
+    if response["success"]:
+        print(f"Successfully mapped {args['model_file']} onto sr100")
+    else:
+        print(f"ERROR:: Failed to map {args['model_file']} onto sr100")
+    for key, value in (response["results"] or {}).items():
+        if key != "vela_log":
+            print(f"   {key} = {value}")
+    print(f"   server_elapsed = {response['elapsed']:.3f}")
+
+    return 0 if response["success"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
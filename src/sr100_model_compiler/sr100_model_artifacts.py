@@ -0,0 +1,139 @@
+"""Compiler entry function returning the generated files as in-memory buffers"""
+
+import os
+import tempfile
+import uuid
+from pathlib import Path
+
+from .sr100_model_compiler import (
+    compiler_main,
+    get_args_from_call,
+    get_compiler_argparser,
+    get_scratch_dir,
+    sr100_check_model,
+)
+from .run_artifacts import read_run_manifest
+
+
+def read_buffer(path):
+    """Reads a file into a memoryview without an extra copy"""
+
+    buffer = bytearray(os.path.getsize(path))
+    with open(path, "rb", buffering=0) as fp:
+        fp.readinto(buffer)
+    return memoryview(buffer)
+
+
+class CompileArtifacts:
+    """Results, performance data and generated files of a compile held in memory"""
+
+    def __init__(self, args, results, files):
+        self.results = results
+        self.success, self.perf_data = sr100_check_model(results)
+        self.files = files
+
+        # Generated file of each artifact, see get
+        model_name = Path(args.model_file).stem
+        self.names = {
+            "tflite": f"{model_name}_vela.tflite",
+            "bin": f"{model_name}.bin",
+            "model_cc": f"{args.model_file_out}.cc",
+            "model_asm": f"{args.model_file_out}.S",
+            "io_cc": f"{args.model_file_out}_io.cc",
+            "resolver": f"{args.model_namespace}_micro_mutable_op_resolver.hpp",
+        }
+
+    def get(self, artifact):
+        """Gets an artifact by its name in names, or a file name, None if missing"""
+
+        return self.files.get(self.names.get(artifact, artifact))
+
+    @property
+    def tflite(self):
+        """Vela optimized model"""
+        return self.get("tflite")
+
+    @property
+    def bin(self):
+        """Flash image of the optimized model"""
+        return self.get("bin")
+
+    @property
+    def model_cc(self):
+        """Model source with the op resolver"""
+        return self.get("model_cc")
+
+    @property
+    def io_cc(self):
+        """Input and expected output source, None unless the inout script ran"""
+        return self.get("io_cc")
+
+    @property
+    def resolver(self):
+        """Op resolver header"""
+        return self.get("resolver")
+
+    def write(self, output_dir, artifacts=None):
+        """
+        Writes the files to a directory, each one replaced atomically.
+
+        Args:
+            output_dir (str): Directory to write to, created if needed.
+            artifacts (list): Artifact or file names to write, default is all.
+
+        Returns:
+            list: Paths of the written files.
+        """
+
+        os.makedirs(output_dir, exist_ok=True)
+        if artifacts is None:
+            names = list(self.files)
+        else:
+            names = [self.names.get(artifact, artifact) for artifact in artifacts]
+
+        paths = []
+        for name in names:
+            path = os.path.join(output_dir, name)
+            tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+            with open(tmp_path, "wb") as fp:
+                fp.write(self.files[name])
+            os.replace(tmp_path, path)
+            paths.append(path)
+        return paths
+
+
+def sr100_model_compiler_in_memory(**kwargs):
+    """
+    Compiles a model and returns the generated files as in-memory buffers.
+
+    Vela and the generators run in a RAM backed scratch directory, removed
+    before returning.
+
+    Args:
+        kwargs: sr100_model_compiler arguments, the output directory and
+            metrics_only are ignored, the files are always generated.
+
+    Returns:
+        CompileArtifacts: The results, performance data and a memoryview of
+            every generated file, no files when the model failed validation.
+    """
+
+    parser = get_compiler_argparser()
+    args = get_args_from_call(parser=parser, **kwargs)
+    args.keep_resolver = True
+    args.run_subdir = False
+    args.metrics_only = False
+    with tempfile.TemporaryDirectory(dir=get_scratch_dir()) as scratch_dir:
+        args.output_dir = scratch_dir
+        results = compiler_main(args)
+
+        # Models failing validation return before a run is staged
+        files = {}
+        if results.get("run_id") is not None:
+            manifest = read_run_manifest(scratch_dir, results["run_id"])
+            for entry in manifest["files"]:
+                files[entry["path"]] = read_buffer(f"{scratch_dir}/{entry['path']}")
+
+    # Paths into the scratch directory are gone
+    results["vela_log_file"] = None
+    return CompileArtifacts(args, results, files)
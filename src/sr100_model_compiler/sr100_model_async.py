@@ -0,0 +1,222 @@
+"""Asyncio versions of the compiler and optimizer entry functions"""
+
+import asyncio
+import contextlib
+import tempfile
+import threading
+from functools import partial
+
+from .sr100_model_compiler import (
+    apply_vela_memory_limit,
+    get_vela_failure,
+    get_args_from_call,
+    get_compiler_argparser,
+    get_vela_params,
+    get_vela_log_file,
+    get_vela_results,
+    metrics_scratch,
+    prepare_compile,
+    run_synai,
+    finish_compile,
+    finish_metrics,
+    record_stage_timings,
+    time_stage,
+    VelaLogStream,
+)
+from .sr100_model_optimizer import get_optimizer_argparser, run_optimizer
+from .run_artifacts import publish_run_artifacts, stage_run_artifacts
+from .model_validation import validate_compile
+
+# Longest line of Vela output read at once
+VELA_LINE_LIMIT = 1024 * 1024
+
+
+def get_limiter(concurrency):
+    """Gets a semaphore from a concurrency limit, semaphores are used as is"""
+
+    if concurrency is None or isinstance(concurrency, asyncio.Semaphore):
+        return concurrency
+    return asyncio.Semaphore(concurrency)
+
+
+async def run_stage(func, *args):
+    """Runs a blocking stage in the default executor"""
+
+    future = asyncio.get_running_loop().run_in_executor(None, partial(func, *args))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        # Threads cannot be interrupted, let the stage end before cleaning up
+        await asyncio.wait([future])
+        future.exception()
+        raise
+
+
+async def stream_vela_output(process, vela_log):
+    """Writes the Vela output to the log until Vela exits"""
+
+    async for line in process.stdout:
+        vela_log.write(line.decode("utf-8", errors="replace"))
+    await process.wait()
+
+
+async def run_vela_async(script_dir, args):
+    """Run the vela compiler without blocking the event loop"""
+
+    vela_params = get_vela_params(script_dir, args)
+
+    print("************ VELA ************")
+    process = await asyncio.create_subprocess_exec(
+        *vela_params,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        limit=VELA_LINE_LIMIT,
+    )
+    apply_vela_memory_limit(process, args.vela_memory_limit)
+
+    # Runaway compiles are killed once they pass the timeout
+    timed_out = False
+    try:
+        with VelaLogStream(get_vela_log_file(args), args.vela_verbosity) as vela_log:
+            try:
+                await asyncio.wait_for(
+                    stream_vela_output(process, vela_log), args.vela_timeout
+                )
+            except asyncio.TimeoutError:
+                timed_out = True
+    finally:
+        # Cancelled compiles must not leave Vela running
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+    failure = get_vela_failure(process.returncode, timed_out, vela_log)
+    return await run_stage(get_vela_results, args, vela_log, failure)
+
+
+async def compiler_main_async(args):
+    """Main function with input args, the async counterpart of compiler_main"""
+
+    results = validate_compile(args)
+    if results is not None:
+        return results
+
+    if args.metrics_only and args.compiler == "vela":
+        stage_timings = {}
+        with time_stage(stage_timings, "compile"), metrics_scratch(args) as stage:
+            results = await run_vela_async(stage["script_dir"], args)
+            results = finish_metrics(results, stage)
+        await run_stage(record_stage_timings, args, results, stage_timings)
+        return results
+
+    # Creating a temporary directory if output dir is not provided
+    tmp_dir = None
+    if args.output_dir is None:
+        tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        args.output_dir = tmp_dir.name
+
+    try:
+        results = None
+        stage_timings = {}
+        artifacts = stage_run_artifacts(args)
+        try:
+            with time_stage(stage_timings, "prepare"):
+                stage = prepare_compile(args)
+
+            with time_stage(stage_timings, "compile"):
+                if args.compiler == "vela":
+                    results = await run_vela_async(stage["script_dir"], args)
+                elif args.compiler == "synai":
+                    await run_stage(run_synai, args)
+                else:
+                    print("******* No Compilation *******")
+
+            # Code generation runs the model with TensorFlow, keep it off the loop
+            with time_stage(stage_timings, "generate"):
+                results = await run_stage(finish_compile, args, results, stage)
+        except BaseException:
+            publish_run_artifacts(args, results, artifacts)
+            raise
+        await run_stage(publish_run_artifacts, args, results, artifacts)
+
+        await run_stage(record_stage_timings, args, results, stage_timings)
+        return results
+    finally:
+        if tmp_dir:
+            tmp_dir.cleanup()
+
+
+async def sr100_model_compiler_async(concurrency=None, **kwargs):
+    """
+    Compiles a model without blocking the event loop.
+
+    Cancelling the call kills the Vela process.
+
+    Args:
+        concurrency (int | asyncio.Semaphore): Limits the compiles running at
+            the same time, share a semaphore to limit across calls.
+        kwargs: sr100_model_compiler arguments.
+
+    Returns:
+        dict: The same results as sr100_model_compiler.
+    """
+
+    parser = get_compiler_argparser()
+    args = get_args_from_call(parser=parser, **kwargs)
+
+    async with get_limiter(concurrency) or contextlib.nullcontext():
+        return await compiler_main_async(args)
+
+
+async def sr100_model_optimizer_async(concurrency=None, **kwargs):
+    """
+    Optimizes a model without blocking the event loop.
+
+    The search runs in the default executor and its compiles run on the event
+    loop, cancelling the call kills the running Vela process.
+
+    Args:
+        concurrency (int | asyncio.Semaphore): Limits the compiles running at
+            the same time, share a semaphore to limit across calls.
+        kwargs: sr100_model_optimizer arguments.
+
+    Returns:
+        tuple: The same (success, perf_data) as sr100_model_optimizer.
+    """
+
+    parser = get_optimizer_argparser()
+    args = get_args_from_call(parser, **kwargs)
+    loop = asyncio.get_running_loop()
+    limiter = get_limiter(concurrency)
+    cancelled = threading.Event()
+    compiles = []
+
+    async def run_compile(compile_kwargs):
+        """Runs one compile of the search as a task the caller can cancel"""
+
+        task = asyncio.create_task(
+            sr100_model_compiler_async(concurrency=limiter, **compile_kwargs)
+        )
+        compiles.append(task)
+        if cancelled.is_set():
+            task.cancel()
+        return await task
+
+    def compile_model(**compile_kwargs):
+        """Blocks the search thread until the compile on the event loop is done"""
+
+        return asyncio.run_coroutine_threadsafe(
+            run_compile(compile_kwargs), loop
+        ).result()
+
+    search = loop.run_in_executor(None, run_optimizer, args, compile_model)
+    try:
+        return await asyncio.shield(search)
+    except asyncio.CancelledError:
+        # The search ends once its compile is cancelled and cleaned up
+        cancelled.set()
+        for task in compiles:
+            task.cancel()
+        await asyncio.wait([search])
+        search.exception()
+        raise
@@ -7,9 +7,12 @@ import subprocess
 import tempfile
 from pathlib import Path
 import datetime
-import glob
 import csv
-from jinja2 import Environment, FileSystemLoader
+import collections
+import contextlib
+import signal
+import threading
+import time
 
 # import platform
 from .gen_model_cpp import generate_model_cpp
@@ -17,25 +20,64 @@ from .gen_input_expected_data import generate_input_expected_data
 from .generate_micro_mutable_op_resolver_from_model import (
     generate_micro_mutable_ops_resolver_header,
 )
-from .utils import get_platform_path
-
-
-# Function to expand wildcards in input paths
-def expand_wildcards(file_paths):
-    """expand wildcards"""
-
-    expanded_paths = []
-    for path in file_paths:
-        # Check if the path contains a wildcard
-        if "*" in path:
-            # Expand the wildcard to actual file names and sort them
-            expanded_file_paths = sorted(glob.glob(path))
-            # Extend the list with the sorted paths
-            expanded_paths.extend(expanded_file_paths)
-        else:
-            # If no wildcard, add the path as is
-            expanded_paths.append(path)
-    return expanded_paths
+from .op_set_cache import OpSetCache
+from .model_validation import validate_compile
+from .cpu_fallback import get_cpu_operators, get_custom_op_codes
+from .profile_parser import get_vela_per_layer, PROFILE_MARKER
+from .utils import expand_wildcards, get_args_from_call, get_platform_path
+from .template_registry import get_jinja_env, get_mako_template
+from .compile_history import record_compile
+from .run_artifacts import (
+    publish_run_artifacts,
+    read_run_manifest,
+    stage_run_artifacts,
+)
+from .slim_model import slim_model
+
+try:
+    import resource
+except ImportError:
+    resource = None  # pylint: disable=C0103
+
+# Lines of Vela output kept in memory, the full output is in the _vela.log file
+VELA_LOG_TAIL_LINES = 200
+
+# Vela output showing it ran out of memory or hit its address space limit
+VELA_MEMORY_ERRORS = [
+    "MemoryError",
+    "std::bad_alloc",
+    "Cannot allocate memory",
+    "failed to map segment",
+]
+
+# RAM backed directory for metrics-only compiles, /dev/shm when not set
+SCRATCH_DIR_ENV = "SR100_SCRATCH_DIR"
+
+# Ethos-U accelerator configurations supported by Vela, SR100 is an ethos-u55-128
+ACCELERATOR_CONFIGS = [
+    "ethos-u55-32",
+    "ethos-u55-64",
+    "ethos-u55-128",
+    "ethos-u55-256",
+    "ethos-u65-256",
+    "ethos-u65-512",
+    "ethos-u85-128",
+    "ethos-u85-256",
+    "ethos-u85-512",
+    "ethos-u85-1024",
+    "ethos-u85-2048",
+]
+
+
+def get_synai_ethosu_op_found(model_file):
+    """Gets 1 for a model with Synai custom ops, 2 for Ethos-U ones, 0 otherwise"""
+
+    custom_op_codes = get_custom_op_codes(model_file)
+    if any(code.lower().startswith("synai") for code in custom_op_codes):
+        return 1
+    if any(code.lower().startswith("ethos-u") for code in custom_op_codes):
+        return 2
+    return 0
 
 
 def gen_model_script(new_model_file, args, env, license_header):
@@ -56,9 +98,12 @@ def gen_model_script(new_model_file, args, env, license_header):
         args.model_namespace,
         env,
         license_header,
+        bin_file=f"{args.output_dir}/{Path(args.model_file).stem}.bin",
+        model_format=args.model_format,
     )
 
-    # Generate micro mutable op resolver code
+    # Generate micro mutable op resolver code, the Vela output is staged so
+    # its operator set is looked up by content
     common_path = os.path.dirname(new_model_file)
     if common_path == "":
         common_path = "."
@@ -68,6 +113,9 @@ def gen_model_script(new_model_file, args, env, license_header):
         args.output_dir,
         args.model_namespace,
         license_header,
+        op_set_cache=(
+            OpSetCache(args.op_set_cache, by_path=False) if args.op_set_cache else None
+        ),
     )
 
     # Open the source file in read mode and the destination file in append mode
@@ -84,40 +132,12 @@ def gen_model_script(new_model_file, args, env, license_header):
         # Append the content to the destination file
         destination_file.write(content)
 
-    # Generate on the original file
-    generate_micro_mutable_ops_resolver_header(
-        os.path.dirname(os.path.abspath(args.model_file)),
-        [os.path.basename(args.model_file)],
-        args.output_dir,
-        "orig",
-        license_header,
-    )
+    # Check the original model for custom ops
+    synai_ethosu_op_found = get_synai_ethosu_op_found(args.model_file)
 
-    resolver_file = get_platform_path(
-        args.output_dir + "/" + "orig_micro_mutable_op_resolver.hpp"
-    )
-    with open(resolver_file, "r", encoding="utf-8") as source_file:
-        content = source_file.read()
-        if "AddSynai" in content:
-            synai_ethosu_op_found = 1
-        elif "AddEthosU" in content:
-            synai_ethosu_op_found = 2
-        else:
-            synai_ethosu_op_found = 0
-
-    # Delete micro mutable op resolver file if it exists
-    micro_mutable_file = get_platform_path(
-        args.output_dir + "/" + args.model_file_out + "_micro_mutable_op_resolver.hpp"
-    )
-    if os.path.exists(micro_mutable_file):
-        os.remove(micro_mutable_file)
-
-    # Delete micro mutable op resolver file if it exists
-    micro_mutable_file = get_platform_path(
-        args.output_dir + "/" + "orig_micro_mutable_op_resolver.hpp"
-    )
-    if os.path.exists(micro_mutable_file):
-        os.remove(micro_mutable_file)
+    # Delete the micro mutable op resolver file now it is part of the model source
+    if os.path.exists(src_fn) and not args.keep_resolver:
+        os.remove(src_fn)
 
     return synai_ethosu_op_found
 
@@ -136,21 +156,35 @@ def gen_inout_script(synai_ethosu_op_found, args, license_header):
                 "EthosU custom op found in the model, skipping expected output generation"
             )
     else:
-        if args.input:
-            generate_input_expected_data(
-                args.model_file,
-                args.output_dir,
-                args.model_file_out,
-                license_header,
-                args.input,
-            )
-        else:
-            generate_input_expected_data(
-                args.model_file,
-                args.output_dir,
-                args.model_file_out,
-                license_header,
-            )
+        generate_input_expected_data(
+            args.model_file,
+            args.output_dir,
+            args.model_file_out,
+            license_header,
+            args.input,
+            args.dump_tensors,
+            args.dump_tensors_c,
+        )
+
+
+def gen_profiler_script(args, scripts_to_run, license_header):
+    """Generate the MicroProfiler harness"""
+
+    template = get_mako_template("profiler_harness.cc.mako")
+    output = template.render(
+        common_template_header=license_header,
+        namespace=args.model_namespace,
+        model=os.path.basename(args.model_file),
+        with_inputs="inout" in scripts_to_run,
+        profile_marker=PROFILE_MARKER,
+    )
+
+    filename = get_platform_path(
+        args.output_dir + "/" + args.model_file_out + "_profiler.cc"
+    )
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write(output)
+    print(f"++ Generated profiler harness {filename}")
 
 
 def setup_input(args):
@@ -160,10 +194,10 @@ def setup_input(args):
     if args.input:
         args.input = expand_wildcards(args.input)
 
-    # Detect the model location
-    if args.system_config == "sr100_npu_400MHz_all_vmem":
+    # Detect the model location, generated configs extend the base config name
+    if args.system_config.startswith("sr100_npu_400MHz_all_vmem"):
         model_loc = "vmem"
-    elif args.system_config == "sr100_npu_400MHz_tensor_vmem_weights_lpmem":
+    elif args.system_config.startswith("sr100_npu_400MHz_tensor_vmem_weights_lpmem"):
         model_loc = "lpmem"
     else:
         model_loc = "flash"
@@ -200,16 +234,14 @@ def setup_input(args):
     return args, scripts_to_run, new_model_file, model_name, model_loc
 
 
-def sr100_get_compile_log(out_dir):
-    """Get the Vela log text"""
+def sr100_get_compile_log(out_dir, run_id=None):
+    """Get the Vela log text of a run, the latest one in out_dir by default"""
 
-    # Get the logs
-    logfiles = glob.glob(f"{out_dir}/*vela.log")
-
-    # return ext
+    # The run manifest names the exact log file
+    manifest = read_run_manifest(out_dir, run_id)
     log_text = ""
-    for logfile in logfiles:
-        with open(logfile, "r", encoding="utf-8") as f:
+    if manifest and manifest.get("vela_log_file"):
+        with open(f"{out_dir}/{manifest['vela_log_file']}", "r", encoding="utf-8") as f:
             log_text = f.read()
 
     return log_text
@@ -260,8 +292,12 @@ def sr100_check_model(results_dict):
     perf_data = {
         "core_clock": core_clock,
         "cycles_npu": 0,
+        "cycles_cpu": 0,
         "inferences_per_sec": 0,
         "inference_time": 0,
+        "npu_inference_time": 0,
+        "cpu_inference_time": 0,
+        "cpu_ops": results_dict.get("cpu_ops", []),
         "weights_size": 0,
         "arena_cache_size": 0,
         "vmem_size": 0,
@@ -272,16 +308,25 @@ def sr100_check_model(results_dict):
         "model_loc": results_dict["model_loc"],
         "system_config": results_dict["system_config"],
         "vela_log": results_dict["vela_log"],
+        "vela_log_file": results_dict.get("vela_log_file"),
+        "vela_peak_memory": results_dict.get("vela_peak_memory"),
+        "failure": results_dict.get("failure"),
     }
 
-    # Update performance data
+    # Update performance data, operators left on the CPU add to the NPU time
     cycles_npu = int(float(results_dict["cycles_npu"]))
-    inferences_per_sec = float(results_dict["inferences_per_second"])
-    inference_time = float(results_dict["inference_time"])
+    cycles_cpu = int(results_dict.get("cycles_cpu", 0))
+    npu_inference_time = float(results_dict["inference_time"])
+    cpu_inference_time = cycles_cpu / core_clock
+    inference_time = npu_inference_time + cpu_inference_time
 
     perf_data["cycles_npu"] = cycles_npu
-    perf_data["inferences_per_sec"] = inferences_per_sec
+    perf_data["cycles_cpu"] = cycles_cpu
+    # Vela summaries of models left on the CPU have no time without its cycles
+    perf_data["inferences_per_sec"] = 1.0 / inference_time if inference_time else 0
     perf_data["inference_time"] = inference_time
+    perf_data["npu_inference_time"] = npu_inference_time
+    perf_data["cpu_inference_time"] = cpu_inference_time
 
     perf_data["weights_size"] = int(
         float(results_dict["off_chip_flash_memory_used"]) * 1024
@@ -309,10 +354,13 @@ def sr100_check_model(results_dict):
     return success, perf_data
 
 
-def run_vela(script_dir, args):
-    """Run the vela compiler"""
+def get_vela_params(script_dir, args):
+    """Get the vela command line"""
 
-    arm_config = get_platform_path(f"{script_dir}/config/sr100_system_config.ini")
+    if args.vela_config_file:
+        arm_config = args.vela_config_file
+    else:
+        arm_config = get_platform_path(f"{script_dir}/config/sr100_system_config.ini")
     memory_mode = "--memory-mode=memory_sr100"
 
     # Generate vela optimized model
@@ -320,7 +368,7 @@ def run_vela(script_dir, args):
         "vela",
         "--output-dir",
         args.output_dir,
-        "--accelerator-config=ethos-u55-128",
+        f"--accelerator-config={args.accelerator_config}",
         "--optimise=" + args.optimize,
         f"--config={arm_config}",
         memory_mode,
@@ -332,18 +380,99 @@ def run_vela(script_dir, args):
         vela_params.append("--verbose-cycle-estimate")
     if args.verbose_all:
         vela_params.append("--verbose-all")
+    if args.profiler_harness:
+        vela_params.append("--verbose-performance")
     vela_params.append(args.model_file)
 
-    print("************ VELA ************")
-    vela_log = ""
+    return vela_params
+
+
+class VelaLogStream:
+    """Streams the Vela output to the log file keeping a bounded tail in memory"""
+
+    def __init__(self, log_file, verbosity="all"):
+        self.log_file = log_file
+        self.verbosity = verbosity
+        self.tail = collections.deque(maxlen=VELA_LOG_TAIL_LINES)
+        # Vela creates the output directory, the log is opened before it runs
+        os.makedirs(os.path.dirname(log_file), exist_ok=True)
+        self.fp = open(log_file, "w", encoding="utf-8")  # pylint: disable=R1732
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.fp.close()
+        if self.verbosity == "tail":
+            print(self.get_tail(), end="")
+
+    def write(self, line):
+        """Writes one line of Vela output"""
+
+        self.fp.write(line)
+        self.tail.append(line)
+        if self.verbosity == "all":
+            print(line, end="")
+
+    def get_tail(self):
+        """Gets the last lines of the Vela output"""
+
+        return "".join(self.tail)
+
+
+def get_vela_log_file(args):
+    """Get the path of the Vela log file"""
+
+    model_name = args.model_file.split("/")[-1].replace(".tflite", "")
+    return f"{args.output_dir}/{model_name}_vela.log"
+
+
+def apply_vela_memory_limit(process, memory_limit):
+    """Caps the address space of the Vela process where the OS supports it"""
+
+    if not memory_limit or not hasattr(resource, "prlimit"):
+        return
     try:
-        vela_result = subprocess.run(vela_params, capture_output=True, check=True)
-        vela_log += vela_result.stdout.decode("utf-8")
-        vela_log += "\n"
-        vela_log += vela_result.stderr.decode("utf-8")
+        resource.prlimit(process.pid, resource.RLIMIT_AS, (memory_limit, memory_limit))
+    except ProcessLookupError:
+        # Vela already exited
+        pass
+
+
+def wait_vela(process):
+    """Waits for Vela to exit, returns its peak memory in bytes or None"""
+
+    if not hasattr(os, "wait4"):
+        process.wait()
+        return None
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # Linux reports KiB, macOS bytes
+    return usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+
+def get_vela_failure(returncode, timed_out, vela_log):
+    """Gets the kind of a Vela failure, None when it succeeded"""
+
+    if returncode == 0:
+        return None
+    if timed_out:
+        return "timeout"
+    # The kernel OOM killer ends processes with SIGKILL
+    if returncode == -signal.SIGKILL or any(
+        error in vela_log.get_tail() for error in VELA_MEMORY_ERRORS
+    ):
+        return "memory"
+    return "error"
+
 
+def get_vela_results(args, vela_log, failure):
+    """Parses the Vela outputs, the log only holds its tail in the results"""
+
+    model_name = args.model_file.split("/")[-1].replace(".tflite", "")
+
+    if failure is None:
         # Grab the summary file
-        model_name = args.model_file.split("/")[-1].replace(".tflite", "")
         summary_file = (
             f"{args.output_dir}/{model_name}_summary_{args.system_config}.csv"
         )
@@ -351,52 +480,98 @@ def run_vela(script_dir, args):
         results["vmem_size_limit"] = args.vmem_size_limit
         results["lpmem_size_limit"] = args.lpmem_size_limit
 
-    except subprocess.CalledProcessError as e:
-        print("Compilation failed:")
+        # Per layer estimates are only written with --verbose-performance
+        per_layer_file = f"{args.output_dir}/{model_name}_per-layer.csv"
+        if os.path.exists(per_layer_file):
+            results["per_layer"] = get_vela_per_layer(per_layer_file)
+    else:
+        print(f"Compilation failed: {failure}")
         results = {"cycles_npu": 0}
-        vela_log += e.stdout.decode("utf-8")
-        vela_log += "\n"
-        vela_log += e.stderr.decode("utf-8")
+    results["failure"] = failure
 
-    # print the log
-    results["vela_log"] = vela_log
-    print(vela_log)
-
-    # Store the logs as well
-    with open(f"{args.output_dir}/{model_name}_vela.log", "w", encoding="utf-8") as fp:
-        fp.write(vela_log)
+    # The full log is read from the file with sr100_get_compile_log
+    results["vela_log"] = vela_log.get_tail()
+    results["vela_log_file"] = vela_log.log_file
     print("********* END OF VELA *********")
 
     return results
 
 
-def compiler_main(args):  # pylint: disable=R0914
-    """Main function with input args"""
+def kill_vela(process, timed_out):
+    """Kills a Vela process that ran past its timeout"""
 
-    # Creating a temporary directory if output dir is not provided
-    tmp_dir = None
-    if args.output_dir is None:
-        tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
-        args.output_dir = tmp_dir.name
+    if process.returncode is None:
+        timed_out.set()
+        process.kill()
+
+
+def run_vela(script_dir, args):
+    """Run the vela compiler"""
+
+    vela_params = get_vela_params(script_dir, args)
+
+    print("************ VELA ************")
+    with (
+        VelaLogStream(get_vela_log_file(args), args.vela_verbosity) as vela_log,
+        subprocess.Popen(
+            vela_params,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            encoding="utf-8",
+            errors="replace",
+        ) as process,
+    ):
+        apply_vela_memory_limit(process, args.vela_memory_limit)
+
+        # Runaway compiles are killed once they pass the timeout
+        timed_out = threading.Event()
+        timer = None
+        if args.vela_timeout:
+            timer = threading.Timer(args.vela_timeout, kill_vela, (process, timed_out))
+            timer.start()
+        for line in process.stdout:
+            vela_log.write(line)
+        peak_memory = wait_vela(process)
+        if timer:
+            timer.cancel()
+
+    failure = get_vela_failure(process.returncode, timed_out.is_set(), vela_log)
+    results = get_vela_results(args, vela_log, failure)
+    results["vela_peak_memory"] = peak_memory
+    return results
+
+
+def add_cpu_operators(results, new_model_file):
+    """Add the operators Vela left on the CPU to the results"""
+
+    results["cpu_ops"], results["cycles_cpu"] = get_cpu_operators(new_model_file)
+    for cpu_op in results["cpu_ops"]:
+        print(
+            f"WARNING:: {cpu_op['op']} {cpu_op['name']} runs on the CPU, "
+            f"estimated {cpu_op['cycles']} cycles"
+        )
+
+
+def slim_compiled_model(results, new_model_file):
+    """Slims the Vela output before it is embedded, see slim_model"""
+
+    results["slim"] = slim_model(new_model_file)
+    print(
+        f"++ Slimmed {Path(new_model_file).name}, "
+        f"saved {results['slim']['bytes_saved']} bytes"
+    )
+
+
+def prepare_compile(args):
+    """Sets up the inputs and the license header of a compile"""
 
-    results = None
-    synai_ethosu_op_found = 0
     args, scripts_to_run, new_model_file, _, model_loc = setup_input(args)
 
     # Get the path to the directory containing this script
     script_dir = Path(__file__).parent
 
-    print(f"script_dir = {script_dir}")
-    files = glob.glob(f"{script_dir}/*")
-    for file in files:
-        print(f"file {file}")
-
-    # Initialize Jinja2 environment
-    env = Environment(
-        loader=FileSystemLoader(script_dir / "templates"),
-        trim_blocks=True,
-        lstrip_blocks=True,
-    )
+    # Templates are compiled once and shared by every compile in the process
+    env = get_jinja_env()
     header_template = env.get_template("header_template.txt")
     license_header = header_template.render(
         script_name=script_dir.name,
@@ -405,64 +580,170 @@ def compiler_main(args):  # pylint: disable=R0914
         year=datetime.datetime.now().year,
     )
 
+    return {
+        "script_dir": script_dir,
+        "scripts_to_run": scripts_to_run,
+        "new_model_file": new_model_file,
+        "model_loc": model_loc,
+        "env": env,
+        "license_header": license_header,
+    }
+
+
+def run_synai(args):
+    """Run the synai compiler"""
+
+    # Generate synai optimized model
+    print("*********** SYNAI **********")
+    synai_params = [
+        "synai",
+        "--output-dir",
+        os.path.dirname(args.model_file),
+        args.model_file,
+    ]
+    subprocess.run(synai_params, check=True)
+    print("******** END OF SYNAI ********")
+
+
+def finish_compile(args, results, stage):
+    """Generates the sources of a compiled model"""
+
+    synai_ethosu_op_found = 0
     if args.compiler == "vela":
-        results = run_vela(script_dir, args)
-        results["model_loc"] = model_loc
-    elif args.compiler == "synai":
-        # Generate synai optimized model
-        print("*********** SYNAI **********")
-        synai_params = [
-            "synai",
-            "--output-dir",
-            os.path.dirname(args.model_file),
-            args.model_file,
-        ]
-        subprocess.run(synai_params, check=True)
-        print("******** END OF SYNAI ********")
-    else:
-        print("******* No Compilation *******")
+        results["model_loc"] = stage["model_loc"]
+        if results["cycles_npu"]:
+            if args.slim:
+                slim_compiled_model(results, stage["new_model_file"])
+            add_cpu_operators(results, stage["new_model_file"])
 
     # Run the selected scripts if it compiled
     if results["cycles_npu"]:
-        for script in scripts_to_run:
+        for script in stage["scripts_to_run"]:
             if script == "model":
                 synai_ethosu_op_found = gen_model_script(
-                    new_model_file, args, env, license_header
+                    stage["new_model_file"], args, stage["env"], stage["license_header"]
                 )
             elif script == "inout":
-                gen_inout_script(synai_ethosu_op_found, args, license_header)
+                gen_inout_script(synai_ethosu_op_found, args, stage["license_header"])
+        if args.profiler_harness:
+            gen_profiler_script(args, stage["scripts_to_run"], stage["license_header"])
 
-    # Cleaning up the temporary directory if it was created
-    if tmp_dir:
-        tmp_dir.cleanup()
+    return results
+
+
+@contextlib.contextmanager
+def time_stage(stage_timings, stage):
+    """Adds the run time of a compile stage in seconds to the stage timings"""
+
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_timings[stage] = time.perf_counter() - start_time
+
+
+def record_stage_timings(args, results, stage_timings):
+    """Adds the stage timings to the results and records the compile history"""
+
+    if results is None:
+        return
+    results["stage_timings"] = stage_timings
+    if args.history_db:
+        success, perf_data = sr100_check_model(results)
+        record_compile(args.history_db, args, results, perf_data, success)
+
+
+def get_scratch_dir():
+    """Gets a RAM backed directory for metrics-only compiles, None if there is none"""
 
+    for scratch_dir in [os.environ.get(SCRATCH_DIR_ENV), "/dev/shm"]:
+        if (
+            scratch_dir
+            and os.path.isdir(scratch_dir)
+            and os.access(scratch_dir, os.W_OK)
+        ):
+            return scratch_dir
+    return None
+
+
+@contextlib.contextmanager
+def metrics_scratch(args):
+    """Points a metrics-only compile at a scratch directory removed afterwards"""
+
+    output_dir = args.output_dir
+    with tempfile.TemporaryDirectory(dir=get_scratch_dir()) as scratch_dir:
+        args.output_dir = scratch_dir
+        try:
+            _, _, new_model_file, _, model_loc = setup_input(args)
+            yield {
+                "script_dir": Path(__file__).parent,
+                "new_model_file": new_model_file,
+                "model_loc": model_loc,
+            }
+        finally:
+            args.output_dir = output_dir
+
+
+def finish_metrics(results, stage):
+    """Completes the results of a metrics-only compile without generating sources"""
+
+    results["model_loc"] = stage["model_loc"]
+    if results["cycles_npu"]:
+        add_cpu_operators(results, stage["new_model_file"])
+    # The log goes with the scratch directory, its tail stays in the results
+    results["vela_log_file"] = None
     return results
 
 
-def get_argparse_defaults(parser: argparse.ArgumentParser) -> dict:
-    """
-    Return a dictionary of all argparse defaults for the given parser.
-    """
-    return {
-        action.dest: action.default
-        for action in parser._actions  # pylint: disable=W0212
-        if action.dest != "help"
-    }
+def compiler_main(args):
+    """Main function with input args"""
 
+    # Models bound to fail are reported before the slow stages run
+    results = validate_compile(args)
+    if results is not None:
+        return results
 
-def get_args_from_call(parser, **kwargs):
-    """get kwargs and merges with default args"""
+    if args.metrics_only and args.compiler == "vela":
+        stage_timings = {}
+        with time_stage(stage_timings, "compile"), metrics_scratch(args) as stage:
+            results = finish_metrics(run_vela(stage["script_dir"], args), stage)
+        record_stage_timings(args, results, stage_timings)
+        return results
 
-    # Get default args
-    arg_defaults = get_argparse_defaults(parser)
+    # Creating a temporary directory if output dir is not provided
+    tmp_dir = None
+    if args.output_dir is None:
+        tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        args.output_dir = tmp_dir.name
 
-    # Update inputs with defaults
-    for key in arg_defaults.keys():
-        if key not in kwargs:
-            kwargs[key] = arg_defaults[key]
+    results = None
+    stage_timings = {}
+    artifacts = stage_run_artifacts(args)
+    try:
+        with time_stage(stage_timings, "prepare"):
+            stage = prepare_compile(args)
+
+        with time_stage(stage_timings, "compile"):
+            if args.compiler == "vela":
+                results = run_vela(stage["script_dir"], args)
+            elif args.compiler == "synai":
+                run_synai(args)
+            else:
+                print("******* No Compilation *******")
+
+        with time_stage(stage_timings, "generate"):
+            results = finish_compile(args, results, stage)
+    finally:
+        # Partial outputs of a failed compile are published for debugging
+        publish_run_artifacts(args, results, artifacts)
 
-    args = argparse.Namespace(**kwargs)
-    return args
+    record_stage_timings(args, results, stage_timings)
+
+    # Cleaning up the temporary directory if it was created
+    if tmp_dir:
+        tmp_dir.cleanup()
+
+    return results
 
 
 def sr100_model_compiler(**kwargs):
@@ -471,14 +752,6 @@ def sr100_model_compiler(**kwargs):
     # Get default args
     parser = get_compiler_argparser()
     args = get_args_from_call(parser=parser, **kwargs)
-    # parser = get_argparser()
-    # arg_defaults = get_argparse_defaults(parser)
-
-    # Update inputs with defaults
-    # for key in arg_defaults.keys():
-    #    if key not in kwargs:
-    #        kwargs[key] = arg_defaults[key]
-    # args = argparse.Namespace(**kwargs)
     return compiler_main(args)
 
 
@@ -503,6 +776,18 @@ def get_compiler_argparser():
         ],
         help="Sets system config selection",
     )
+    parser.add_argument(
+        "--accelerator-config",
+        type=str,
+        default="ethos-u55-128",
+        choices=ACCELERATOR_CONFIGS,
+        help="Sets the Ethos-U accelerator configuration",
+    )
+    parser.add_argument(
+        "--vela-config-file",
+        type=str,
+        help="Sets the Vela config file holding the system config, default is SR100",
+    )
     parser.add_argument(
         "--vmem-size-limit",
         type=int,
@@ -521,6 +806,36 @@ def get_compiler_argparser():
         type=str,
         help="Directory to output generated files",
     )
+    parser.add_argument(
+        "--keep-resolver",
+        action="store_true",
+        help="Keeps the op resolver header that is appended to the model source",
+    )
+    parser.add_argument(
+        "--skip-validation",
+        action="store_true",
+        help="Skips the checks of the model that run before the compile",
+    )
+    parser.add_argument(
+        "--op-set-cache",
+        type=str,
+        help="Index of the model operator sets reused by the resolver generation",
+    )
+    parser.add_argument(
+        "--metrics-only",
+        action="store_true",
+        help="Runs Vela in a RAM scratch directory and only returns its metrics",
+    )
+    parser.add_argument(
+        "--run-id",
+        type=str,
+        help="Names the run manifest of the compile, default is unique per compile",
+    )
+    parser.add_argument(
+        "--run-subdir",
+        action="store_true",
+        help="Publishes the files into <output-dir>/<run-id> so runs never share names",
+    )
     parser.add_argument(
         "--model-namespace",
         type=str,
@@ -534,6 +849,13 @@ def get_compiler_argparser():
         help="Name of the output cc file for the model",
         default="model",
     )
+    parser.add_argument(
+        "--model-format",
+        type=str,
+        choices=["array", "incbin"],
+        default="array",
+        help="Embeds the model as a C array, or as a .S file including the .bin file",
+    )
     parser.add_argument(
         "-s",
         "--script",
@@ -566,6 +888,28 @@ def get_compiler_argparser():
         action="store_true",
         help="Turns on verbose all for the compiler",
     )
+    parser.add_argument(
+        "--vela-verbosity",
+        type=str,
+        choices=["all", "tail", "none"],
+        default="all",
+        help="Vela output echoed to the console, the full output is in the _vela.log file",
+    )
+    parser.add_argument(
+        "--vela-timeout",
+        type=float,
+        help="Kills Vela after this many seconds, the results report a timeout",
+    )
+    parser.add_argument(
+        "--vela-memory-limit",
+        type=int,
+        help="Caps the Vela address space in bytes, the results report a memory failure",
+    )
+    parser.add_argument(
+        "--history-db",
+        type=str,
+        help="Records the compile into an SQLite history, see sr100_model_history",
+    )
     parser.add_argument(
         "--verbose-cycle-estimate",
         action="store_true",
@@ -580,6 +924,38 @@ def get_compiler_argparser():
         default="Size",
         required=False,
     )
+    parser.add_argument(
+        "--profiler-harness",
+        action="store_true",
+        help="Generates a MicroProfiler harness and the Vela per-layer estimates",
+    )
+    parser.add_argument(
+        "--dump-tensors",
+        type=str,
+        nargs="+",
+        help="Dumps the tensors matching these indexes or name patterns with inout",
+    )
+    parser.add_argument(
+        "--dump-tensors-c",
+        action="store_true",
+        help="Also dumps the tensors as C arrays",
+    )
+    parser.add_argument(
+        "--slim",
+        action="store_true",
+        help="Removes the metadata, signature defs and unused buffers of the Vela output",
+    )
+    parser.add_argument(
+        "--watch",
+        type=str,
+        nargs="*",
+        help="Recompiles the model, and the models matching these globs, when they change",
+    )
+    parser.add_argument(
+        "--watch-poll",
+        type=float,
+        help="Polls for changes every this many seconds instead of using inotify",
+    )
 
     return parser
 
@@ -589,6 +965,12 @@ def main():
     parser = get_compiler_argparser()
     args = parser.parse_args()
 
+    if args.watch is not None:
+        # The watch mode compiles models with compiler_main
+        from .model_watch import watch_models  # pylint: disable=C0415,R0401
+
+        return watch_models(args)
+
     # Runs the vela compiler
     results = compiler_main(args)
 
@@ -0,0 +1,349 @@
+"""Compares two sets of compile results and flags performance regressions"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+from pathlib import Path
+
+from .sr100_model_compiler import sr100_check_model
+from .utils import print_table
+
+# Metrics compared per model, lower is better for all of them. Sizes are in
+# bytes and inference_time in seconds, with the time of the operators left on
+# the CPU when the results hold their cycles, see sr100_check_model
+DIFF_METRICS = ["cycles_npu", "inference_time", "weights_size", "arena_cache_size"]
+
+# Metric of the per-layer comparison, thresholds default to the cycles_npu ones
+LAYER_METRIC = "layer_cycles"
+
+# Statuses failing the diff
+REGRESSION_STATUSES = ["regressed", "missing", "failed"]
+
+DIFF_TABLE_KEYS = [
+    "model",
+    "layer",
+    "metric",
+    "old",
+    "new",
+    "delta",
+    "relative",
+    "status",
+]
+
+
+def get_perf_entry(model, config, results):
+    """
+    Gets a model entry with the metrics in the units of sr100_check_model.
+
+    Args:
+        model (str): Model name.
+        config (str): Accelerator or system config the model was compiled for.
+        results (dict): Raw compile results or a Vela summary, with sizes in
+            KiB, or performance data of the optimizer or a sweep row.
+
+    Returns:
+        dict: The model, config, failed state and metrics.
+    """
+
+    # Models left on the CPU have no NPU cycles but compiled, a failed compile
+    # has a failure or neither the Vela summary nor performance data
+    entry = {"model": model, "config": config, "failed": False}
+    has_metrics = "off_chip_flash_memory_used" in results or "weights_size" in results
+    if results.get("failure") or not has_metrics:
+        entry["failed"] = True
+        entry.update({key: 0.0 for key in DIFF_METRICS})
+        return entry
+
+    if "off_chip_flash_memory_used" in results:
+        # Limits and the location only set the fit, not the compared metrics
+        _, results = sr100_check_model(
+            {
+                "vmem_size_limit": 0,
+                "lpmem_size_limit": 0,
+                "model_loc": None,
+                "system_config": config,
+                "vela_log": "",
+                **results,
+            }
+        )
+    for key in DIFF_METRICS:
+        value = results.get(key)
+        # Sweeps report the arena in use, compile results the configured one
+        if value is None and key == "arena_cache_size":
+            value = results.get("arena_size")
+        entry[key] = float(value or 0)
+    return entry
+
+
+def get_summary_entry(summary_file):
+    """Reads a model entry from a Vela summary and its per-layer CSV"""
+
+    with open(summary_file, "r", newline="", encoding="utf-8") as csvfile:
+        summary = next(csv.DictReader(csvfile))
+    entry = get_perf_entry(summary["network"], summary["system_config"], summary)
+
+    per_layer_file = f"{os.path.dirname(summary_file)}/{entry['model']}_per-layer.csv"
+    if os.path.exists(per_layer_file):
+        with open(per_layer_file, "r", newline="", encoding="utf-8") as csvfile:
+            entry["per_layer"] = list(csv.DictReader(csvfile))
+    return entry
+
+
+def get_results_entry(results):
+    """Gets a model entry from compile results, optimizer or sweep rows"""
+
+    model = results.get("model") or results.get("model_name") or results.get("network")
+    if model is None and results.get("model_file"):
+        model = Path(results["model_file"]).stem
+    entry = get_perf_entry(
+        model,
+        results.get("accelerator_config") or results.get("system_config"),
+        results,
+    )
+    if results.get("per_layer"):
+        entry["per_layer"] = results["per_layer"]
+    return entry
+
+
+def load_report(path):
+    """
+    Loads the model entries of a result set.
+
+    Args:
+        path (str): A compile output directory, searched recursively for Vela
+            summaries, a sweep CSV or a JSON file with one result, a list of
+            results or results keyed by model name.
+
+    Returns:
+        dict: Model entries keyed by model name, or by model name and
+            configuration when a model was compiled for several ones.
+    """
+
+    if os.path.isdir(path):
+        summary_files = glob.glob(f"{path}/**/*_summary_*.csv", recursive=True)
+        entries = [get_summary_entry(summary) for summary in sorted(summary_files)]
+    elif path.endswith(".csv"):
+        with open(path, "r", newline="", encoding="utf-8") as csvfile:
+            entries = [get_results_entry(row) for row in csv.DictReader(csvfile)]
+    else:
+        with open(path, "r", encoding="utf-8") as fp:
+            report = json.load(fp)
+        if isinstance(report, dict) and "cycles_npu" in report:
+            report = [report]
+        elif isinstance(report, dict):
+            report = [{"model": model, **results} for model, results in report.items()]
+        entries = [get_results_entry(results) for results in report]
+
+    models = [entry["model"] for entry in entries]
+    report = {}
+    for entry in entries:
+        key = entry["model"]
+        if models.count(key) > 1:
+            key = f"{key}/{entry['config']}"
+        report[key] = entry
+    return report
+
+
+def get_layer_cycles(entry):
+    """Gets the Vela cycle estimate of every layer keyed by its output name"""
+
+    return {row["Name"]: float(row["Op Cycles"]) for row in entry.get("per_layer", [])}
+
+
+def get_diff_row(model, layer, metric, values, threshold):
+    """Classifies the change of (old, new) values against (absolute, relative) thresholds"""
+
+    old, new = values
+    abs_threshold, rel_threshold = threshold
+    delta = new - old
+    relative = delta / old if old else (float("inf") if delta else 0.0)
+    status = "ok"
+    if delta > abs_threshold and relative > rel_threshold:
+        status = "regressed"
+    elif -delta > abs_threshold and -relative > rel_threshold:
+        status = "improved"
+    return {
+        "model": model,
+        "layer": layer,
+        "metric": metric,
+        "old": old,
+        "new": new,
+        "delta": delta,
+        "relative": relative,
+        "status": status,
+    }
+
+
+def sr100_model_diff(
+    old_report, new_report, abs_threshold=0, rel_threshold=0, thresholds=None
+):
+    """
+    Compares two result sets model by model and layer by layer.
+
+    A metric regresses when it grows by more than both the absolute and the
+    relative threshold. A model failing to compile in the new result set
+    fails the diff, one that failed in the old set only is reported fixed.
+
+    Args:
+        old_report (str | dict): Baseline result set path, or loaded report.
+        new_report (str | dict): New result set path, or loaded report.
+        abs_threshold (float): Default absolute growth allowed.
+        rel_threshold (float): Default relative growth allowed, 0.01 is 1%.
+        thresholds (dict): Metric name, or layer_cycles, mapped to its
+            (absolute, relative) thresholds.
+
+    Returns:
+        list: One row per model metric and per changed layer with the old and
+            new values, the change and its status.
+    """
+
+    if not isinstance(old_report, dict):
+        old_report = load_report(old_report)
+    if not isinstance(new_report, dict):
+        new_report = load_report(new_report)
+    thresholds = thresholds or {}
+
+    def get_threshold(metric):
+        if metric == LAYER_METRIC and metric not in thresholds:
+            metric = "cycles_npu"
+        return thresholds.get(metric, (abs_threshold, rel_threshold))
+
+    rows = []
+    for model, old in old_report.items():
+        new = new_report.get(model)
+        # Metrics of a failed compile are not compared, they are all 0
+        if new is None or new["failed"] or old["failed"]:
+            if new is None:
+                status = "missing"
+            else:
+                status = "failed" if new["failed"] else "fixed"
+            rows.append({"model": model, "layer": "-", "metric": "-", "status": status})
+            continue
+
+        for metric in DIFF_METRICS:
+            rows.append(
+                get_diff_row(
+                    model,
+                    "-",
+                    metric,
+                    (old[metric], new[metric]),
+                    get_threshold(metric),
+                )
+            )
+
+        # Layers are matched by their output name, fused away layers are skipped
+        new_layers = get_layer_cycles(new)
+        for layer, old_cycles in get_layer_cycles(old).items():
+            if layer in new_layers:
+                rows.append(
+                    get_diff_row(
+                        model,
+                        layer,
+                        LAYER_METRIC,
+                        (old_cycles, new_layers[layer]),
+                        get_threshold(LAYER_METRIC),
+                    )
+                )
+
+    for model in new_report.keys() - old_report.keys():
+        rows.append({"model": model, "layer": "-", "metric": "-", "status": "new"})
+
+    return rows
+
+
+def has_regression(rows, layers=False):
+    """Checks diff rows for regressions, layer rows only count when asked"""
+
+    return any(
+        row["status"] in REGRESSION_STATUSES
+        and (layers or row["metric"] != LAYER_METRIC)
+        for row in rows
+    )
+
+
+def get_diff_argparser():
+    """Parse command line arguments"""
+
+    parser = argparse.ArgumentParser(
+        description="Compare two SR100 compile result sets and flag regressions."
+    )
+    parser.add_argument(
+        "old_report",
+        type=str,
+        help="Baseline compile output directory, sweep CSV or results JSON",
+    )
+    parser.add_argument(
+        "new_report",
+        type=str,
+        help="New compile output directory, sweep CSV or results JSON",
+    )
+    parser.add_argument(
+        "--abs-threshold",
+        type=float,
+        default=0,
+        help="Sets the absolute growth of a metric allowed",
+    )
+    parser.add_argument(
+        "--rel-threshold",
+        type=float,
+        default=0,
+        help="Sets the relative growth of a metric allowed, 0.01 is 1%%",
+    )
+    parser.add_argument(
+        "--threshold",
+        nargs=3,
+        action="append",
+        metavar=("METRIC", "ABS", "REL"),
+        default=[],
+        help=f"Sets the thresholds of one of {DIFF_METRICS + [LAYER_METRIC]}",
+    )
+    parser.add_argument(
+        "--fail-on-layers",
+        action="store_true",
+        help="Fails on per-layer regressions, not only on model ones",
+    )
+    parser.add_argument(
+        "--all-layers",
+        action="store_true",
+        help="Prints unchanged layers too",
+    )
+    return parser
+
+
+def main():
+    """Main for the command line diff"""
+    parser = get_diff_argparser()
+    args = parser.parse_args()
+
+    thresholds = {}
+    for metric, abs_threshold, rel_threshold in args.threshold:
+        if metric not in DIFF_METRICS + [LAYER_METRIC]:
+            parser.error(f"unknown metric {metric}")
+        thresholds[metric] = (float(abs_threshold), float(rel_threshold))
+
+    rows = sr100_model_diff(
+        args.old_report,
+        args.new_report,
+        abs_threshold=args.abs_threshold,
+        rel_threshold=args.rel_threshold,
+        thresholds=thresholds,
+    )
+
+    printed = [
+        {key: row.get(key, "-") for key in DIFF_TABLE_KEYS}
+        for row in rows
+        if args.all_layers or row["metric"] != LAYER_METRIC or row["status"] != "ok"
+    ]
+    print_table(printed, DIFF_TABLE_KEYS)
+
+    if has_regression(rows, layers=args.fail_on_layers):
+        print("ERROR:: Performance regressed")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,63 +1,220 @@
 """Main script to optimize a SR110 model"""
 
 import argparse
-import tempfile
+import json
+from pathlib import Path
 from .sr100_model_compiler import (
     sr100_model_compiler,
     sr100_check_model,
     get_args_from_call,
+    ACCELERATOR_CONFIGS,
 )
+from .sweep_journal import SweepJournal
 
+# Candidate system configs for target searches, ordered from the least to the
+# most vmem hungry for the same arena cache size
+TARGET_SEARCH_CONFIGS = [
+    "sr100_npu_400MHz_tensor_vmem_weights_flash66MHz",
+    "sr100_npu_400MHz_tensor_vmem_weights_flash100MHz",
+    "sr100_npu_400MHz_tensor_vmem_weights_lpmem",
+    "sr100_npu_400MHz_all_vmem",
+]
 
-def model_optimizer_search(args):
+
+def model_optimizer_search(args, compile_model=sr100_model_compiler):
     """Searches for the model that fits"""
 
-    # Using TemporaryDirectory as a context manager for automatic cleanup
-    results = None
-    with tempfile.TemporaryDirectory() as tmpdirname:
+    # Gets minimum arena cache size, only the Vela metrics are needed
+    results_size = compile_model(
+        model_file=args.model_file,
+        arena_cache_size=3072000,
+        metrics_only=True,
+        accelerator_config=args.accelerator_config,
+    )
+    if results_size.get("failure"):
+        return sr100_check_model(results_size)
 
-        # You can perform operations within the temporary directory
-        output_dir = f"{tmpdirname}"
+    # Analyze the results
+    weights_size = int(float(results_size["off_chip_flash_memory_used"]) * 1024)
+    cache_size = int(float(results_size["sram_memory_used"]) * 1024)
+    total_size = cache_size + weights_size
 
-        # Gets minimum arena cache size
-        results_size = sr100_model_compiler(
-            model_file=args.model_file, arena_cache_size=3072000, output_dir=output_dir
-        )
-        # Analyze the results
-        weights_size = int(float(results_size["off_chip_flash_memory_used"]) * 1024)
-        cache_size = int(float(results_size["sram_memory_used"]) * 1024)
-        total_size = cache_size + weights_size
-
-        # Determine the system configuration
-        if total_size <= args.vmem_size_limit:
-            system_config = "sr100_npu_400MHz_all_vmem"
-            cache_size_increase = args.vmem_size_limit - total_size
-        elif weights_size <= args.lpmem_size_limit:
-            system_config = "sr100_npu_400MHz_tensor_vmem_weights_lpmem"
-            cache_size_increase = args.vmem_size_limit - cache_size
+    # Determine the system configuration
+    if total_size <= args.vmem_size_limit:
+        system_config = "sr100_npu_400MHz_all_vmem"
+        cache_size_increase = args.vmem_size_limit - total_size
+    elif weights_size <= args.lpmem_size_limit:
+        system_config = "sr100_npu_400MHz_tensor_vmem_weights_lpmem"
+        cache_size_increase = args.vmem_size_limit - cache_size
+    else:
+        system_config = "sr100_npu_400MHz_tensor_vmem_weights_flash66MHz"
+        cache_size_increase = args.vmem_size_limit - cache_size
+
+    # Increase performance to vmem max
+    if args.optimize == "Performance":
+        cache_size += cache_size_increase
+
+    # Run the final results
+    results = compile_model(
+        model_file=args.model_file,
+        arena_cache_size=cache_size,
+        system_config=system_config,
+        metrics_only=True,
+        vmem_size_limit=args.vmem_size_limit,
+        lpmem_size_limit=args.lpmem_size_limit,
+        optimize=args.optimize,
+        accelerator_config=args.accelerator_config,
+    )
+
+    # Checks the SR100 mapping
+    success, perf_data = sr100_check_model(results)
+
+    return success, perf_data
+
+
+def get_target_inference_time(args):
+    """Gets the maximum inference time allowed by the target, None if no target"""
+
+    target_times = []
+    if args.target_inferences_per_sec:
+        target_times.append(1.0 / args.target_inferences_per_sec)
+    if args.max_inference_time:
+        target_times.append(args.max_inference_time)
+    if not target_times:
+        return None
+    return min(target_times)
+
+
+def search_arena_cache_size(evaluate, low, high, step):
+    """Finds the smallest arena cache size meeting the target, None if none does"""
+
+    # Largest arena misses the target, so every cheaper one misses too
+    met, perf_data = evaluate(high)
+    if not met:
+        return None
+    best = perf_data
+
+    if low < high:
+        met, perf_data = evaluate(low)
+        if met:
+            return perf_data
+
+    # Binary search the smallest arena that still meets the target
+    while high - low > step:
+        mid = (low + high) // 2
+        met, perf_data = evaluate(mid)
+        if met:
+            high = mid
+            best = perf_data
         else:
-            system_config = "sr100_npu_400MHz_tensor_vmem_weights_flash66MHz"
-            cache_size_increase = args.vmem_size_limit - cache_size
+            low = mid
+
+    return best
 
-        # Increase performance to vmem max
-        if args.optimize == "Performance":
-            cache_size += cache_size_increase
 
-        # Run the final results
-        results = sr100_model_compiler(
+def model_optimizer_target_search(  # pylint: disable=R0914
+    args, compile_model=sr100_model_compiler
+):
+    """Searches for the least vmem configuration that meets the inference target"""
+
+    max_inference_time = get_target_inference_time(args)
+    candidates = []
+
+    # Gets minimum arena cache size and the weights size
+    results_size = compile_model(
+        model_file=args.model_file,
+        arena_cache_size=3072000,
+        metrics_only=True,
+        accelerator_config=args.accelerator_config,
+    )
+    if results_size.get("failure") or results_size["cycles_npu"] == 0:
+        return sr100_check_model(results_size)
+    weights_size = int(float(results_size["off_chip_flash_memory_used"]) * 1024)
+    min_cache_size = int(float(results_size["sram_memory_used"]) * 1024)
+
+    def evaluate(system_config, arena_cache_size):
+        """Compiles a candidate and checks it against the target"""
+
+        # Arena size only changes the schedule when optimizing for performance
+        results = compile_model(
             model_file=args.model_file,
-            arena_cache_size=cache_size,
+            arena_cache_size=arena_cache_size,
             system_config=system_config,
-            output_dir=output_dir,
+            metrics_only=True,
             vmem_size_limit=args.vmem_size_limit,
             lpmem_size_limit=args.lpmem_size_limit,
-            optimize=args.optimize,
+            optimize="Performance",
+            accelerator_config=args.accelerator_config,
+        )
+        fits, perf_data = sr100_check_model(results)
+        if perf_data is None or "vmem_size" not in perf_data:
+            return False, None
+        candidates.append(perf_data)
+        print(
+            f"Candidate {system_config} arena={arena_cache_size}: "
+            f"{perf_data['inferences_per_sec']:.2f} inferences/sec"
         )
+        return fits and perf_data["inference_time"] <= max_inference_time, perf_data
 
-    # Checks the SR100 mapping
-    success, perf_data = sr100_check_model(results)
+    best = None
+    best_vmem_size = args.vmem_size_limit + weights_size + args.arena_search_step
+    for system_config in TARGET_SEARCH_CONFIGS:
+        weights_vmem = weights_size if system_config.endswith("all_vmem") else 0
+        if system_config.endswith("lpmem") and weights_size > args.lpmem_size_limit:
+            continue
 
-    return success, perf_data
+        # Only candidates a search step cheaper than the best so far are useful
+        low = min_cache_size
+        high = (
+            min(
+                args.vmem_size_limit,
+                best_vmem_size - args.arena_search_step,
+            )
+            - weights_vmem
+        )
+        if high < low:
+            continue
+
+        config_best = search_arena_cache_size(
+            lambda arena, config=system_config: evaluate(config, arena),
+            low,
+            high,
+            args.arena_search_step,
+        )
+        if config_best is not None and config_best["vmem_size"] < best_vmem_size:
+            best = config_best
+            best_vmem_size = config_best["vmem_size"]
+
+    # Report how far the fastest candidate is when nothing meets the target
+    target_met = best is not None
+    if best is None:
+        if not candidates:
+            return False, None
+        best = max(candidates, key=lambda perf: perf["inferences_per_sec"])
+    perf_data = dict(best)
+
+    target_inferences_per_sec = 1.0 / max_inference_time
+    shortfall = max(0.0, target_inferences_per_sec - perf_data["inferences_per_sec"])
+    perf_data["target_inferences_per_sec"] = target_inferences_per_sec
+    perf_data["target_met"] = target_met
+    perf_data["target_shortfall"] = shortfall
+    perf_data["target_shortfall_pct"] = 100.0 * shortfall / target_inferences_per_sec
+    perf_data["candidates_evaluated"] = len(candidates)
+
+    return target_met, perf_data
+
+
+def run_optimizer(args, compile_model=sr100_model_compiler):
+    """Runs the search selected by the args with the given compile function"""
+
+    # Compiles recorded by an interrupted search are replayed, not rerun
+    if args.journal:
+        journal = SweepJournal(args.journal)
+        compile_model = journal.wrap(compile_model)
+
+    if get_target_inference_time(args) is not None:
+        return model_optimizer_target_search(args, compile_model)
+    return model_optimizer_search(args, compile_model)
 
 
 def sr100_model_optimizer(**kwargs):
@@ -67,7 +224,7 @@ def sr100_model_optimizer(**kwargs):
     parser = get_optimizer_argparser()
     args = get_args_from_call(parser, **kwargs)
     print(args)
-    return model_optimizer_search(args)
+    return run_optimizer(args)
 
 
 def get_optimizer_argparser():
@@ -93,6 +250,39 @@ def get_optimizer_argparser():
         choices=["Performance", "Size"],
         help="Choose optimization Type",
     )
+    parser.add_argument(
+        "--accelerator-config",
+        type=str,
+        choices=ACCELERATOR_CONFIGS,
+        default="ethos-u55-128",
+        help="Sets the Ethos-U accelerator configuration to optimize for",
+    )
+    parser.add_argument(
+        "--target-inferences-per-sec",
+        type=float,
+        help="Search for the least vmem configuration reaching this frame rate",
+    )
+    parser.add_argument(
+        "--max-inference-time",
+        type=float,
+        help="Search for the least vmem configuration within this time in seconds",
+    )
+    parser.add_argument(
+        "--arena-search-step",
+        type=int,
+        default=16384,
+        help="Sets the arena cache size resolution of the target search in bytes",
+    )
+    parser.add_argument(
+        "--journal",
+        type=str,
+        help="Records every compile to this file and resumes the search from it",
+    )
+    parser.add_argument(
+        "--report-file",
+        type=str,
+        help="Writes the selected configuration as JSON, see sr100_model_diff",
+    )
     return parser
 
 
@@ -102,12 +292,20 @@ def main():
     args = parser.parse_args()
 
     # Checks the SR100 mapping
-    success, perf_data = model_optimizer_search(args)
+    success, perf_data = run_optimizer(args)
 
     # Print performance data
-    for key, value in perf_data.items():
+    for key, value in (perf_data or {}).items():
         print(f"{key}: {value}")
 
+    if args.report_file:
+        report = {
+            "model": Path(args.model_file).stem,
+            **(perf_data or {"cycles_npu": 0}),
+        }
+        with open(args.report_file, "w", encoding="utf-8") as fp:
+            json.dump(report, fp, indent=2, default=str)
+
     # Fine tune the model
     if success:
         returncode = 0
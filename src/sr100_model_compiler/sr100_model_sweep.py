@@ -0,0 +1,331 @@
+"""Sweeps SR100 models across generated hardware configurations"""
+
+import argparse
+import csv
+import os
+import sys
+import tempfile
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from .sr100_model_compiler import sr100_model_compiler, ACCELERATOR_CONFIGS
+from .compile_cache import CompileCache, get_cache_key
+from .job_scheduler import ResourceScheduler, MemoryEstimates
+from .utils import print_table
+
+# Results from the summary file reported for every sweep point
+SWEEP_RESULT_KEYS = [
+    "cycles_npu",
+    "cycles_total",
+    "inference_time",
+    "inferences_per_second",
+]
+
+# Columns of the accelerator comparison table
+ACCELERATOR_TABLE_KEYS = [
+    "model",
+    "accelerator_config",
+    "cycles_npu",
+    "cycles_total",
+    "inference_time",
+    "inferences_per_second",
+    "weights_size",
+    "arena_size",
+]
+
+
+def get_default_vela_config():
+    """Gets the packaged SR100 Vela config file"""
+
+    return str(Path(__file__).parent / "config" / "sr100_system_config.ini")
+
+
+def write_sweep_config(config_file, base_config, sweep_configs):
+    """
+    Writes a Vela config file with generated system configs.
+
+    Args:
+        config_file (str): Path of the config file to write.
+        base_config (str): Packaged system config the generated ones inherit.
+        sweep_configs (list): (name, {parameter: value}) for each generated config.
+    """
+
+    with open(get_default_vela_config(), "r", encoding="utf-8") as fp:
+        config_text = fp.read()
+
+    for name, overrides in sweep_configs:
+        config_text += f"\n[System_Config.{name}]\n"
+        config_text += f"inherit=System_Config.{base_config}\n"
+        for param, value in overrides.items():
+            config_text += f"{param}={value}\n"
+
+    with open(config_file, "w", encoding="utf-8") as fp:
+        fp.write(config_text)
+    return config_file
+
+
+def run_sweep_job(job, scheduler):
+    """Compiles one sweep job once the scheduler admits it"""
+
+    # Sweeps only read the Vela summary
+    results = scheduler.run(
+        job["model_file"], sr100_model_compiler, metrics_only=True, **job
+    )
+    results.pop("vela_log", None)
+    results.pop("vela_log_file", None)
+    return results
+
+
+def run_sweep_jobs(jobs, cache_keys, workers=None, cache_dir=None):
+    """Runs the sweep jobs in parallel, reusing cached results when available"""
+
+    cache = CompileCache(cache_dir) if cache_dir else None
+    results = [None] * len(jobs)
+
+    # Memory estimates learned from past sweeps are kept with the cache
+    estimates_file = os.path.join(cache_dir, "vela_memory.json") if cache_dir else None
+    scheduler = ResourceScheduler(workers, estimates=MemoryEstimates(estimates_file))
+
+    pending = []
+    for i, key in enumerate(cache_keys):
+        if cache:
+            results[i] = cache.get(key)
+        if results[i] is None:
+            pending.append(i)
+    print(f"Sweep running {len(pending)} of {len(jobs)} jobs, rest are cached")
+
+    def run_job(i):
+        if not cache:
+            return run_sweep_job(jobs[i], scheduler)
+        # Sweeps sharing the cache directory compile every point once
+        return cache.get_or_compile(
+            cache_keys[i],
+            lambda: run_sweep_job(jobs[i], scheduler),
+            keep=lambda results: results["cycles_npu"],
+        )
+
+    # Vela runs as a child process so threads are enough to keep cores busy,
+    # the scheduler holds jobs back while their memory would not fit
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = {i: executor.submit(run_job, i) for i in pending}
+        for i, future in futures.items():
+            results[i] = future.result()
+
+    return results
+
+
+def get_sweep_point(results):
+    """Reduces compile results to the values of a sweep point"""
+
+    point = {}
+    for key in SWEEP_RESULT_KEYS:
+        point[key] = float(results.get(key, 0))
+    point["failure"] = results.get("failure")
+    return point
+
+
+def sr100_memory_sweep(  # pylint: disable=R0913,R0914
+    model_file,
+    sweep_params,
+    base_config="sr100_npu_400MHz_tensor_vmem_weights_flash100MHz",
+    workers=None,
+    cache_dir=None,
+    **kwargs,
+):
+    """
+    Compiles a model across memory parameter values and returns sensitivity curves.
+
+    Each parameter is swept on its own while the others keep the base config value.
+
+    Args:
+        model_file (str): Path to the TFLite model file.
+        sweep_params (dict): Vela system config parameter names, such as
+            OffChipFlash_clock_scale, mapped to the list of values to compile.
+        base_config (str): Packaged system config the sweep starts from.
+        workers (int): Number of parallel compiles, default is the CPU count.
+        cache_dir (str): Directory to cache results across sweeps, None disables.
+        kwargs: Other sr100_model_compiler arguments used for every compile.
+
+    Returns:
+        dict: Parameter name mapped to a list of points with the swept value and
+            the cycles, inference time and inferences per second.
+    """
+
+    # One generated system config per swept value
+    sweep_configs = []
+    for param, values in sweep_params.items():
+        for value in values:
+            name = f"{base_config}_sweep{len(sweep_configs)}"
+            sweep_configs.append((name, {param: value}))
+
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        config_file = write_sweep_config(
+            f"{tmpdirname}/sweep_config.ini", base_config, sweep_configs
+        )
+
+        jobs = []
+        cache_keys = []
+        for name, overrides in sweep_configs:
+            jobs.append(
+                {
+                    "model_file": model_file,
+                    "system_config": name,
+                    "vela_config_file": config_file,
+                    **kwargs,
+                }
+            )
+            cache_keys.append(
+                get_cache_key(
+                    model_file, {"base_config": base_config, **overrides, **kwargs}
+                )
+            )
+
+        results = run_sweep_jobs(jobs, cache_keys, workers, cache_dir)
+
+    curves = {param: [] for param in sweep_params}
+    for (_, overrides), result in zip(sweep_configs, results):
+        for param, value in overrides.items():
+            curves[param].append({"value": value, **get_sweep_point(result)})
+
+    return curves
+
+
+def sr100_accelerator_sweep(
+    model_files,
+    accelerator_configs=None,
+    workers=None,
+    cache_dir=None,
+    **kwargs,
+):
+    """
+    Compiles models across Ethos-U accelerator configurations.
+
+    Args:
+        model_files (list): Paths to the TFLite model files.
+        accelerator_configs (list): Accelerator configurations, default is all.
+        workers (int): Number of parallel compiles, default is the CPU count.
+        cache_dir (str): Directory to cache results across sweeps, None disables.
+        kwargs: Other sr100_model_compiler arguments used for every compile.
+
+    Returns:
+        list: One row per model and accelerator configuration with the cycles,
+            inference time and memory in bytes.
+    """
+
+    if accelerator_configs is None:
+        accelerator_configs = ACCELERATOR_CONFIGS
+
+    jobs = []
+    cache_keys = []
+    for model_file in model_files:
+        for accelerator_config in accelerator_configs:
+            options = {"accelerator_config": accelerator_config, **kwargs}
+            jobs.append({"model_file": model_file, **options})
+            cache_keys.append(get_cache_key(model_file, options))
+
+    results = run_sweep_jobs(jobs, cache_keys, workers, cache_dir)
+
+    rows = []
+    for job, result in zip(jobs, results):
+        row = {
+            "model": Path(job["model_file"]).stem,
+            "accelerator_config": job["accelerator_config"],
+            **get_sweep_point(result),
+        }
+        row["weights_size"] = int(
+            float(result.get("off_chip_flash_memory_used", 0)) * 1024
+        )
+        row["arena_size"] = int(float(result.get("sram_memory_used", 0)) * 1024)
+        rows.append(row)
+
+    return rows
+
+
+def get_sweep_argparser():
+    """Parse command line arguments"""
+
+    parser = argparse.ArgumentParser(
+        description="Compare TFLite models across Ethos-U accelerator configurations."
+    )
+    parser.add_argument(
+        "-m",
+        "--model-file",
+        type=str,
+        nargs="+",
+        help="Paths to TFLite model files",
+        required=True,
+    )
+    parser.add_argument(
+        "-a",
+        "--accelerator-config",
+        type=str,
+        nargs="+",
+        choices=ACCELERATOR_CONFIGS,
+        default=ACCELERATOR_CONFIGS,
+        help="Accelerator configurations to compare, default is all",
+    )
+    parser.add_argument(
+        "--system-config",
+        type=str,
+        default="sr100_npu_400MHz_all_vmem",
+        help="Sets system config selection",
+    )
+    parser.add_argument(
+        "-p",
+        "--optimize",
+        type=str,
+        choices=["Performance", "Size"],
+        default="Size",
+        help="Choose optimization Type",
+    )
+    parser.add_argument("-j", "--workers", type=int, help="Number of parallel compiles")
+    parser.add_argument(
+        "--cache-dir", type=str, help="Directory to cache compile results"
+    )
+    parser.add_argument(
+        "--vela-timeout", type=float, help="Kills compiles running longer, in seconds"
+    )
+    parser.add_argument(
+        "--vela-memory-limit", type=int, help="Caps the Vela address space in bytes"
+    )
+    parser.add_argument("--csv", type=str, help="Writes the table to a CSV file")
+    return parser
+
+
+def main():
+    """Main for the command line sweep"""
+    parser = get_sweep_argparser()
+    args = parser.parse_args()
+
+    rows = sr100_accelerator_sweep(
+        args.model_file,
+        args.accelerator_config,
+        workers=args.workers,
+        cache_dir=args.cache_dir,
+        system_config=args.system_config,
+        optimize=args.optimize,
+        vela_timeout=args.vela_timeout,
+        vela_memory_limit=args.vela_memory_limit,
+    )
+    print_table(rows, ACCELERATOR_TABLE_KEYS)
+    for row in rows:
+        if row["failure"]:
+            print(
+                f"ERROR:: {row['model']} {row['accelerator_config']} "
+                f"failed: {row['failure']}"
+            )
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as fp:
+            writer = csv.DictWriter(
+                fp, fieldnames=ACCELERATOR_TABLE_KEYS, extrasaction="ignore"
+            )
+            writer.writeheader()
+            writer.writerows(rows)
+
+    # Fails if any model did not compile
+    return 0 if all(row["cycles_npu"] for row in rows) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
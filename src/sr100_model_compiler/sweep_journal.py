@@ -0,0 +1,182 @@
+"""Append-only journal of the compiles of a search, to resume it after an interruption"""
+
+import argparse
+import datetime
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+
+from .compile_cache import get_cache_key
+from .utils import print_table
+
+# Failures depending on the machine rather than the candidate, retried on resume
+TRANSIENT_FAILURES = ("timeout", "memory")
+
+JOURNAL_TABLE_KEYS = [
+    "time",
+    "model",
+    "system_config",
+    "arena_cache_size",
+    "cycles_npu",
+    "inference_time",
+    "failure",
+]
+
+
+def read_journal(journal_file):
+    """
+    Reads the compiles recorded in a journal, including one still being written.
+
+    The last line is skipped when an interrupted write left it incomplete.
+
+    Args:
+        journal_file (str): Path to the journal.
+
+    Returns:
+        list: A record per compile with its key, model, options and results.
+    """
+
+    records = []
+    try:
+        with open(journal_file, "r", encoding="utf-8") as fp:
+            for line in fp:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return records
+
+
+class SweepJournal:
+    """
+    Records every completed compile of a search as one JSON line.
+
+    Each record is appended with a single write and synced before the search
+    goes on, so an interruption loses at most the compile running at the time.
+    Reopening the journal replays the recorded compiles.
+    """
+
+    def __init__(self, journal_file):
+        self.journal_file = journal_file
+        self.lock = threading.Lock()
+        self.records = {record["key"]: record for record in read_journal(journal_file)}
+        self.stats = {"replayed": 0, "compiled": 0}
+        if self.records:
+            print(f"++ Resuming from {journal_file}, {len(self.records)} compiles done")
+
+    def get(self, key):
+        """Gets the recorded results of a compile, None when it has not run"""
+
+        with self.lock:
+            record = self.records.get(key)
+        return record["results"] if record else None
+
+    def count(self, stat):
+        """Counts a replayed or a new compile"""
+
+        with self.lock:
+            self.stats[stat] += 1
+
+    def append(self, key, model_file, options, results):
+        """Records the results of a compile"""
+
+        record = {
+            "key": key,
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "model": Path(model_file).name,
+            "options": options,
+            "results": results,
+        }
+        line = json.dumps(record, default=str) + "\n"
+        with self.lock:
+            # A trailing partial line of an interrupted write is ended first
+            with open(self.journal_file, "a+b") as fp:
+                if fp.seek(0, os.SEEK_END):
+                    fp.seek(-1, os.SEEK_END)
+                    if fp.read(1) != b"\n":
+                        fp.write(b"\n")
+                fp.write(line.encode("utf-8"))
+                fp.flush()
+                os.fsync(fp.fileno())
+            self.records[key] = json.loads(line)
+
+    def wrap(self, compile_model):
+        """
+        Wraps a compile function to replay recorded compiles and record new ones.
+
+        Args:
+            compile_model (callable): Compiles a model from keyword arguments,
+                such as sr100_model_compiler.
+
+        Returns:
+            callable: The journaled compile function.
+        """
+
+        def journaled_compile(model_file, **options):
+            key = get_cache_key(model_file, options)
+            results = self.get(key)
+            if results is not None:
+                self.count("replayed")
+                return results
+
+            results = compile_model(model_file=model_file, **options)
+            self.count("compiled")
+            if results is not None and results.get("failure") not in TRANSIENT_FAILURES:
+                self.append(key, model_file, options, results)
+            return results
+
+        return journaled_compile
+
+
+def get_journal_rows(records):
+    """Gets a table row per journaled compile"""
+
+    rows = []
+    for record in records:
+        options = record["options"]
+        results = record["results"] or {}
+        rows.append(
+            {
+                "time": record["time"],
+                "model": record["model"],
+                "system_config": options.get("system_config", "-"),
+                "arena_cache_size": options.get("arena_cache_size", "-"),
+                "cycles_npu": results.get("cycles_npu", "-"),
+                "inference_time": results.get("inference_time", "-"),
+                "failure": results.get("failure") or "-",
+            }
+        )
+    return rows
+
+
+def get_journal_argparser():
+    """Parse command line arguments"""
+
+    parser = argparse.ArgumentParser(
+        description="List the compiles of a search journal, also while it runs."
+    )
+    parser.add_argument("journal", help="Journal of sr100_model_optimizer --journal")
+    parser.add_argument(
+        "-m", "--model", type=str, help="Only lists the compiles of this model name"
+    )
+    return parser
+
+
+def main():
+    """Main for the command line journal queries"""
+    parser = get_journal_argparser()
+    args = parser.parse_args()
+
+    records = read_journal(args.journal)
+    if args.model:
+        records = [record for record in records if record["model"] == args.model]
+    print_table(get_journal_rows(records), JOURNAL_TABLE_KEYS)
+    return 0 if records else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""Process wide registry of the compiled code generation templates"""
+
+import os
+import threading
+from pathlib import Path
+from jinja2 import Environment, FileSystemLoader
+from mako.lookup import TemplateLookup
+
+TEMPLATE_DIR = Path(__file__).parent / "templates"
+
+# Directory for the compiled Mako modules, kept in memory only when not set
+TEMPLATE_CACHE_DIR_ENV = "SR100_TEMPLATE_CACHE_DIR"
+
+_lock = threading.Lock()
+_registry = {"jinja_env": None, "mako_lookup": None, "cache_dir": None}
+
+
+def set_template_cache_dir(cache_dir):
+    """
+    Persists the compiled Mako templates to a directory.
+
+    The compiled modules are reused by later processes, so only the first
+    process compiles the templates.
+
+    Args:
+        cache_dir (str): Directory for the compiled modules, None keeps them in
+            memory only.
+    """
+
+    with _lock:
+        _registry["cache_dir"] = str(cache_dir) if cache_dir else None
+        _registry["mako_lookup"] = None
+
+
+def get_jinja_env():
+    """Gets the shared Jinja environment, templates compile once per process"""
+
+    with _lock:
+        if _registry["jinja_env"] is None:
+            # Packaged templates do not change while running
+            _registry["jinja_env"] = Environment(
+                loader=FileSystemLoader(TEMPLATE_DIR),
+                trim_blocks=True,
+                lstrip_blocks=True,
+                auto_reload=False,
+            )
+        return _registry["jinja_env"]
+
+
+def get_mako_template(name):
+    """Gets a packaged Mako template, compiled once per process"""
+
+    with _lock:
+        if _registry["mako_lookup"] is None:
+            cache_dir = _registry["cache_dir"] or os.environ.get(TEMPLATE_CACHE_DIR_ENV)
+            _registry["mako_lookup"] = TemplateLookup(
+                directories=[str(TEMPLATE_DIR)],
+                module_directory=cache_dir,
+                filesystem_checks=False,
+            )
+        lookup = _registry["mako_lookup"]
+
+    # The lookup has its own lock around compiling a template
+    return lookup.get_template(name)
@@ -0,0 +1,138 @@
+${common_template_header}
+
+#ifndef ${guard}
+#define ${guard}
+
+#include <stddef.h>
+#include <stdint.h>
+#include <string.h>
+
+#define SR100_FLASH_MAGIC "${magic}"
+#define SR100_FLASH_VERSION ${version}
+
+#define SR100_FLASH_KIND_MODEL ${kinds["model"]}
+#define SR100_FLASH_KIND_INPUT ${kinds["input"]}
+#define SR100_FLASH_KIND_EXPECTED ${kinds["expected"]}
+
+/* The entry offset points to a relocation table, the model shares buffers with
+ * other models and is rebuilt with sr100_flash_copy */
+#define SR100_FLASH_FLAG_RELOCATED ${relocated_flag}
+
+/* Layout of ${image_name} when this header was generated, the index in flash is
+ * authoritative so models can be swapped without rebuilding the firmware */
+#define SR100_FLASH_ALIGNMENT ${alignment}
+#define SR100_FLASH_ENTRY_COUNT ${len(entries)}
+#define SR100_FLASH_IMAGE_SIZE ${image_size}
+% for entry in entries:
+% if entry["kind"] == "model":
+#define SR100_FLASH_${entry["name"].upper()}_ID ${entry["ns_id"]}
+% endif
+#define SR100_FLASH_${entry["symbol"]}_OFFSET 0x${"%08x" % entry["offset"]}
+#define SR100_FLASH_${entry["symbol"]}_LEN ${entry["length"]}
+% if entry["relocated"]:
+#define SR100_FLASH_${entry["symbol"]}_RELOCATED 1
+% endif
+% endfor
+
+typedef struct __attribute__((packed))
+{
+    char magic[4];
+    uint16_t version;
+    uint16_t entry_size;
+    uint32_t entry_count;
+    uint32_t alignment;
+    uint32_t image_size;
+    uint32_t index_crc32;
+    uint8_t reserved[8];
+} sr100_flash_header_t;
+
+typedef struct __attribute__((packed))
+{
+    char name[${name_size}];
+    uint16_t ns_id;
+    uint8_t kind;
+    uint8_t index;
+    uint32_t flags;
+    uint32_t offset;
+    uint32_t length;
+    uint32_t crc32;
+    uint8_t sha256[32];
+    uint8_t reserved[12];
+} sr100_flash_entry_t;
+
+typedef struct __attribute__((packed))
+{
+    uint32_t segment_count;
+    uint8_t reserved[12];
+} sr100_flash_reloc_header_t;
+
+typedef struct __attribute__((packed))
+{
+    uint32_t offset;
+    uint32_t length;
+} sr100_flash_reloc_t;
+
+/* Finds an entry of the image by its namespace, kind and test vector index */
+static inline const sr100_flash_entry_t *sr100_flash_find(const void *image, const char *name,
+                                                         uint8_t kind, uint8_t index)
+{
+    const sr100_flash_header_t *header = (const sr100_flash_header_t *)image;
+    if (memcmp(header->magic, SR100_FLASH_MAGIC, sizeof(header->magic)) != 0 ||
+        header->version != SR100_FLASH_VERSION ||
+        header->entry_size != sizeof(sr100_flash_entry_t))
+    {
+        return NULL;
+    }
+
+    const sr100_flash_entry_t *entries = (const sr100_flash_entry_t *)(header + 1);
+    for (uint32_t i = 0; i < header->entry_count; i++)
+    {
+        if (entries[i].kind == kind && entries[i].index == index &&
+            strncmp(entries[i].name, name, sizeof(entries[i].name)) == 0)
+        {
+            return &entries[i];
+        }
+    }
+    return NULL;
+}
+
+/* Gets the data of an entry, models are aligned for in place (XIP) use. NULL
+ * for relocated models, copy them with sr100_flash_copy */
+static inline const uint8_t *sr100_flash_data(const void *image, const sr100_flash_entry_t *entry)
+{
+    if (entry->flags & SR100_FLASH_FLAG_RELOCATED)
+    {
+        return NULL;
+    }
+    return (const uint8_t *)image + entry->offset;
+}
+
+/* Copies the data of an entry to dst, which holds entry->length bytes, and
+ * returns the bytes copied */
+static inline uint32_t sr100_flash_copy(const void *image, const sr100_flash_entry_t *entry,
+                                        uint8_t *dst)
+{
+    const uint8_t *base = (const uint8_t *)image;
+    if (!(entry->flags & SR100_FLASH_FLAG_RELOCATED))
+    {
+        memcpy(dst, base + entry->offset, entry->length);
+        return entry->length;
+    }
+
+    const sr100_flash_reloc_header_t *header =
+        (const sr100_flash_reloc_header_t *)(base + entry->offset);
+    const sr100_flash_reloc_t *segments = (const sr100_flash_reloc_t *)(header + 1);
+    uint32_t copied = 0;
+    for (uint32_t i = 0; i < header->segment_count; i++)
+    {
+        if (copied + segments[i].length > entry->length)
+        {
+            break;
+        }
+        memcpy(dst + copied, base + segments[i].offset, segments[i].length);
+        copied += segments[i].length;
+    }
+    return copied;
+}
+
+#endif /* ${guard} */
@@ -0,0 +1,41 @@
+<%def name="header()">
+#include <cstddef>
+#include <cstdint>
+
+#include "inference_attributes.hpp"
+
+namespace ${namespace} {
+</%def>
+<%def name="tensor()">
+// ${name}, output of ${op}, shape ${shape}
+static const ${c_type} LABELS_ATTRIBUTE golden_tensor${order}[${size}] = {
+${data}
+};
+</%def>
+<%def name="footer()">
+struct golden_tensor_t {
+    const char *name;
+    int tensor_index;
+    const void *data;
+    size_t size;
+};
+
+static const golden_tensor_t golden_tensors[] = {
+% for tensor in tensors:
+    {${tensor["name"]}, ${tensor["index"]}, golden_tensor${tensor["order"]}, sizeof(golden_tensor${tensor["order"]})},
+% endfor
+};
+
+const golden_tensor_t *get_golden_tensor(int order) {
+    if (order < 0 || order >= ${len(tensors)}) {
+        return nullptr;
+    }
+    return &golden_tensors[order];
+}
+
+size_t get_golden_tensor_count(void) {
+    return ${len(tensors)};
+}
+
+}  /* namespace ${namespace} */
+</%def>
@@ -0,0 +1,54 @@
+${common_template_header}
+
+#include <cstddef>
+#include <cstdint>
+#include <cstring>
+
+#include "inference_attributes.hpp"
+#include "tensorflow/lite/micro/micro_interpreter.h"
+#include "tensorflow/lite/micro/micro_log.h"
+#include "tensorflow/lite/micro/micro_profiler.h"
+#include "tensorflow/lite/schema/schema_generated.h"
+
+namespace ${namespace} {
+
+const uint8_t * get_model_pointer(void);
+tflite::MicroOpResolver& get_resolver(void);
+% if with_inputs:
+int8_t* get_user_input_buffer(int index);
+% endif
+
+// Runs one inference of ${model} and logs the ticks of every operator as CSV
+TfLiteStatus run_profiled_inference(uint8_t* tensor_arena, size_t tensor_arena_size)
+{
+    const tflite::Model* model = tflite::GetModel(get_model_pointer());
+    tflite::MicroProfiler profiler;
+    tflite::MicroInterpreter interpreter(model, get_resolver(), tensor_arena,
+                                         tensor_arena_size, nullptr, &profiler);
+
+    if (interpreter.AllocateTensors() != kTfLiteOk)
+    {
+        MicroPrintf("${namespace}: AllocateTensors failed");
+        return kTfLiteError;
+    }
+
+% if with_inputs:
+    for (size_t i = 0; i < interpreter.inputs_size(); i++)
+    {
+        TfLiteTensor* input = interpreter.input(i);
+        const int8_t* input_data = get_user_input_buffer(i);
+        if (input_data != nullptr)
+        {
+            memcpy(input->data.int8, input_data, input->bytes);
+        }
+    }
+
+% endif
+    TfLiteStatus status = interpreter.Invoke();
+
+    MicroPrintf("${profile_marker} ${model}");
+    profiler.LogCsv();
+    return status;
+}
+
+}  /* namespace ${namespace} */
@@ -0,0 +1,366 @@
+"""Golden dumps of intermediate tensors and their comparison with device dumps"""
+
+import argparse
+import contextlib
+import fnmatch
+import json
+import os
+import re
+import sys
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+from .cpu_fallback import get_model_operators
+from .template_registry import get_mako_template
+from .utils import print_table
+
+# Member of the dump listing the tensors in execution order
+DUMP_INDEX = "tensors.json"
+
+# Elements per line of the C arrays
+C_VALUES_PER_LINE = 32
+
+C_TYPES = {
+    "int8": "int8_t",
+    "uint8": "uint8_t",
+    "int16": "int16_t",
+    "uint16": "uint16_t",
+    "int32": "int32_t",
+    "uint32": "uint32_t",
+    "int64": "int64_t",
+    "float32": "float",
+    "bool": "bool",
+}
+
+COMPARE_TABLE_KEYS = [
+    "order",
+    "name",
+    "op",
+    "max_abs_diff",
+    "mismatches",
+    "status",
+]
+
+
+def match_tensor(detail, filters):
+    """Checks a tensor matches a filter, a tensor index or a name pattern"""
+
+    for tensor_filter in filters:
+        if tensor_filter.isdigit():
+            if int(tensor_filter) == detail["index"]:
+                return True
+        elif fnmatch.fnmatchcase(detail["name"], tensor_filter):
+            return True
+    return False
+
+
+def get_safe_name(name):
+    """Gets a tensor name usable as a file name"""
+
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+
+
+def get_dump_key(order, name):
+    """Gets the name of a tensor in the dump, in execution order"""
+
+    return f"{order:04d}_{get_safe_name(name)}"
+
+
+def select_tensors(tflite_path, tensor_details, filters):
+    """
+    Selects the tensors to dump in execution order.
+
+    Args:
+        tflite_path (str): The model the interpreter runs.
+        tensor_details (list): Tensor details of the interpreter.
+        filters (list): Tensor indexes or name patterns, see fnmatch.
+
+    Returns:
+        list: A dictionary per selected tensor with its order, dump key, tensor
+            index, name, producing operator and quantization.
+    """
+
+    details = {detail["index"]: detail for detail in tensor_details}
+    producers = {}
+    for op in get_model_operators(tflite_path):
+        if op["subgraph"] == 0:
+            for index in op["output_tensors"]:
+                producers.setdefault(index, op)
+
+    # Tensors no operator produces, such as the inputs, come first
+    indexes = [index for index in details if index not in producers]
+    indexes += list(producers)
+
+    tensors = []
+    for index in indexes:
+        detail = details.get(index)
+        if detail is None or not match_tensor(detail, filters):
+            continue
+        op = producers.get(index)
+        scale, zero_point = detail["quantization"]
+        tensors.append(
+            {
+                "order": len(tensors),
+                "key": get_dump_key(len(tensors), detail["name"]),
+                "index": index,
+                "name": detail["name"],
+                "op": f"{op['op']} {op['index']}" if op else "-",
+                "scale": scale,
+                "zero_point": zero_point,
+            }
+        )
+    return tensors
+
+
+class TensorDumpWriter:
+    """
+    Writes tensors one at a time into a compressed .npz file.
+
+    Only the tensor being written is held in memory. The dump loads with
+    np.load, and lists the tensors in execution order in DUMP_INDEX.
+    """
+
+    def __init__(self, npz_file):
+        self.npz = zipfile.ZipFile(  # pylint: disable=R1732
+            npz_file, "w", zipfile.ZIP_DEFLATED, allowZip64=True
+        )
+        self.tensors = []
+
+    def add(self, tensor, array):
+        """Writes a tensor, see select_tensors"""
+
+        with self.npz.open(f"{tensor['key']}.npy", "w", force_zip64=True) as fp:
+            np.lib.format.write_array(fp, np.asanyarray(array), allow_pickle=False)
+        self.tensors.append(
+            {**tensor, "dtype": str(array.dtype), "shape": list(array.shape)}
+        )
+
+    def close(self):
+        """Writes the tensor list and closes the dump"""
+
+        self.npz.writestr(DUMP_INDEX, json.dumps(self.tensors, indent=2))
+        self.npz.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def format_c_array(array):
+    """Formats the values of an array as C initializer lines"""
+
+    values = [str(value) for value in array.flatten().tolist()]
+    return ",\n".join(
+        ", ".join(values[i : i + C_VALUES_PER_LINE])
+        for i in range(0, len(values), C_VALUES_PER_LINE)
+    )
+
+
+def write_c_tensor(fp, template, tensor, array):
+    """Writes a tensor as a C array of the golden tensors source"""
+
+    fp.write(
+        template.get_def("tensor").render(
+            name=tensor["name"],
+            op=tensor["op"],
+            shape=list(array.shape),
+            c_type=C_TYPES.get(str(array.dtype), "uint8_t"),
+            order=tensor["order"],
+            size=array.size,
+            data=format_c_array(array),
+        )
+    )
+
+
+def dump_tensors(  # pylint: disable=R0913,R0917
+    interpreter, tflite_path, filters, output_folder, namespace, c_header=None
+):
+    """
+    Dumps the selected tensors of an invoked interpreter as golden data.
+
+    The interpreter must preserve all tensors. Each tensor is written to
+    <namespace>_tensors.npz, and to the C arrays of <namespace>_tensors.cc when
+    c_header is given, before the next one is read.
+
+    Args:
+        interpreter (tf.lite.Interpreter): The invoked interpreter.
+        tflite_path (str): The model the interpreter runs.
+        filters (list): Tensor indexes or name patterns, see fnmatch.
+        output_folder (str): Directory of the dumps.
+        namespace (str): Namespace of the C arrays and prefix of the files.
+        c_header (str): License header of the C arrays, None to skip them.
+
+    Returns:
+        list: The dumped tensors with their dtypes and shapes.
+    """
+
+    tensors = select_tensors(tflite_path, interpreter.get_tensor_details(), filters)
+    if not tensors:
+        print(f"WARNING:: No tensor of {Path(tflite_path).name} matches {filters}")
+        return []
+
+    template = get_mako_template("golden_tensors.mako")
+    npz_file = f"{output_folder}/{namespace}_tensors.npz"
+    with contextlib.ExitStack() as stack:
+        writer = stack.enter_context(TensorDumpWriter(npz_file))
+        fp = None
+        if c_header is not None:
+            fp = stack.enter_context(
+                open(f"{output_folder}/{namespace}_tensors.cc", "w", encoding="utf-8")
+            )
+            fp.write(c_header)
+            fp.write(template.get_def("header").render(namespace=namespace))
+
+        for tensor in tensors:
+            array = interpreter.get_tensor(tensor["index"])
+            writer.add(tensor, array)
+            if fp:
+                write_c_tensor(fp, template, tensor, array)
+
+        if fp:
+            names = [json.dumps(tensor["name"]) for tensor in tensors]
+            fp.write(
+                template.get_def("footer").render(
+                    namespace=namespace,
+                    tensors=[
+                        {**tensor, "name": name} for tensor, name in zip(tensors, names)
+                    ],
+                )
+            )
+
+    print(f"++ Dumped {len(tensors)} tensors of {Path(tflite_path).name} to {npz_file}")
+    return writer.tensors
+
+
+def read_dump_index(npz_file):
+    """Reads the tensor list of a golden dump"""
+
+    with zipfile.ZipFile(npz_file) as npz:
+        return json.loads(npz.read(DUMP_INDEX))
+
+
+def load_device_tensor(device_dump, tensor):
+    """
+    Loads the device data of a golden tensor, None if it was not dumped.
+
+    Device dumps are an .npz file or a directory of .npy or raw .bin files,
+    named by the dump key, the tensor name or the tensor index.
+    """
+
+    names = [tensor["key"], get_safe_name(tensor["name"]), str(tensor["index"])]
+    if os.path.isdir(device_dump):
+        for name in names:
+            path = os.path.join(device_dump, name)
+            if os.path.exists(f"{path}.npy"):
+                return np.load(f"{path}.npy")
+            if os.path.exists(f"{path}.bin"):
+                return np.fromfile(f"{path}.bin", dtype=tensor["dtype"])
+        return None
+
+    with np.load(device_dump) as npz:
+        for name in names:
+            if name in npz.files:
+                return npz[name]
+    return None
+
+
+def compare_tensor_dumps(golden_npz, device_dump, atol=0, rtol=0):
+    """
+    Compares device dumps with golden ones and finds the first divergence.
+
+    Args:
+        golden_npz (str): Golden dump from dump_tensors.
+        device_dump (str): Device dump, see load_device_tensor.
+        atol (float): Absolute tolerance of every element.
+        rtol (float): Tolerance relative to the golden element.
+
+    Returns:
+        dict: A row per golden tensor in execution order, with its status
+            (match, diverged or missing), and the first diverged row, None when
+            every dumped tensor matches.
+    """
+
+    rows = []
+    first_divergence = None
+    with np.load(golden_npz) as golden:
+        for tensor in read_dump_index(golden_npz):
+            row = {
+                "order": tensor["order"],
+                "name": tensor["name"],
+                "op": tensor["op"],
+                "max_abs_diff": "-",
+                "mismatches": "-",
+                "status": "missing",
+            }
+            rows.append(row)
+            device = load_device_tensor(device_dump, tensor)
+            if device is None:
+                continue
+
+            expected = golden[tensor["key"]]
+            if device.size != expected.size:
+                row["status"] = "diverged"
+            else:
+                expected = expected.astype(np.float64).flatten()
+                actual = device.astype(np.float64).flatten()
+                diff = np.abs(actual - expected)
+                row["max_abs_diff"] = float(diff.max()) if diff.size else 0.0
+                row["mismatches"] = int(
+                    np.count_nonzero(diff > atol + rtol * np.abs(expected))
+                )
+                row["status"] = "diverged" if row["mismatches"] else "match"
+            if row["status"] == "diverged" and first_divergence is None:
+                first_divergence = row
+
+    return {"rows": rows, "first_divergence": first_divergence}
+
+
+def get_compare_argparser():
+    """Parse command line arguments"""
+
+    parser = argparse.ArgumentParser(
+        description="Find the first tensor where a device dump diverges from the golden dump."
+    )
+    parser.add_argument("golden", help="Golden <namespace>_tensors.npz dump")
+    parser.add_argument(
+        "device", help="Device dump, an .npz file or a directory of .npy/.bin files"
+    )
+    parser.add_argument(
+        "--atol", type=float, default=0, help="Sets the absolute tolerance"
+    )
+    parser.add_argument(
+        "--rtol", type=float, default=0, help="Sets the relative tolerance"
+    )
+    parser.add_argument(
+        "--all", action="store_true", help="Lists every tensor, not only the dumped"
+    )
+    return parser
+
+
+def main():
+    """Main for the command line dump comparison"""
+    parser = get_compare_argparser()
+    args = parser.parse_args()
+
+    comparison = compare_tensor_dumps(args.golden, args.device, args.atol, args.rtol)
+    rows = comparison["rows"]
+    if not args.all:
+        rows = [row for row in rows if row["status"] != "missing"]
+    print_table(rows, COMPARE_TABLE_KEYS)
+
+    first = comparison["first_divergence"]
+    if first is None:
+        print("++ No divergence found")
+        return 0
+    print(
+        f"First divergence at tensor {first['order']} {first['name']} ({first['op']})"
+    )
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,7 @@
 """Utilities to help the library"""
 
+import argparse
+import glob
 import subprocess
 import platform
 
@@ -32,3 +34,63 @@ def get_platform_path(unix_path):
     if platform.system() == "Windows":
         return unix_path.replace("/", "\\")
     return unix_path
+
+
+def print_table(rows, keys):
+    """Prints dict rows as an aligned table"""
+
+    cells = [[str(key) for key in keys]]
+    for row in rows:
+        cells.append(
+            [
+                f"{row[key]:.6g}" if isinstance(row[key], float) else str(row[key])
+                for key in keys
+            ]
+        )
+    widths = [max(len(line[i]) for line in cells) for i in range(len(keys))]
+    for line in cells:
+        print("  ".join(cell.rjust(width) for cell, width in zip(line, widths)))
+
+
+# Function to expand wildcards in input paths
+def expand_wildcards(file_paths):
+    """expand wildcards"""
+
+    expanded_paths = []
+    for path in file_paths:
+        # Check if the path contains a wildcard
+        if "*" in path:
+            # Expand the wildcard to actual file names and sort them
+            expanded_file_paths = sorted(glob.glob(path))
+            # Extend the list with the sorted paths
+            expanded_paths.extend(expanded_file_paths)
+        else:
+            # If no wildcard, add the path as is
+            expanded_paths.append(path)
+    return expanded_paths
+
+
+def get_argparse_defaults(parser: argparse.ArgumentParser) -> dict:
+    """
+    Return a dictionary of all argparse defaults for the given parser.
+    """
+    return {
+        action.dest: action.default
+        for action in parser._actions  # pylint: disable=W0212
+        if action.dest != "help"
+    }
+
+
+def get_args_from_call(parser, **kwargs):
+    """get kwargs and merges with default args"""
+
+    # Get default args
+    arg_defaults = get_argparse_defaults(parser)
+
+    # Update inputs with defaults
+    for key in arg_defaults.keys():
+        if key not in kwargs:
+            kwargs[key] = arg_defaults[key]
+
+    args = argparse.Namespace(**kwargs)
+    return args
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Testing concurrent compiles sharing an output directory"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from sr100_model_compiler import (
+    sr100_model_compiler,
+    sr100_model_compiler_in_memory,
+    sr100_get_compile_log,
+)
+from sr100_model_compiler.compile_cache import get_model_hash
+from sr100_model_compiler.run_artifacts import read_run_manifest
+
+MODEL_FILE = "tests/models/hello_world/hello_world.tflite"
+SYSTEM_CONFIGS = [
+    "sr100_npu_400MHz_all_vmem",
+    "sr100_npu_400MHz_tensor_vmem_weights_flash66MHz",
+]
+
+
+def test_concurrent_run_subdirs(tmp_path):
+    """publishes concurrent runs of a model into their own namespaces"""
+
+    def compile_config(system_config):
+        return sr100_model_compiler(
+            model_file=MODEL_FILE,
+            output_dir=f"{tmp_path}",
+            system_config=system_config,
+            run_subdir=True,
+            vela_verbosity="none",
+        )
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        runs = list(executor.map(compile_config, SYSTEM_CONFIGS))
+
+    # Staging directories are gone, one manifest per run and the latest one
+    names = sorted(os.listdir(tmp_path))
+    assert not [name for name in names if name.startswith(".")]
+    assert len([name for name in names if name.endswith(".manifest.json")]) == 3
+    assert runs[0]["run_id"] != runs[1]["run_id"]
+
+    for system_config, results in zip(SYSTEM_CONFIGS, runs):
+        manifest = read_run_manifest(f"{tmp_path}", results["run_id"])
+        assert manifest["failure"] is None
+        paths = [entry["path"] for entry in manifest["files"]]
+        assert f"{results['run_id']}/model.cc" in paths
+        for entry in manifest["files"]:
+            assert get_model_hash(f"{tmp_path}/{entry['path']}") == entry["sha256"]
+
+        # Logs are looked up through the manifest of the run
+        assert results["vela_log_file"].startswith(f"{tmp_path}/{results['run_id']}/")
+        log_text = sr100_get_compile_log(f"{tmp_path}", results["run_id"])
+        assert system_config in log_text
+        assert all(
+            config not in log_text
+            for config in SYSTEM_CONFIGS
+            if config != system_config
+        )
+
+
+def test_run_manifest(tmp_path):
+    """lists the published files of a run and names its exact log"""
+
+    results = sr100_model_compiler(
+        model_file=MODEL_FILE,
+        output_dir=f"{tmp_path}",
+        run_id="nightly",
+        model_file_out="hello",
+        model_namespace="hello_ns",
+    )
+    manifest = read_run_manifest(f"{tmp_path}")
+    assert manifest == read_run_manifest(f"{tmp_path}", "nightly")
+    assert results["run_id"] == "nightly"
+    assert manifest["vela_log_file"] == "hello_world_vela.log"
+
+    # The op resolver header is merged into the model source and removed
+    assert sorted(entry["path"] for entry in manifest["files"]) == [
+        "hello.cc",
+        "hello_world.bin",
+        "hello_world_summary_sr100_npu_400MHz_all_vmem.csv",
+        "hello_world_vela.log",
+        "hello_world_vela.tflite",
+    ]
+    assert sr100_get_compile_log(f"{tmp_path}") == sr100_get_compile_log(
+        f"{tmp_path}", "nightly"
+    )
+
+
+def test_in_memory_compile(tmp_path):
+    """returns the generated files as buffers matching a compile to disk"""
+
+    artifacts = sr100_model_compiler_in_memory(
+        model_file=MODEL_FILE, output_dir=f"{tmp_path}/ignored"
+    )
+    assert artifacts.success
+    assert not os.path.exists(f"{tmp_path}/ignored")
+    assert isinstance(artifacts.tflite, memoryview)
+    assert artifacts.tflite == artifacts.bin
+    assert artifacts.io_cc is None
+    assert artifacts.perf_data["cycles_npu"] == float(artifacts.results["cycles_npu"])
+
+    # The resolver is kept separate and appended to the model source
+    resolver = artifacts.resolver.tobytes()
+    assert artifacts.model_cc.tobytes().endswith(resolver)
+
+    sr100_model_compiler(model_file=MODEL_FILE, output_dir=f"{tmp_path}/disk")
+    with open(f"{tmp_path}/disk/hello_world_vela.tflite", "rb") as fp:
+        assert artifacts.tflite == fp.read()
+
+    paths = artifacts.write(f"{tmp_path}/out", ["tflite", "model_cc"])
+    assert sorted(os.listdir(f"{tmp_path}/out")) == [
+        "hello_world_vela.tflite",
+        "model.cc",
+    ]
+    with open(paths[1], "rb") as fp:
+        assert fp.read() == artifacts.model_cc
+
+
+def test_in_memory_compile_no_run(tmp_path):
+    """returns the results without files for models failing validation"""
+
+    with open(MODEL_FILE, "rb") as fp:
+        data = fp.read()
+    model_file = f"{tmp_path}/truncated.tflite"
+    with open(model_file, "wb") as fp:
+        fp.write(data[: len(data) // 2])
+    artifacts = sr100_model_compiler_in_memory(model_file=model_file)
+    assert not artifacts.success
+    assert artifacts.results["failure"] == "invalid"
+    assert not artifacts.files
+    assert artifacts.tflite is None
+
+    # The files are generated even when only the metrics are asked for
+    artifacts = sr100_model_compiler_in_memory(model_file=MODEL_FILE, metrics_only=True)
+    assert artifacts.success
+    assert artifacts.model_cc is not None
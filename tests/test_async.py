@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Testing the asyncio compiler and optimizer"""
+
+import asyncio
+import pytest
+from sr100_model_compiler import (
+    sr100_check_model,
+    sr100_model_compiler_async,
+    sr100_model_optimizer_async,
+)
+from sr100_model_compiler import sr100_model_async
+
+MODEL_FILE = "tests/models/hello_world/hello_world.tflite"
+
+
+def test_compiler_async():
+    """compiles models concurrently under a concurrency limit"""
+
+    async def compile_models():
+        limiter = asyncio.Semaphore(2)
+        return await asyncio.gather(
+            *[
+                sr100_model_compiler_async(concurrency=limiter, model_file=MODEL_FILE)
+                for _ in range(3)
+            ]
+        )
+
+    for results in asyncio.run(compile_models()):
+        success, _ = sr100_check_model(results)
+        assert success
+
+
+def test_compiler_async_cancel(monkeypatch):
+    """cancelling a compile kills the vela process"""
+
+    processes = []
+    create_subprocess_exec = asyncio.create_subprocess_exec
+
+    async def spy_subprocess_exec(*args, **kwargs):
+        process = await create_subprocess_exec(*args, **kwargs)
+        processes.append(process)
+        return process
+
+    monkeypatch.setattr(
+        sr100_model_async.asyncio, "create_subprocess_exec", spy_subprocess_exec
+    )
+
+    async def cancel_compile():
+        task = asyncio.create_task(sr100_model_compiler_async(model_file=MODEL_FILE))
+        while not processes:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_compile())
+    assert processes[0].returncode is not None, "Vela still running"
+
+
+def test_optimizer_async():
+    """optimizes a model from the event loop"""
+
+    success, perf_data = asyncio.run(
+        sr100_model_optimizer_async(concurrency=1, model_file=MODEL_FILE)
+    )
+    assert success
+    assert perf_data["inferences_per_sec"] > 0
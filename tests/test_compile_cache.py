@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Testing the compile cache shared by processes"""
+
+import json
+import multiprocessing
+import os
+import time
+from sr100_model_compiler.compile_cache import CompileCache
+
+KEY = "0" * 64
+WORKERS = 4
+
+
+def compile_once(cache_dir, log_file, barrier):
+    """Misses the cache in a process of its own, logging the compiles it runs"""
+
+    def slow_compile():
+        with open(log_file, "a", encoding="utf-8") as fp:
+            fp.write(f"{os.getpid()}\n")
+        time.sleep(1)
+        return {"cycles_npu": 100, "pid": os.getpid()}
+
+    cache = CompileCache(cache_dir)
+    barrier.wait()
+    results = cache.get_or_compile(KEY, slow_compile)
+    return results, cache.stats
+
+
+def test_single_flight(tmp_path):
+    """compiles a key once across processes missing it at the same time"""
+
+    cache_dir = f"{tmp_path}/cache"
+    log_file = f"{tmp_path}/compiles.log"
+    with multiprocessing.Manager() as manager:
+        barrier = manager.Barrier(WORKERS)
+        with multiprocessing.get_context("spawn").Pool(WORKERS) as pool:
+            outputs = pool.starmap(
+                compile_once, [(cache_dir, log_file, barrier)] * WORKERS
+            )
+
+    with open(log_file, "r", encoding="utf-8") as fp:
+        assert len(fp.read().split()) == 1
+    assert len({results["pid"] for results, _ in outputs}) == 1
+    stats = [stats for _, stats in outputs]
+    assert sum(stat["compiles"] for stat in stats) == 1
+    assert sum(stat["waits"] + stat["hits"] for stat in stats) == WORKERS - 1
+
+    # Only the entry and the lock file are left, no temporary files
+    assert sorted(os.listdir(cache_dir)) == [f"{KEY}.json", "locks"]
+    assert os.listdir(f"{cache_dir}/locks") == [f"{KEY}.lock"]
+
+
+def test_atomic_put(tmp_path):
+    """replaces entries atomically and compiles failed results again"""
+
+    cache = CompileCache(f"{tmp_path}")
+    # A truncated entry from an older writer is a miss
+    with open(cache.get_path(KEY), "w", encoding="utf-8") as fp:
+        fp.write('{"cycles_npu": ')
+    assert cache.get(KEY) is None
+
+    def failed_compile():
+        return {"cycles_npu": 0}
+
+    def keep(results):
+        return results["cycles_npu"]
+
+    assert cache.get_or_compile(KEY, failed_compile, keep) == {"cycles_npu": 0}
+    assert cache.get(KEY) is None
+    assert cache.get_or_compile(KEY, lambda: {"cycles_npu": 5}, keep)["cycles_npu"] == 5
+    assert cache.get_or_compile(KEY, failed_compile, keep)["cycles_npu"] == 5
+    assert cache.stats == {"hits": 1, "waits": 0, "compiles": 2}
+    with open(cache.get_path(KEY), "r", encoding="utf-8") as fp:
+        assert json.load(fp) == {"cycles_npu": 5}
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
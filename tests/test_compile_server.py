@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Testing the compile server"""
+
+import os
+import threading
+import time
+import pytest
+from sr100_model_compiler.sr100_compile_server import (
+    CompileService,
+    create_compile_server,
+    send_server_request,
+)
+
+
+@pytest.fixture(name="server")
+def fixture_server(tmp_path):
+    """starts a compile server on a Unix socket"""
+
+    service = CompileService(workers=1, queue_size=0, jobs_dir=f"{tmp_path}/jobs")
+    socket_path = f"{tmp_path}/server.sock"
+    server = create_compile_server(service, socket_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield service, socket_path
+    server.shutdown()
+    server.server_close()
+    service.shutdown()
+
+
+def test_compile_server(server):
+    """checks a model through the server twice"""
+
+    service, socket_path = server
+    args = {"model_file": "tests/models/hello_world/hello_world.tflite"}
+    for job_id in (1, 2):
+        response = send_server_request("check", args, socket_path)
+        assert response["status"] == "ok", response
+        assert response["success"]
+        assert response["job_id"] == job_id
+        assert response["results"]["cycles_npu"] > 0
+
+    # Job directories are removed after the response
+    assert service.get_status()["completed"] == 2
+    assert not os.listdir(service.jobs_dir)
+
+    response = send_server_request(
+        "check", {"model_file": "missing.tflite"}, socket_path
+    )
+    assert response["status"] == "ok"
+    assert not response["success"]
+
+
+def test_compile_server_busy(server):
+    """rejects requests when every worker and queue slot is taken"""
+
+    service, socket_path = server
+    release = threading.Event()
+    service.actions["compile"] = lambda args: {"success": release.wait(10)}
+
+    responses = []
+    thread = threading.Thread(
+        target=lambda: responses.append(send_server_request("compile", {}, socket_path))
+    )
+    thread.start()
+    while service.get_status()["submitted"] == 0:
+        time.sleep(0.01)
+
+    assert send_server_request("compile", {}, socket_path)["status"] == "busy"
+    release.set()
+    thread.join()
+    assert responses[0]["status"] == "ok"
+    assert service.get_status()["rejected"] == 1
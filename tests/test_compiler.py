@@ -5,7 +5,13 @@ import filecmp
 import argparse
 from pathlib import Path
 import pytest
-from sr100_model_compiler import sr100_model_compiler, call_shell_cmd
+from sr100_model_compiler import (
+    sr100_model_compiler,
+    sr100_check_model,
+    sr100_get_compile_log,
+    call_shell_cmd,
+)
+from sr100_model_compiler.sr100_model_compiler import VELA_LOG_TAIL_LINES
 
 
 model_test_list = [
@@ -157,6 +163,55 @@ def test_float_model(tmp_path):
     assert cycles_npu == 0.0, f"Failed to get 0 cycles in the NPU, found {cycles_npu}"
 
 
+def test_vela_log_stream(tmp_path, capsys):
+    """Streams a verbose Vela log to the file keeping only its tail"""
+
+    model, system_config, _ = model_test_list[1]
+    results = sr100_model_compiler(
+        model_file=model,
+        output_dir=f"{tmp_path}",
+        system_config=system_config,
+        verbose_all=True,
+        vela_verbosity="none",
+    )
+    assert "Network summary" not in capsys.readouterr().out
+
+    # Only the tail is kept in memory, the full log is in the file
+    full_log = sr100_get_compile_log(f"{tmp_path}")
+    assert results["vela_log_file"].endswith("_vela.log")
+    assert len(full_log.splitlines()) > VELA_LOG_TAIL_LINES
+    assert len(results["vela_log"].splitlines()) == VELA_LOG_TAIL_LINES
+    assert full_log.endswith(results["vela_log"])
+
+
+def test_metrics_only(tmp_path, monkeypatch):
+    """Returns the same metrics without writing any files"""
+
+    model, system_config, _ = model_test_list[0]
+    full = sr100_model_compiler(
+        model_file=model, output_dir=f"{tmp_path}/full", system_config=system_config
+    )
+
+    scratch_dir = tmp_path / "scratch"
+    scratch_dir.mkdir()
+    monkeypatch.setenv("SR100_SCRATCH_DIR", f"{scratch_dir}")
+    metrics = sr100_model_compiler(
+        model_file=model,
+        output_dir=f"{tmp_path}/metrics",
+        system_config=system_config,
+        metrics_only=True,
+    )
+    assert not os.path.exists(f"{tmp_path}/metrics")
+    assert not os.listdir(scratch_dir)
+    assert metrics["vela_log_file"] is None
+    assert list(metrics["stage_timings"]) == ["compile"]
+
+    _, full_perf = sr100_check_model(full)
+    _, metrics_perf = sr100_check_model(metrics)
+    for key in ["cycles_npu", "cycles_cpu", "inference_time", "vmem_size", "cpu_ops"]:
+        assert metrics_perf[key] == full_perf[key]
+
+
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""Testing detection of operators left on the CPU"""
+
+import pytest
+from sr100_model_compiler import sr100_model_compiler, sr100_check_model
+from sr100_model_compiler.cpu_fallback import get_cpu_operators, get_custom_op_codes
+
+
+def test_float_model_cpu_operators():
+    """all operators of a float model stay on the CPU"""
+
+    cpu_ops, cycles_cpu = get_cpu_operators(
+        "tests/models/hello_world/hello_world_float.tflite"
+    )
+
+    assert [op["op"] for op in cpu_ops] == ["FULLY_CONNECTED"] * 3
+    assert all(op["cycles"] > 0 for op in cpu_ops)
+    assert cycles_cpu == sum(op["cycles"] for op in cpu_ops)
+
+
+def test_compiled_model_cpu_operators(tmp_path):
+    """a fully mapped model has no CPU operators and NPU only timing"""
+
+    results = sr100_model_compiler(
+        model_file="tests/models/hello_world/hello_world.tflite",
+        output_dir=f"{tmp_path}",
+    )
+    assert get_custom_op_codes(f"{tmp_path}/hello_world_vela.tflite") == {"ethos-u"}
+
+    success, perf_data = sr100_check_model(results)
+    assert success is True
+    assert perf_data["cpu_ops"] == []
+    assert perf_data["cycles_cpu"] == 0
+    assert perf_data["inference_time"] == perf_data["npu_inference_time"]
+
+    # CPU cycles add to the inference time
+    results["cpu_ops"] = [{"op": "SOFTMAX", "name": "softmax", "cycles": 4000}]
+    results["cycles_cpu"] = 4000
+    _, perf_data = sr100_check_model(results)
+    assert perf_data["cpu_inference_time"] == pytest.approx(4000 / 400e6)
+    assert perf_data["inference_time"] == pytest.approx(
+        perf_data["npu_inference_time"] + 4000 / 400e6
+    )
+    assert perf_data["inferences_per_sec"] == pytest.approx(
+        1.0 / perf_data["inference_time"]
+    )
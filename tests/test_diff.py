@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Testing the performance regression diff"""
+
+import json
+from sr100_model_compiler import sr100_model_compiler, sr100_model_diff
+from sr100_model_compiler.sr100_model_diff import has_regression
+from sr100_model_compiler.utils import call_shell_cmd
+
+MODEL_FILE = "tests/models/hello_world/hello_world.tflite"
+
+
+def test_model_diff(tmp_path):
+    """flags slower compiles model by model and layer by layer"""
+
+    for system_config in [
+        "sr100_npu_400MHz_all_vmem",
+        "sr100_npu_400MHz_tensor_vmem_weights_flash66MHz",
+    ]:
+        sr100_model_compiler(
+            model_file=MODEL_FILE,
+            output_dir=f"{tmp_path}/{system_config}",
+            system_config=system_config,
+            profiler_harness=True,
+        )
+    old_dir = f"{tmp_path}/sr100_npu_400MHz_all_vmem"
+    new_dir = f"{tmp_path}/sr100_npu_400MHz_tensor_vmem_weights_flash66MHz"
+
+    rows = sr100_model_diff(old_dir, old_dir)
+    assert {row["status"] for row in rows} == {"ok"}
+    assert any(row["metric"] == "layer_cycles" for row in rows)
+
+    # Weights read from flash make every layer slower
+    rows = sr100_model_diff(old_dir, new_dir)
+    statuses = {row["metric"]: row["status"] for row in rows if row["layer"] == "-"}
+    assert statuses["cycles_npu"] == "regressed"
+    assert statuses["weights_size"] == "ok"
+    assert has_regression(rows)
+    assert not has_regression(sr100_model_diff(new_dir, old_dir))
+
+    assert not has_regression(sr100_model_diff(old_dir, new_dir, rel_threshold=100))
+    thresholds = {
+        "cycles_npu": (0, 100),
+        "inference_time": (0, 100),
+        "layer_cycles": (0, 0),
+    }
+    rows = sr100_model_diff(old_dir, new_dir, thresholds=thresholds)
+    assert not has_regression(rows)
+    assert has_regression(rows, layers=True)
+
+    # Compile results as JSON, with a failed compile of the model
+    results_file = f"{tmp_path}/failed.json"
+    with open(results_file, "w", encoding="utf-8") as fp:
+        json.dump({"hello_world": {"cycles_npu": 0}}, fp)
+    rows = sr100_model_diff(old_dir, results_file)
+    assert [row["status"] for row in rows] == ["failed"]
+    rows = sr100_model_diff(results_file, old_dir)
+    assert [row["status"] for row in rows] == ["fixed"]
+    assert not has_regression(rows)
+
+    # Raw compile results are compared in the units of the Vela summaries
+    results = sr100_model_compiler(model_file=MODEL_FILE, output_dir=f"{tmp_path}/raw")
+    results_file = f"{tmp_path}/raw.json"
+    with open(results_file, "w", encoding="utf-8") as fp:
+        json.dump(results, fp, default=str)
+    rows = sr100_model_diff(f"{tmp_path}/raw", results_file)
+    assert {row["status"] for row in rows} == {"ok"}
+
+    # Models left on the CPU compile without NPU cycles, they are not failures
+    cpu_dir = f"{tmp_path}/cpu"
+    results = sr100_model_compiler(
+        model_file="tests/models/hello_world/hello_world_float.tflite",
+        output_dir=cpu_dir,
+        script=["model"],
+    )
+    cpu_file = f"{tmp_path}/cpu.json"
+    with open(cpu_file, "w", encoding="utf-8") as fp:
+        json.dump(results, fp, default=str)
+    for cpu_report in [cpu_dir, cpu_file]:
+        rows = sr100_model_diff(cpu_report, cpu_report)
+        assert {row["status"] for row in rows} == {"ok"}
+        assert not has_regression(rows)
+
+    success, log = call_shell_cmd(
+        f"python -m sr100_model_compiler.sr100_model_diff {old_dir} {new_dir}"
+    )
+    assert not success
+    assert "regressed" in log
+    success, log = call_shell_cmd(
+        f"python -m sr100_model_compiler.sr100_model_diff {old_dir} {new_dir} "
+        "--rel-threshold 100"
+    )
+    assert success, log
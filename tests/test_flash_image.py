@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Testing the multi-model flash image packer"""
+
+import shutil
+import subprocess
+import pytest
+from sr100_model_compiler.flash_image import (
+    FLASH_FLAG_RELOCATED,
+    FlashEntry,
+    dedup_flash_entries,
+    gen_flash_header,
+    pack_flash_image,
+    read_flash_image,
+)
+from sr100_model_compiler.utils import call_shell_cmd
+
+MODEL_FILES = {
+    "hello": "tests/models/hello_world/hello_world.bin",
+    "detect": "tests/models/uc_person_detection/person_detection_256x480.bin",
+}
+
+# Variants of a model sharing most of their weights
+VARIANT_FILES = {
+    "detect": "tests/models/uc_person_detection/person_detection_256x480.tflite",
+    "detect_vga": "tests/models/uc_person_detection/person_detection_480x640.tflite",
+}
+
+C_PROGRAM = """
+#include <stdio.h>
+#include <stdlib.h>
+#include "models_flash.h"
+
+int main(int argc, char **argv)
+{
+    static uint8_t image[SR100_FLASH_IMAGE_SIZE];
+    FILE *fp = fopen(argv[1], "rb");
+    if (fp == NULL || fread(image, 1, sizeof(image), fp) != sizeof(image))
+        return 1;
+    fclose(fp);
+
+    const sr100_flash_entry_t *entry = sr100_flash_find(image, "detect", SR100_FLASH_KIND_MODEL, 0);
+    if (entry == NULL || entry->offset != SR100_FLASH_DETECT_MODEL_OFFSET ||
+        entry->length != SR100_FLASH_DETECT_MODEL_LEN || entry->ns_id != SR100_FLASH_DETECT_ID)
+        return 2;
+    if (!(entry->flags & SR100_FLASH_FLAG_RELOCATED) &&
+        (uintptr_t)sr100_flash_data(image, entry) % SR100_FLASH_ALIGNMENT != 0)
+        return 3;
+    if (sr100_flash_find(image, "missing", SR100_FLASH_KIND_MODEL, 0) != NULL)
+        return 4;
+
+    uint8_t *model = malloc(entry->length);
+    if (model == NULL || sr100_flash_copy(image, entry, model) != entry->length)
+        return 5;
+    fwrite(model, 1, entry->length, stdout);
+    free(model);
+    return 0;
+}
+"""
+
+
+def read_file(path):
+    """Reads a whole file"""
+    with open(path, "rb") as fp:
+        return fp.read()
+
+
+def test_pack_flash_image():
+    """packs models and test vectors aligned and reads them back"""
+
+    entries = [
+        FlashEntry(name=name, kind="model", data=read_file(path))
+        for name, path in MODEL_FILES.items()
+    ]
+    entries.append(FlashEntry(name="hello", kind="input", data=b"\x01"))
+    entries.append(FlashEntry(name="hello", kind="input", data=b"\x02\x03"))
+    image = pack_flash_image(entries, alignment=4096)
+
+    read_entries = read_flash_image(image)
+    assert [(e["name"], e["kind"], e["index"]) for e in read_entries] == [
+        ("hello", "model", 0),
+        ("detect", "model", 0),
+        ("hello", "input", 0),
+        ("hello", "input", 1),
+    ]
+    assert [e["ns_id"] for e in read_entries] == [0, 1, 0, 0]
+    for entry, read_entry in zip(entries, read_entries):
+        assert read_entry["offset"] % 4096 == 0
+        assert read_entry["data"] == entry.data
+
+    corrupted = bytearray(image)
+    corrupted[entries[1].offset] ^= 0xFF
+    with pytest.raises(ValueError, match="detect is corrupted"):
+        read_flash_image(corrupted)
+
+    with pytest.raises(ValueError, match="no model"):
+        pack_flash_image([FlashEntry(name="other", kind="input", data=b"")])
+    with pytest.raises(ValueError, match="not a C identifier"):
+        pack_flash_image([FlashEntry(name="a-b", kind="model", data=b"")])
+
+
+def test_flash_pack_cli(tmp_path):
+    """packs from the command line and finds models from the generated header"""
+
+    success, _ = call_shell_cmd(
+        f"sr100_flash_pack -m hello={MODEL_FILES['hello']} "
+        f"-m {MODEL_FILES['detect']} -i hello={MODEL_FILES['hello']} "
+        f"-o {tmp_path}/models.img --header {tmp_path}/models_flash.h --align 64"
+    )
+    assert success
+    entries = read_flash_image(read_file(f"{tmp_path}/models.img"))
+    assert [e["name"] for e in entries] == [
+        "hello",
+        "person_detection_256x480",
+        "hello",
+    ]
+    header = (tmp_path / "models_flash.h").read_text(encoding="utf-8")
+    assert "#define SR100_FLASH_HELLO_MODEL_OFFSET" in header
+    assert "#define SR100_FLASH_HELLO_INPUT0_LEN" in header
+
+    success, output = call_shell_cmd(
+        f"sr100_flash_pack -m {VARIANT_FILES['detect']} -m {VARIANT_FILES['detect_vga']} "
+        f"-o {tmp_path}/variants.img --dedup"
+    )
+    assert success
+    assert "saved" in output
+
+
+def test_dedup_flash_image():
+    """stores buffers shared by model variants once and rebuilds the models"""
+
+    entries = [
+        FlashEntry(name=name, kind="model", data=read_file(path))
+        for name, path in VARIANT_FILES.items()
+    ]
+    model_size = sum(len(entry.data) for entry in entries)
+    image = pack_flash_image(entries)
+    shared, report = dedup_flash_entries(entries)
+    dedup_image = pack_flash_image(entries, shared=shared)
+
+    assert report["shared_buffers"] == len(shared) > 0
+    assert report["bytes_saved"] > 800000
+    assert report["bytes_saved"] == sum(report["models"].values())
+    assert len(image) - len(dedup_image) >= report["bytes_saved"] - 16 * len(shared)
+    assert len(dedup_image) < model_size - report["bytes_saved"] + 4096
+
+    for entry, read_entry in zip(entries, read_flash_image(dedup_image)):
+        assert read_entry["flags"] & FLASH_FLAG_RELOCATED
+        assert read_entry["data"] == entry.data
+
+
+@pytest.mark.parametrize("dedup", [False, True])
+@pytest.mark.skipif(shutil.which("gcc") is None, reason="needs a C compiler")
+def test_flash_header_compiles(tmp_path, dedup):
+    """finds and copies a model in the image through the generated C header"""
+
+    model_files = VARIANT_FILES if dedup else MODEL_FILES
+    entries = [
+        FlashEntry(name=name, kind="model", data=read_file(path))
+        for name, path in model_files.items()
+    ]
+    shared = dedup_flash_entries(entries)[0] if dedup else None
+    image = pack_flash_image(entries, alignment=16, shared=shared)
+    (tmp_path / "models.img").write_bytes(image)
+    gen_flash_header(entries, image, f"{tmp_path}/models_flash.h", "models.img")
+
+    (tmp_path / "main.c").write_text(C_PROGRAM, encoding="utf-8")
+    subprocess.run(
+        ["gcc", "-std=c99", "-Wall", "-Werror", "-o", "main", "main.c"],
+        cwd=tmp_path,
+        check=True,
+    )
+    run = subprocess.run(
+        [f"{tmp_path}/main", f"{tmp_path}/models.img"], capture_output=True, check=True
+    )
+    assert run.stdout == read_file(model_files["detect"])
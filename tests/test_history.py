@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Testing the compile history database"""
+
+import time
+from sr100_model_compiler import sr100_model_compiler
+from sr100_model_compiler.compile_cache import get_model_hash
+from sr100_model_compiler.compile_history import CompileHistory, CompileRecord
+from sr100_model_compiler.utils import call_shell_cmd
+
+MODEL_FILE = "tests/models/hello_world/hello_world.tflite"
+
+
+def test_compile_history(tmp_path):
+    """records compiles and queries them from python and the command line"""
+
+    db_path = f"{tmp_path}/history.db"
+    for system_config in [
+        "sr100_npu_400MHz_all_vmem",
+        "sr100_npu_400MHz_tensor_vmem_weights_flash66MHz",
+    ]:
+        results = sr100_model_compiler(
+            model_file=MODEL_FILE,
+            output_dir=f"{tmp_path}/{system_config}",
+            system_config=system_config,
+            history_db=db_path,
+        )
+        assert set(results["stage_timings"]) == {"prepare", "compile", "generate"}
+
+    with CompileHistory(db_path) as history:
+        trend = history.get_trend("hello_world")
+        assert len(trend) == 2
+        assert trend[0].timestamp <= trend[1].timestamp
+        assert all(record.success and record.inference_time > 0 for record in trend)
+        assert trend[0].args["system_config"] == "sr100_npu_400MHz_all_vmem"
+
+        best = history.get_best()
+        assert len(best) == 1
+        assert best[0].inference_time == min(r.inference_time for r in trend)
+
+        lookup = history.get_by_hash(get_model_hash(MODEL_FILE), limit=1)
+        assert [record.id for record in lookup] == [trend[1].id]
+
+    success, log = call_shell_cmd(
+        f"python -m sr100_model_compiler.compile_history --db {db_path} "
+        f"lookup {MODEL_FILE}"
+    )
+    assert success, log
+    assert log.count("hello_world") == 2
+
+    success, _ = call_shell_cmd(
+        f"python -m sr100_model_compiler.compile_history --db {db_path} best missing"
+    )
+    assert not success
+
+
+def test_compile_history_scale(tmp_path):
+    """keeps model lookups fast with many records"""
+
+    with CompileHistory(f"{tmp_path}/history.db") as history:
+        with history.connection:
+            history.connection.executemany(
+                "INSERT INTO compiles (timestamp, model_name, model_hash, "
+                "vela_version, success, inference_time, args, stage_timings) "
+                "VALUES (?, ?, ?, '4.3.0', ?, ?, '{}', '{}')",
+                (
+                    (i, f"model_{i % 1000}", f"hash_{i % 1000}", i % 2, i * 1e-6)
+                    for i in range(200000)
+                ),
+            )
+        history.add(
+            CompileRecord(
+                timestamp=time.time(),
+                model_name="model_7",
+                model_hash="hash_7",
+                vela_version="4.3.0",
+                system_config="sr100_npu_400MHz_all_vmem",
+                accelerator_config="ethos-u55-128",
+                optimize="Size",
+                success=True,
+                inference_time=1e-9,
+            )
+        )
+
+        start_time = time.perf_counter()
+        for _ in range(100):
+            lookup = history.get_by_hash("hash_7", limit=10)
+            best = history.get_best("model_7")
+        elapsed = time.perf_counter() - start_time
+
+        assert lookup[0].system_config == "sr100_npu_400MHz_all_vmem"
+        assert best[0].inference_time == 1e-9
+        assert elapsed < 1.0, f"Indexed queries took {elapsed:.3f}s"
+        assert len(history.get_best()) == 500
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Testing the .incbin model output against the C array"""
+
+import re
+import shutil
+import subprocess
+import pytest
+from sr100_model_compiler import sr100_model_compiler
+
+MODEL_FILE = "tests/models/hello_world/hello_world.tflite"
+
+C_PROGRAM = """
+#include <stdint.h>
+#include <stdio.h>
+
+extern const uint8_t model_nn_model[];
+extern const uint32_t model_nn_model_len;
+
+int main(void)
+{
+    if ((uintptr_t)model_nn_model % 16 != 0)
+        return 1;
+    fwrite(model_nn_model, 1, model_nn_model_len, stdout);
+    return 0;
+}
+"""
+
+pytestmark = pytest.mark.skipif(
+    not all(shutil.which(tool) for tool in ["gcc", "nm", "objdump", "objcopy"]),
+    reason="needs gcc and binutils",
+)
+
+
+def run(cmd, cwd):
+    """Runs a tool and returns its output"""
+    return subprocess.run(cmd, cwd=cwd, capture_output=True, check=True).stdout
+
+
+def get_array_bytes(cc_file):
+    """Reads back the bytes of the C array of a model source"""
+    with open(cc_file, "r", encoding="utf-8") as fp:
+        return bytes(
+            int(value, 16) for value in re.findall(r"0x([0-9a-f]{2}),", fp.read())
+        )
+
+
+def test_incbin_model(tmp_path):
+    """links the same bytes as the C array with .incbin"""
+
+    sr100_model_compiler(model_file=MODEL_FILE, output_dir=f"{tmp_path}/array")
+    sr100_model_compiler(
+        model_file=MODEL_FILE, output_dir=f"{tmp_path}/incbin", model_format="incbin"
+    )
+    out_dir = tmp_path / "incbin"
+    with open(out_dir / "hello_world.bin", "rb") as fp:
+        model = fp.read()
+    assert get_array_bytes(tmp_path / "array" / "model.cc") == model
+
+    # The source only declares the model, the .S links it in
+    model_cc = (out_dir / "model.cc").read_text(encoding="utf-8")
+    assert "0x" not in model_cc.split("get_resolver")[0]
+    assert 'extern "C" const uint8_t model_nn_model[];' in model_cc
+
+    run(["gcc", "-c", "model.S", "-o", "model.o"], out_dir)
+    symbols = run(["nm", "-S", "model.o"], out_dir).decode("utf-8").split("\n")
+    sizes = {
+        fields[3]: int(fields[1], 16)
+        for fields in (line.split() for line in symbols)
+        if len(fields) == 4
+    }
+    assert sizes == {"model_nn_model": len(model), "model_nn_model_len": 4}
+
+    # The model is 16 byte aligned in the section of the C array
+    headers = run(["objdump", "-h", "model.o"], out_dir).decode("utf-8")
+    assert re.search(r"test_attribute\s+[0-9a-f]+(\s+[0-9a-f]+){3}\s+2\*\*4", headers)
+    run(
+        [
+            "objcopy",
+            "-O",
+            "binary",
+            "--only-section=test_attribute",
+            "model.o",
+            "section.bin",
+        ],
+        out_dir,
+    )
+    assert (out_dir / "section.bin").read_bytes() == model
+
+    # The section can be overridden when assembling
+    run(["gcc", "-c", "-DMODEL_TFLITE_SECTION=.rodata.nn", "model.S"], out_dir)
+    assert ".rodata.nn" in run(["objdump", "-h", "model.o"], out_dir).decode("utf-8")
+
+    (out_dir / "main.c").write_text(C_PROGRAM, encoding="utf-8")
+    # .incbin finds the .bin through the include path from another directory
+    run(
+        ["gcc", "-o", "main", "incbin/main.c", "incbin/model.S", f"-I{out_dir}"],
+        tmp_path,
+    )
+    assert run([str(tmp_path / "main")], tmp_path) == model
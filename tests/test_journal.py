@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Testing the journal resuming interrupted optimizer searches"""
+
+import pytest
+from sr100_model_compiler import sr100_model_compiler
+from sr100_model_compiler.sr100_model_optimizer import (
+    get_optimizer_argparser,
+    run_optimizer,
+)
+from sr100_model_compiler.sweep_journal import read_journal
+from sr100_model_compiler.utils import call_shell_cmd, get_args_from_call
+
+MODEL_FILE = "tests/models/hello_world/hello_world.tflite"
+
+
+class Interrupted(Exception):
+    """Stands in for a CI timeout or a killed process"""
+
+
+def counting_compile(counts, interrupt_after=None):
+    """Gets a compile function counting its compiles, failing after some"""
+
+    def compile_model(**kwargs):
+        if interrupt_after is not None and counts["compiles"] >= interrupt_after:
+            raise Interrupted()
+        counts["compiles"] += 1
+        return sr100_model_compiler(**kwargs)
+
+    return compile_model
+
+
+def test_resume_search(tmp_path):
+    """resumes an interrupted target search without compiling candidates again"""
+
+    # Every system config is searched for a target out of reach
+    journal_file = f"{tmp_path}/search.jsonl"
+    args = get_args_from_call(
+        get_optimizer_argparser(),
+        model_file=MODEL_FILE,
+        target_inferences_per_sec=1.0e9,
+        journal=journal_file,
+    )
+
+    counts = {"compiles": 0}
+    with pytest.raises(Interrupted):
+        run_optimizer(args, counting_compile(counts, interrupt_after=3))
+    # The finished compiles can be read while the search is stopped
+    assert len(read_journal(journal_file)) == 3
+    success, output = call_shell_cmd(f"sr100_sweep_journal {journal_file}")
+    assert success
+    assert "sr100_npu_400MHz_tensor_vmem_weights_flash66MHz" in output
+
+    # A write cut short by the interruption is dropped
+    with open(journal_file, "a", encoding="utf-8") as fp:
+        fp.write('{"key": "partial", "results": {"cyc')
+
+    counts = {"compiles": 0}
+    success, perf_data = run_optimizer(args, counting_compile(counts))
+    assert success is False
+    assert perf_data["candidates_evaluated"] == len(read_journal(journal_file)) - 1
+    resumed_compiles = counts["compiles"]
+    assert resumed_compiles > 0
+    assert len(read_journal(journal_file)) == 3 + resumed_compiles
+
+    # Once finished, a rerun only replays the journal
+    counts = {"compiles": 0}
+    assert run_optimizer(args, counting_compile(counts)) == (success, perf_data)
+    assert counts["compiles"] == 0
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Testing the model checks that run before the compile"""
+
+import os
+from sr100_model_compiler import sr100_model_compiler
+from sr100_model_compiler.model_validation import validate_model
+
+MODEL_FILE = "tests/models/hello_world/hello_world.tflite"
+FLOAT_MODEL_FILE = "tests/models/hello_world/hello_world_float.tflite"
+
+
+def get_checks(report):
+    """Gets the checks that failed with an error"""
+    return [d["check"] for d in report["diagnostics"] if d["level"] == "error"]
+
+
+def test_validate_model(tmp_path):
+    """reports the header, type and operator errors of bad models"""
+
+    report = validate_model(MODEL_FILE)
+    assert report["valid"] is True
+    assert not report["diagnostics"]
+    assert report["npu_ops"] == 3
+
+    report = validate_model(FLOAT_MODEL_FILE)
+    assert report["valid"] is False
+    assert get_checks(report) == ["dtype"]
+    assert report["cpu_ops"] == 3
+    # Vela leaves a model without NPU operators on the CPU
+    report = validate_model(FLOAT_MODEL_FILE, ["model"])
+    assert report["valid"] is True
+    assert "No operator of the model runs on the NPU" in [
+        d["message"] for d in report["diagnostics"]
+    ]
+    # Without the inout script the float inputs are fine
+    assert validate_model(FLOAT_MODEL_FILE, [])["valid"] is True
+
+    with open(MODEL_FILE, "rb") as fp:
+        data = fp.read()
+    for size in [4, 100, len(data) // 2, len(data) - 40]:
+        (tmp_path / "truncated.tflite").write_bytes(data[:size])
+        report = validate_model(f"{tmp_path}/truncated.tflite")
+        assert get_checks(report) == ["header"]
+    assert get_checks(validate_model(f"{tmp_path}/missing.tflite")) == ["header"]
+
+    # The Vela output only runs on the NPU, the inout script skips it
+    sr100_model_compiler(model_file=MODEL_FILE, output_dir=f"{tmp_path}", script=[])
+    report = validate_model(f"{tmp_path}/hello_world_vela.tflite")
+    assert report["valid"] is True
+    assert [d["check"] for d in report["diagnostics"]] == ["custom_op"]
+
+
+def test_validate_compile(tmp_path):
+    """skips Vela for a model bound to fail, compiles CPU only models"""
+
+    with open(MODEL_FILE, "rb") as fp:
+        data = fp.read()
+    (tmp_path / "truncated.tflite").write_bytes(data[: len(data) // 2])
+    results = sr100_model_compiler(
+        model_file=f"{tmp_path}/truncated.tflite", output_dir=f"{tmp_path}/invalid"
+    )
+    assert results["failure"] == "invalid"
+    assert results["cycles_npu"] == 0
+    assert get_checks(results["validation"]) == ["header"]
+    assert not os.path.exists(f"{tmp_path}/invalid")
+
+    # The float model runs on the CPU only, Vela compiles it
+    for skip_validation in [False, True]:
+        output_dir = f"{tmp_path}/float_{skip_validation}"
+        results = sr100_model_compiler(
+            model_file=FLOAT_MODEL_FILE,
+            output_dir=output_dir,
+            script=["model"],
+            skip_validation=skip_validation,
+        )
+        assert results["failure"] is None
+        assert float(results["cycles_npu"]) == 0
+        assert os.path.exists(f"{output_dir}/model.cc")
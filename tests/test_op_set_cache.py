@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Testing the operator set cache of the resolver generation"""
+
+import glob
+import os
+import shutil
+from sr100_model_compiler import sr100_model_compiler
+from sr100_model_compiler.generate_micro_mutable_op_resolver_from_model import (
+    generate_micro_mutable_ops_resolver_header,
+)
+from sr100_model_compiler.op_set_cache import OpSetCache
+from sr100_model_compiler.utils import call_shell_cmd
+
+MODEL_FILE = "tests/models/hello_world/hello_world.tflite"
+
+
+def generate_resolver(models_dir, output_dir, op_set_cache=None):
+    """Generates the union resolver of the models and returns it"""
+
+    models = sorted(os.listdir(models_dir))
+    generate_micro_mutable_ops_resolver_header(
+        f"{models_dir}", models, f"{output_dir}", "zoo", "", op_set_cache=op_set_cache
+    )
+    return (output_dir / "zoo_micro_mutable_op_resolver.hpp").read_text(
+        encoding="utf-8"
+    )
+
+
+def test_op_set_cache(tmp_path):
+    """parses the models once and matches the uncached resolver"""
+
+    models_dir = tmp_path / "models"
+    models_dir.mkdir()
+    for model in glob.glob("tests/models/*/*.tflite"):
+        shutil.copy(model, models_dir)
+    output_dir = tmp_path / "out"
+    index_file = f"{tmp_path}/op_sets.json"
+    expected = generate_resolver(models_dir, output_dir)
+
+    cache = OpSetCache(index_file)
+    assert generate_resolver(models_dir, output_dir, cache) == expected
+    models = len(os.listdir(models_dir))
+    assert cache.stats["hits"] == 0
+    assert cache.stats["hashed"] == models
+
+    # A new process finds every model in the index
+    cache = OpSetCache(index_file)
+    assert generate_resolver(models_dir, output_dir, cache) == expected
+    assert cache.stats["hits"] == models
+    assert cache.stats["parsed"] == 0
+
+    # A touched model is hashed again, but not parsed
+    model_file = models_dir / "hello_world.tflite"
+    stat = os.stat(model_file)
+    os.utime(model_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+    op_sets = cache.get_op_sets([f"{model_file}"])
+    assert cache.stats["hashed"] == 1
+    assert cache.stats["parsed"] == 0
+
+    # A new model content is parsed
+    with open(model_file, "ab") as fp:
+        fp.write(bytes(16))
+    assert cache.get_op_sets([f"{model_file}"]) == op_sets
+    assert cache.stats["parsed"] == 1
+
+    # Removed models leave the index
+    os.remove(model_file)
+    cache.save()
+    assert os.path.abspath(model_file) not in OpSetCache(index_file).files
+    assert len(OpSetCache(index_file).files) == models - 1
+
+
+def test_op_set_cache_compiler(tmp_path, capsys):
+    """reuses the operator sets of the compiled model across compiles"""
+
+    index_file = f"{tmp_path}/op_sets.json"
+    for name in ["first", "second"]:
+        sr100_model_compiler(
+            model_file=MODEL_FILE,
+            output_dir=f"{tmp_path}/{name}",
+            op_set_cache=index_file,
+        )
+    # The Vela output of the second compile has the same content
+    assert "0 cached, 1 hashed, 0 parsed" in capsys.readouterr().out
+    # The staged Vela outputs are not indexed by their paths
+    assert len(OpSetCache(index_file).op_sets) == 1
+    assert not OpSetCache(index_file).files
+
+    success, output = call_shell_cmd(
+        f"sr100_model_resolver {MODEL_FILE} -o {tmp_path}/cli"
+        f" --op-set-cache {index_file}"
+    )
+    assert success
+    assert "0 cached, 1 hashed, 1 parsed" in output
+    assert os.path.exists(f"{tmp_path}/cli/model_micro_mutable_op_resolver.hpp")
@@ -53,6 +53,59 @@ def test_model_optimizer(
     ), f'{model_file} - Expected model location {model_loc}, got {results["model_loc"]}'
 
 
+target_test_list = [
+    ("tests/models/hello_world/hello_world.tflite", 1000.0, True),
+    ("tests/models/hello_world/hello_world.tflite", 1.0e9, False),
+]
+
+
+@pytest.mark.parametrize(
+    "model_file, target_inferences_per_sec, target_met_expect",
+    target_test_list,
+)
+def test_model_optimizer_target(
+    model_file, target_inferences_per_sec, target_met_expect
+):
+    """searches for the least vmem configuration meeting a frame rate"""
+
+    success, results = sr100_model_optimizer(
+        model_file=model_file,
+        target_inferences_per_sec=target_inferences_per_sec,
+    )
+
+    assert success == target_met_expect, f"Target search failed for {model_file}"
+    assert results["target_met"] == target_met_expect
+    if target_met_expect:
+        assert results["inferences_per_sec"] >= target_inferences_per_sec
+        assert results["target_shortfall"] == 0.0
+        assert results["model_loc"] == "flash"
+    else:
+        assert results["target_shortfall"] > 0.0
+        assert 0.0 < results["target_shortfall_pct"] < 100.0
+
+
+def test_model_optimizer_failed(tmp_path):
+    """returns failed compiles, and CPU only models like Vela compiles them"""
+
+    success, results = sr100_model_optimizer(
+        model_file="tests/models/hello_world/hello_world_float.tflite"
+    )
+    assert success is True
+    assert results["cycles_npu"] == 0
+
+    with open("tests/models/hello_world/hello_world.tflite", "rb") as fp:
+        data = fp.read()
+    model_file = f"{tmp_path}/truncated.tflite"
+    with open(model_file, "wb") as fp:
+        fp.write(data[: len(data) // 2])
+    for target_inferences_per_sec in [None, 1000.0]:
+        success, results = sr100_model_optimizer(
+            model_file=model_file, target_inferences_per_sec=target_inferences_per_sec
+        )
+        assert success is False
+        assert results["failure"] == "invalid"
+
+
 if __name__ == "__main__":
 
     # Run all the tests and update if needed
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Testing the profiler harness and the host-side profile alignment"""
+
+import os
+import pytest
+from sr100_model_compiler import sr100_model_compiler
+from sr100_model_compiler.profile_parser import (
+    read_profiler_log,
+    get_estimated_ops,
+    align_profile,
+)
+
+
+def test_profiler_harness(tmp_path):
+    """generates the harness and aligns a recorded device log"""
+
+    out_dir = f"{tmp_path}"
+    results = sr100_model_compiler(
+        model_file="tests/models/hello_world/hello_world.tflite",
+        output_dir=out_dir,
+        profiler_harness=True,
+    )
+
+    harness_file = f"{out_dir}/model_profiler.cc"
+    assert os.path.exists(harness_file), f"Failed to find {harness_file}"
+    with open(harness_file, "r", encoding="utf-8") as f:
+        harness = f.read()
+    assert "tflite::MicroProfiler profiler;" in harness
+    assert "get_user_input_buffer" not in harness
+
+    # Single ethos-u operator carries all the Vela layers
+    estimated_ops = get_estimated_ops(
+        f"{out_dir}/hello_world_vela.tflite", results["per_layer"]
+    )
+    assert len(estimated_ops) == 1
+    assert estimated_ops[0]["unit"] == "npu"
+    assert estimated_ops[0]["layers"] == len(results["per_layer"])
+    assert estimated_ops[0]["estimated_cycles"] == sum(
+        float(row["Op Cycles"]) for row in results["per_layer"]
+    )
+
+    # Only the last run of the recorded log is used
+    events = read_profiler_log("tests/profiles/hello_world_profile.log")
+    assert events == [{"tag": "ethos-u", "ticks": 1187}]
+    aligned = align_profile(events, estimated_ops, ticks_per_second=400e6)
+    assert aligned[0]["unit"] == "npu"
+    assert aligned[0]["ratio"] == pytest.approx(
+        1187 / estimated_ops[0]["estimated_cycles"]
+    )
+
+
+def test_cpu_profile_alignment():
+    """aligns a recorded log of CPU operators using the human readable format"""
+
+    events = read_profiler_log("tests/profiles/hello_world_float_profile.log")
+    assert [event["ticks"] for event in events] == [9120, 10044, 9233]
+
+    estimated_ops = get_estimated_ops(
+        "tests/models/hello_world/hello_world_float.tflite", []
+    )
+    aligned = align_profile(events, estimated_ops, ticks_per_second=400e6)
+    assert [row["unit"] for row in aligned] == ["cpu"] * 3
+    assert aligned[1]["name"] == estimated_ops[1]["name"]
+    assert all(row["ratio"] > 0 for row in aligned)
+
+    # Unmatched events keep their measurement without an estimate
+    aligned = align_profile(
+        [{"tag": "SOFTMAX", "ticks": 10}] + events, estimated_ops, 400e6
+    )
+    assert aligned[0]["estimated_time"] is None
+    assert aligned[1]["name"] == estimated_ops[0]["name"]
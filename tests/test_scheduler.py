@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Testing the resource aware scheduling of compiles"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sr100_model_compiler import sr100_model_compiler
+from sr100_model_compiler.job_scheduler import ResourceScheduler, MemoryEstimates
+
+MODEL_FILE = "tests/models/hello_world/hello_world.tflite"
+
+
+def test_vela_timeout(tmp_path):
+    """kills vela when it runs past the timeout"""
+
+    results = sr100_model_compiler(
+        model_file=MODEL_FILE, output_dir=f"{tmp_path}", vela_timeout=0.01
+    )
+    assert results["cycles_npu"] == 0
+    assert results["failure"] == "timeout"
+
+
+def test_vela_memory_limit(tmp_path):
+    """reports vela running out of address space as a memory failure"""
+
+    results = sr100_model_compiler(
+        model_file=MODEL_FILE,
+        output_dir=f"{tmp_path}",
+        vela_memory_limit=64 * 1024 * 1024,
+    )
+    assert results["cycles_npu"] == 0
+    assert results["failure"] == "memory"
+
+
+def test_scheduler_admission():
+    """holds jobs back while their memory does not fit"""
+
+    scheduler = ResourceScheduler(max_workers=4, memory_budget=100)
+    running = []
+    peak_running = []
+    lock = threading.Lock()
+
+    def job(memory):
+        with scheduler.reserve(memory):
+            with lock:
+                running.append(memory)
+                peak_running.append(sum(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(memory)
+
+    # Jobs larger than the budget still run, alone
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(job, [60, 60, 30, 150]))
+
+    assert max(peak_running) <= 150
+    assert 120 not in peak_running, "Two 60 byte jobs ran next to each other"
+
+
+def test_scheduler_learns_memory(tmp_path):
+    """learns the vela peak memory of a model from its compile"""
+
+    estimates_file = f"{tmp_path}/vela_memory.json"
+    scheduler = ResourceScheduler(estimates=MemoryEstimates(estimates_file))
+    default_estimate = scheduler.estimates.get(MODEL_FILE)
+
+    results = scheduler.run(  # pylint: disable=W1117
+        MODEL_FILE,
+        sr100_model_compiler,
+        model_file=MODEL_FILE,
+        output_dir=f"{tmp_path}",
+    )
+    assert results["failure"] is None
+    assert results["vela_peak_memory"] > 0
+
+    # A new scheduler starts from the learned estimate
+    estimates = MemoryEstimates(estimates_file)
+    assert estimates.get(MODEL_FILE) == results["vela_peak_memory"]
+    assert estimates.get(MODEL_FILE) != default_estimate
+    with open(estimates_file, "r", encoding="utf-8") as fp:
+        assert len(json.load(fp)) == 1
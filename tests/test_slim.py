@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Testing the flatbuffer slimming pass"""
+
+import os
+import numpy as np
+import tensorflow as tf
+from sr100_model_compiler import sr100_model_compiler
+from sr100_model_compiler.flash_image import get_buffer_regions
+from sr100_model_compiler.slim_model import get_schema, slim_model_data
+
+MODEL_FILE = "tests/models/hello_world/hello_world.tflite"
+VELA_MODEL_FILE = "tests/models/uc_person_detection/person_detection_256x480.bin"
+
+
+def read_file(path):
+    """Reads a whole file"""
+    with open(path, "rb") as fp:
+        return fp.read()
+
+
+def get_metadata_names(data):
+    """Gets the names of the metadata of a model"""
+    model = get_schema().Model.GetRootAs(data, 0)
+    return [model.Metadata(i).Name() for i in range(model.MetadataLength())]
+
+
+def test_slim_vela_model():
+    """keeps the offline memory plan and the buffer alignment of a Vela model"""
+
+    data = read_file(VELA_MODEL_FILE)
+    slim_data, report = slim_model_data(data, "detect")
+    assert report["bytes_saved"] == len(data) - len(slim_data) > 0
+    assert "vela_version" in report["removed_metadata"]
+    assert get_metadata_names(slim_data) == [b"OfflineMemoryAllocation"]
+
+    # The command stream and weights stay 16 byte aligned for the NPU
+    starts = [start for start, length in get_buffer_regions(slim_data) if length]
+    assert starts
+    assert all(start % 16 == 0 for start in starts)
+
+
+def test_slim_model_runs():
+    """runs a slimmed model like the original one"""
+
+    data = read_file(MODEL_FILE)
+    slim_data, report = slim_model_data(data)
+    assert report["removed_metadata"] == "min_runtime_version"
+    assert report["slim_size"] < len(data)
+
+    outputs = []
+    for model_content in [data, slim_data]:
+        interpreter = tf.lite.Interpreter(model_content=model_content)
+        interpreter.allocate_tensors()
+        input_details = interpreter.get_input_details()[0]
+        interpreter.set_tensor(
+            input_details["index"],
+            np.full(input_details["shape"], 42, input_details["dtype"]),
+        )
+        interpreter.invoke()
+        outputs.append(
+            interpreter.get_tensor(interpreter.get_output_details()[0]["index"])
+        )
+    assert np.array_equal(outputs[0], outputs[1])
+
+
+def test_slim_compile(tmp_path):
+    """embeds the slimmed Vela output in the generated sources"""
+
+    results = sr100_model_compiler(
+        model_file=MODEL_FILE, output_dir=f"{tmp_path}/full", run_id="full"
+    )
+    slim_results = sr100_model_compiler(
+        model_file=MODEL_FILE, output_dir=f"{tmp_path}/slim", slim=True
+    )
+    assert "slim" not in results
+    assert slim_results["cycles_npu"] == results["cycles_npu"]
+
+    saved = slim_results["slim"]["bytes_saved"]
+    assert saved > 0
+    for name in ["hello_world_vela.tflite", "hello_world.bin"]:
+        full_size = os.path.getsize(f"{tmp_path}/full/{name}")
+        assert os.path.getsize(f"{tmp_path}/slim/{name}") == full_size - saved
+    assert os.path.getsize(f"{tmp_path}/slim/model.cc") < os.path.getsize(
+        f"{tmp_path}/full/model.cc"
+    )
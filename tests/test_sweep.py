@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Testing hardware sweeps of models"""
+
+import os
+from sr100_model_compiler import sr100_memory_sweep, sr100_accelerator_sweep
+
+
+def test_memory_sweep(tmp_path):
+    """sweeps flash parameters and checks the sensitivity curves"""
+
+    cache_dir = f"{tmp_path}/cache"
+    sweep_params = {
+        "OffChipFlash_clock_scale": [0.1, 0.25, 1.0],
+        "OffChipFlash_read_latency": [4, 64],
+    }
+    curves = sr100_memory_sweep(
+        "tests/models/hello_world/hello_world.tflite",
+        sweep_params,
+        workers=2,
+        cache_dir=cache_dir,
+    )
+
+    assert list(curves.keys()) == list(sweep_params.keys())
+    clock_curve = curves["OffChipFlash_clock_scale"]
+    assert [point["value"] for point in clock_curve] == [0.1, 0.25, 1.0]
+    cycles = [point["cycles_total"] for point in clock_curve]
+    assert cycles[0] > cycles[-1], f"Faster flash should take fewer cycles {cycles}"
+    latency_curve = curves["OffChipFlash_read_latency"]
+    assert latency_curve[0]["cycles_total"] <= latency_curve[1]["cycles_total"]
+
+    # Second sweep is served from the cache, next to the learned memory estimates
+    assert len([name for name in os.listdir(cache_dir) if name.endswith(".json")]) == 6
+    assert os.path.exists(f"{cache_dir}/vela_memory.json")
+    cached_curves = sr100_memory_sweep(
+        "tests/models/hello_world/hello_world.tflite",
+        sweep_params,
+        cache_dir=cache_dir,
+    )
+    assert cached_curves == curves
+
+
+def test_accelerator_sweep(tmp_path):
+    """compares models across accelerator configurations"""
+
+    model_files = ["tests/models/hello_world/hello_world.tflite"]
+    accelerator_configs = ["ethos-u55-32", "ethos-u55-128", "ethos-u65-256"]
+    rows = sr100_accelerator_sweep(
+        model_files, accelerator_configs, cache_dir=f"{tmp_path}/cache"
+    )
+
+    assert [row["accelerator_config"] for row in rows] == accelerator_configs
+    for row in rows:
+        assert row["model"] == "hello_world"
+        assert row["cycles_npu"] > 0, f"Failed to compile for {row}"
+        assert row["weights_size"] > 0
+
+    # Fewer MACs should not be faster
+    assert rows[0]["cycles_npu"] >= rows[1]["cycles_npu"]
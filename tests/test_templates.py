@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""Testing the template registry"""
+
+import os
+from sr100_model_compiler.template_registry import (
+    get_jinja_env,
+    get_mako_template,
+    set_template_cache_dir,
+)
+
+
+def test_template_registry(tmp_path):
+    """compiles every template once and persists the Mako modules"""
+
+    assert get_jinja_env() is get_jinja_env()
+    header = get_jinja_env().get_template("header_template.txt")
+    assert header is get_jinja_env().get_template("header_template.txt")
+
+    cache_dir = f"{tmp_path}/templates"
+    set_template_cache_dir(cache_dir)
+    try:
+        template = get_mako_template("io_template.mako")
+        assert template is get_mako_template("io_template.mako")
+        assert os.listdir(cache_dir) == ["io_template.mako.py"]
+
+        # A new registry loads the compiled module instead of the template
+        set_template_cache_dir(cache_dir)
+        assert get_mako_template("io_template.mako") is not template
+        assert os.listdir(cache_dir) == ["io_template.mako.py"]
+    finally:
+        set_template_cache_dir(None)
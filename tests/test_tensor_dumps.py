@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Testing the intermediate tensor dumps and the divergence search"""
+
+import os
+import numpy as np
+from sr100_model_compiler import sr100_model_compiler
+from sr100_model_compiler.tensor_dumps import compare_tensor_dumps, read_dump_index
+from sr100_model_compiler.utils import call_shell_cmd
+
+MODEL_FILE = "tests/models/hello_world/hello_world.tflite"
+
+
+def test_tensor_dumps(tmp_path):
+    """dumps the selected tensors in execution order and finds the first divergence"""
+
+    sr100_model_compiler(
+        model_file=MODEL_FILE,
+        output_dir=f"{tmp_path}",
+        script=["model", "inout"],
+        dump_tensors=["*"],
+        dump_tensors_c=True,
+    )
+    golden_file = f"{tmp_path}/model_tensors.npz"
+    tensors = read_dump_index(golden_file)
+    assert [tensor["order"] for tensor in tensors] == list(range(len(tensors)))
+    produced = [tensor for tensor in tensors if tensor["op"] != "-"]
+    assert len(produced) >= 3
+
+    # The model output is the last tensor produced
+    golden = np.load(golden_file)
+    expected_output = np.load(f"{tmp_path}/model_output_0.npy")
+    assert np.array_equal(golden[produced[-1]["key"]], expected_output)
+
+    cc_text = (tmp_path / "model_tensors.cc").read_text(encoding="utf-8")
+    assert f"golden_tensor{len(tensors) - 1}[" in cc_text
+    assert f"return {len(tensors)};" in cc_text
+
+    # Device dumps named by tensor index, the first layer is right
+    device_dir = tmp_path / "device"
+    device_dir.mkdir()
+    for tensor in produced:
+        golden[tensor["key"]].tofile(device_dir / f"{tensor['index']}.bin")
+    comparison = compare_tensor_dumps(golden_file, f"{device_dir}")
+    assert comparison["first_divergence"] is None
+    assert {row["status"] for row in comparison["rows"]} == {"match", "missing"}
+
+    for tensor in produced[1:]:
+        data = golden[tensor["key"]].copy()
+        # Flipping the lowest bit changes an integer by one without overflow
+        data.flat[0] ^= 1
+        data.tofile(device_dir / f"{tensor['index']}.bin")
+    comparison = compare_tensor_dumps(golden_file, f"{device_dir}")
+    assert comparison["first_divergence"]["order"] == produced[1]["order"]
+    assert comparison["first_divergence"]["mismatches"] == 1
+    assert (
+        compare_tensor_dumps(golden_file, f"{device_dir}", atol=1)["first_divergence"]
+        is None
+    )
+
+    success, output = call_shell_cmd(f"sr100_tensor_compare {golden_file} {device_dir}")
+    assert not success
+    assert f"First divergence at tensor {produced[1]['order']}" in output
+
+
+def test_tensor_dump_filters(tmp_path):
+    """dumps only the tensors matching the indexes and name patterns"""
+
+    os.makedirs(f"{tmp_path}/all")
+    sr100_model_compiler(
+        model_file=MODEL_FILE,
+        output_dir=f"{tmp_path}/all",
+        script=["model", "inout"],
+        dump_tensors=["*"],
+    )
+    tensors = read_dump_index(f"{tmp_path}/all/model_tensors.npz")
+    assert not os.path.exists(f"{tmp_path}/all/model_tensors.cc")
+
+    sr100_model_compiler(
+        model_file=MODEL_FILE,
+        output_dir=f"{tmp_path}/some",
+        script=["model", "inout"],
+        dump_tensors=[str(tensors[0]["index"]), tensors[-1]["name"]],
+    )
+    selected = read_dump_index(f"{tmp_path}/some/model_tensors.npz")
+    assert [tensor["name"] for tensor in selected] == [
+        tensors[0]["name"],
+        tensors[-1]["name"],
+    ]
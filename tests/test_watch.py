@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Testing the watch mode recompiling changed models"""
+
+import os
+import shutil
+import threading
+import time
+import numpy as np
+import pytest
+from sr100_model_compiler.model_watch import ModelWatch, get_perf_delta
+from sr100_model_compiler.run_artifacts import read_run_manifest
+from sr100_model_compiler.sr100_model_compiler import get_compiler_argparser
+from sr100_model_compiler.utils import get_args_from_call
+
+MODEL_FILE = "tests/models/hello_world/hello_world.tflite"
+
+
+def wait_until(condition, timeout=60):
+    """Waits for the watch thread to get somewhere"""
+
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting for the watch"
+        time.sleep(0.05)
+
+
+@pytest.mark.parametrize("watch_poll", [None, 0.05])
+def test_watch_models(tmp_path, watch_poll):
+    """recompiles changed models and regenerates the inouts of changed inputs"""
+
+    models_dir = tmp_path / "models"
+    models_dir.mkdir()
+    model_file = models_dir / "hello_world.tflite"
+    shutil.copy(MODEL_FILE, model_file)
+    input_file = tmp_path / "input.npy"
+    np.save(input_file, np.zeros((1, 1), dtype=np.int8))
+
+    args = get_args_from_call(
+        get_compiler_argparser(),
+        model_file=f"{model_file}",
+        output_dir=f"{tmp_path}/out",
+        script=["model", "inout"],
+        input=[f"{input_file}"],
+        watch=[],
+        watch_poll=watch_poll,
+    )
+    watch = ModelWatch(args, debounce=0.1)
+    stop = threading.Event()
+    thread = threading.Thread(target=watch.run, args=(stop,))
+    thread.start()
+    try:
+        wait_until(lambda: len(watch.compiled) == 1)
+        io_text = (tmp_path / "out" / "model_io.cc").read_text(encoding="utf-8")
+
+        # Touching the model is not a change, new inputs skip the compile
+        os.utime(model_file)
+        np.save(input_file, np.ones((1, 1), dtype=np.int8))
+        wait_until(lambda: len(watch.regenerated) == 1)
+        assert len(watch.compiled) == 1
+        assert (tmp_path / "out" / "model_io.cc").read_text(encoding="utf-8") != io_text
+        # The regenerated sources are published with a manifest of the update
+        manifest = read_run_manifest(f"{tmp_path}/out")
+        paths = [file["path"] for file in manifest["files"]]
+        assert "model_io.cc" in paths and "model.cc" in paths
+        assert manifest["updates_run_id"] != manifest["run_id"]
+        assert not [name for name in os.listdir(tmp_path / "out") if ".tmp" in name]
+
+        # A new model content is recompiled
+        with open(model_file, "ab") as fp:
+            fp.write(bytes(16))
+        wait_until(lambda: len(watch.compiled) == 2)
+        assert watch.compiled[-1] == f"{model_file}"
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_watch_globs(tmp_path):
+    """compiles every model matching the globs to its own directory"""
+
+    models_dir = tmp_path / "models"
+    models_dir.mkdir()
+    shutil.copy(MODEL_FILE, models_dir / "first.tflite")
+    args = get_args_from_call(
+        get_compiler_argparser(),
+        model_file=f"{models_dir}/first.tflite",
+        output_dir=f"{tmp_path}/out",
+        watch=[f"{models_dir}/*.tflite"],
+    )
+    watch = ModelWatch(args, debounce=0.1)
+    stop = threading.Event()
+    thread = threading.Thread(target=watch.run, args=(stop,))
+    thread.start()
+    try:
+        wait_until(lambda: len(watch.compiled) == 1)
+        shutil.copy(MODEL_FILE, models_dir / "second.tflite")
+        wait_until(lambda: len(watch.compiled) == 2)
+    finally:
+        stop.set()
+        thread.join()
+    assert os.path.exists(f"{tmp_path}/out/first/model.cc")
+    assert os.path.exists(f"{tmp_path}/out/second/model.cc")
+
+
+def test_perf_delta():
+    """prints only the performance data that changed"""
+
+    before = {key: 100 for key in ["cycles_npu", "cycles_cpu", "weights_size"]}
+    before.update(inference_time=0.002, arena_cache_size=0, vmem_size=0, lpmem_size=0)
+    before["flash_size"] = 0
+    after = {**before, "inference_time": 0.001, "arena_cache_size": 512}
+    assert get_perf_delta(before, after) == (
+        "inference_time 2 ms -> 1 ms (-50.0%), arena_cache_size 0 -> 512"
+    )
+    assert get_perf_delta(before, before) == "no performance change"